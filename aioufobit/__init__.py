@@ -1,7 +1,8 @@
-from .format import verify_sig
+from .format import set_address_cache_size, verify_sig
+from .hd import HDKey
 from .network.fees import set_fee_cache_time
 from .network.rates import SUPPORTED_CURRENCIES, set_rate_cache_time
 from .network.services import set_service_timeout
-from .wallet import Key, PrivateKey, wif_to_key
+from .wallet import Key, MultiSig, PrivateKey, TimeLock, Wallet, WatchOnlyWallet, wif_to_key
 
 __version__ = '0.8.4'
\ No newline at end of file
@@ -18,21 +18,38 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-"""Reference implementation for Bech32 and segwit addresses."""
+"""Reference implementation for Bech32 and segwit addresses, with the
+checksum computed from a lookup table and bech32m (BIP-350) support."""
 
+from functools import lru_cache
 
 CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
 
+BECH32 = 1
+BECH32M = 2
+BECH32M_CONST = 0x2bc830a3
+CHECKSUM_CONSTS = {BECH32: 1, BECH32M: BECH32M_CONST}
 
-def bech32_polymod(values):
+GENERATOR = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+# XOR of the generators selected by each value of the 5 top bits.
+POLYMOD_TABLE = [0] * 32
+for _top in range(32):
+    for _i in range(5):
+        if (_top >> _i) & 1:
+            POLYMOD_TABLE[_top] ^= GENERATOR[_i]
+del _top, _i
+
+# Translation tables between 5-bit values and charset characters.
+ENCODE_TABLE = bytes(CHARSET.encode()[i] if i < 32 else 0 for i in range(256))
+DECODE_TABLE = bytes(CHARSET.find(chr(i)) if chr(i) in CHARSET else 0xff for i in range(256))
+
+
+def bech32_polymod(values, chk=1):
     """Internal function that computes the Bech32 checksum."""
-    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
-    chk = 1
+    table = POLYMOD_TABLE
     for value in values:
-        top = chk >> 25
-        chk = (chk & 0x1ffffff) << 5 ^ value
-        for i in range(5):
-            chk ^= generator[i] if ((top >> i) & 1) else 0
+        chk = (chk & 0x1ffffff) << 5 ^ value ^ table[chk >> 25]
     return chk
 
 
@@ -41,69 +58,96 @@ def bech32_hrp_expand(hrp):
     return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
 
 
+@lru_cache(maxsize=16)
+def bech32_hrp_polymod(hrp):
+    """Checksum state after the expanded HRP, which is the same for every
+    address of a network."""
+    return bech32_polymod(bech32_hrp_expand(hrp))
+
+
 def bech32_verify_checksum(hrp, data):
-    """Verify a checksum given HRP and converted data characters."""
-    return bech32_polymod(bech32_hrp_expand(hrp) + data) == 1
+    """Verify a checksum given HRP and converted data characters, returning
+    the encoding it was made for or ``None``."""
+    const = bech32_polymod(data, bech32_hrp_polymod(hrp))
+    if const == 1:
+        return BECH32
+    if const == BECH32M_CONST:
+        return BECH32M
+    return None
 
 
-def bech32_create_checksum(hrp, data):
+def bech32_create_checksum(hrp, data, spec=BECH32):
     """Compute the checksum values given HRP and data."""
-    values = bech32_hrp_expand(hrp) + data
-    polymod = bech32_polymod(values + [0, 0, 0, 0, 0, 0]) ^ 1
-    return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    polymod = bech32_polymod(data, bech32_hrp_polymod(hrp))
+    polymod = bech32_polymod(b'\0\0\0\0\0\0', polymod) ^ CHECKSUM_CONSTS[spec]
+    return bytes((polymod >> 5 * (5 - i)) & 31 for i in range(6))
 
 
-def bech32_encode(hrp, data):
+def bech32_encode(hrp, data, spec=BECH32):
     """Compute a Bech32 string given HRP and data values."""
-    combined = data + bech32_create_checksum(hrp, data)
-    return hrp + '1' + ''.join([CHARSET[d] for d in combined])
+    combined = bytes(data) + bech32_create_checksum(hrp, data, spec)
+    return hrp + '1' + combined.translate(ENCODE_TABLE).decode()
 
 
 def bech32_decode(bech):
-    """Validate a Bech32 string, and determine HRP and data."""
-    if ((any(ord(x) < 33 or ord(x) > 126 for x in bech)) or
-            (bech.lower() != bech and bech.upper() != bech)):
-        return (None, None)
+    """Validate a Bech32 string, and determine HRP, data and encoding."""
+    if bech.lower() != bech and bech.upper() != bech:
+        return (None, None, None)
     bech = bech.lower()
     pos = bech.rfind('1')
     if pos < 1 or pos + 7 > len(bech) or len(bech) > 90:
-        return (None, None)
-    if not all(x in CHARSET for x in bech[pos+1:]):
-        return (None, None)
+        return (None, None, None)
     hrp = bech[:pos]
-    data = [CHARSET.find(x) for x in bech[pos+1:]]
-    if not bech32_verify_checksum(hrp, data):
-        return (None, None)
-    return (hrp, data[:-6])
+    if any(ord(x) < 33 or ord(x) > 126 for x in hrp):
+        return (None, None, None)
+    try:
+        data = bech[pos+1:].encode('ascii').translate(DECODE_TABLE)
+    except UnicodeEncodeError:
+        return (None, None, None)
+    if b'\xff' in data:
+        return (None, None, None)
+    spec = bech32_verify_checksum(hrp, data)
+    if spec is None:
+        return (None, None, None)
+    return (hrp, data[:-6], spec)
 
 
 def convertbits(data, frombits, tobits, pad=True):
-    """General power-of-2 base conversion."""
-    acc = 0
-    bits = 0
-    ret = []
-    maxv = (1 << tobits) - 1
-    max_acc = (1 << (frombits + tobits - 1)) - 1
-    for value in data:
-        if value < 0 or (value >> frombits):
+    """Power-of-2 base conversion between groups of at most 8 bits."""
+    if frombits == 8:
+        try:
+            data = bytes(data)
+        except ValueError:
             return None
-        acc = ((acc << frombits) | value) & max_acc
-        bits += frombits
-        while bits >= tobits:
-            bits -= tobits
-            ret.append((acc >> bits) & maxv)
-    if pad:
-        if bits:
-            ret.append((acc << (tobits - bits)) & maxv)
-    elif bits >= frombits or ((acc << (tobits - bits)) & maxv):
-        return None
-    return ret
+        num = int.from_bytes(data, 'big')
+    else:
+        num = 0
+        for value in data:
+            if value < 0 or (value >> frombits):
+                return None
+            num = num << frombits | value
+    bits = len(data) * frombits
+    extra = bits % tobits
+    if extra:
+        if pad:
+            num <<= tobits - extra
+            bits += tobits - extra
+        elif extra >= frombits or num & ((1 << extra) - 1):
+            return None
+        else:
+            num >>= extra
+            bits -= extra
+    count = bits // tobits
+    if tobits == 8:
+        return num.to_bytes(count, 'big')
+    maxv = (1 << tobits) - 1
+    return bytes((num >> shift) & maxv for shift in range((count - 1) * tobits, -1, -tobits))
 
 
 def decode(hrp, addr):
     """Decode a segwit address."""
-    hrpgot, data = bech32_decode(addr)
-    if hrpgot != hrp:
+    hrpgot, data, spec = bech32_decode(addr)
+    if hrpgot != hrp or not data:
         return (None, None)
     decoded = convertbits(data[1:], 5, 8, False)
     if decoded is None or len(decoded) < 2 or len(decoded) > 40:
@@ -112,12 +156,30 @@ def decode(hrp, addr):
         return (None, None)
     if data[0] == 0 and len(decoded) != 20 and len(decoded) != 32:
         return (None, None)
+    if (data[0] == 0) != (spec == BECH32):
+        return (None, None)
     return (data[0], decoded)
 
 
 def encode(hrp, witver, witprog):
     """Encode a segwit address."""
-    ret = bech32_encode(hrp, [witver] + convertbits(witprog, 8, 5))
-    if decode(hrp, ret) == (None, None):
+    if not 0 <= witver <= 16 or not 2 <= len(witprog) <= 40:
+        return None
+    if witver == 0 and len(witprog) != 20 and len(witprog) != 32:
         return None
-    return ret
+    data = convertbits(witprog, 8, 5)
+    if data is None or len(hrp) + len(data) + 8 > 90:
+        return None
+    return bech32_encode(hrp, bytes([witver]) + data, BECH32 if witver == 0 else BECH32M)
+
+
+def encode_many(hrp, witver, witprogs):
+    """Encode many segwit addresses of the same HRP and witness version.
+    Invalid programs result in ``None``."""
+    return [encode(hrp, witver, witprog) for witprog in witprogs]
+
+
+def decode_many(hrp, addrs):
+    """Decode many segwit addresses. Invalid addresses result in
+    ``(None, None)``."""
+    return [decode(hrp, addr) for addr in addrs]
@@ -1,35 +1,48 @@
-from collections import deque
-
 from .crypto import double_sha256_checksum
 from .utils import int_to_unknown_bytes
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 BASE58_ALPHABET_LIST = list(BASE58_ALPHABET)
 BASE58_ALPHABET_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
 
+# Encoding works on limbs of 10 digits, each split into 5 pairs of digits
+# looked up at once, instead of one big-int division per digit.
+BASE58_PAIRS = [a + b for a in BASE58_ALPHABET for b in BASE58_ALPHABET]
+BASE58_LIMB = 58 ** 10
+
+# The bulk functions switch to NumPy for at least this many payloads.
+NUMPY_THRESHOLD = 64
+# 58 ** 5 is the largest power of 58 that keeps the vectorized long
+# division and multiplication on 32-bit limbs within 64 bits.
+_GROUP_DIGITS = 5
+_GROUP = 58 ** _GROUP_DIGITS
 
-def b58encode(bytestr):
 
-    alphabet = BASE58_ALPHABET_LIST
+def b58encode(bytestr):
 
-    encoded = deque()
-    append = encoded.appendleft
+    pairs = BASE58_PAIRS
     _divmod = divmod
 
     num = int.from_bytes(bytestr, 'big')
 
+    chunks = []
     while num > 0:
-        num, rem = _divmod(num, 58)
-        append(alphabet[rem])
+        num, limb = _divmod(num, BASE58_LIMB)
+        limb, p4 = _divmod(limb, 3364)
+        limb, p3 = _divmod(limb, 3364)
+        limb, p2 = _divmod(limb, 3364)
+        p0, p1 = _divmod(limb, 3364)
+        chunks.append(pairs[p0] + pairs[p1] + pairs[p2] + pairs[p3] + pairs[p4])
 
-    encoded = ''.join(encoded)
+    # The most significant limb is zero-padded.
+    encoded = ''.join(reversed(chunks)).lstrip('1')
 
-    pad = 0
-    for byte in bytestr:
-        if byte == 0:
-            pad += 1
-        else:
-            break
+    pad = len(bytestr) - len(bytestr.lstrip(b'\x00'))
 
     return '1' * pad + encoded
 
@@ -76,3 +89,225 @@ def b58decode_check(string):
                          'checksum {}.'.format(decoded_checksum, string, hash_checksum))
 
     return shortened
+
+
+def b58encode_many(bytestrs):
+    """Encodes many byte strings. Large batches of equal length payloads,
+    e.g. addresses, are encoded in a vectorized way if NumPy is installed.
+
+    :type bytestrs: ``list`` of ``bytes``
+    :rtype: ``list`` of ``str``
+    """
+    bytestrs = list(bytestrs)
+
+    if numpy is not None and len(bytestrs) >= NUMPY_THRESHOLD and len(set(map(len, bytestrs))) == 1:
+        return _np_encode(bytestrs)
+
+    return [b58encode(bytestr) for bytestr in bytestrs]
+
+
+def b58encode_check_many(bytestrs):
+    """Appends the checksum to and encodes many byte strings.
+
+    :type bytestrs: ``list`` of ``bytes``
+    :rtype: ``list`` of ``str``
+    """
+    return b58encode_many(bytestr + double_sha256_checksum(bytestr) for bytestr in bytestrs)
+
+
+def b58decode_many(strings, length=None, strict=True):
+    """Decodes many strings. If the decoded ``length`` in bytes is known, as
+    for addresses, large batches are decoded in a vectorized way if NumPy
+    is installed; strings not decoding to exactly ``length`` bytes are then
+    invalid.
+
+    :type strings: ``list`` of ``str``
+    :param length: The number of bytes every string decodes to.
+    :type length: ``int``
+    :param strict: If ``False``, invalid strings result in ``None`` instead
+                   of raising.
+    :type strict: ``bool``
+    :rtype: ``list`` of ``bytes``
+    :raises ValueError: If a string is invalid and ``strict`` is ``True``.
+    """
+    strings = list(strings)
+
+    if length and numpy is not None and len(strings) >= NUMPY_THRESHOLD:
+        decoded = _np_decode(strings, length)
+    else:
+        decoded = []
+        for string in strings:
+            try:
+                bytestr = b58decode(string)
+            except ValueError:
+                bytestr = None
+            if length and bytestr is not None and len(bytestr) != length:
+                bytestr = None
+            decoded.append(bytestr)
+
+    if strict:
+        for string, bytestr in zip(strings, decoded):
+            if bytestr is None:
+                raise ValueError('"{}" is not a valid base58 encoded string{}.'.format(
+                    string, ' of {} bytes'.format(length) if length else ''))
+
+    return decoded
+
+
+def b58decode_check_many(strings, length=None, strict=True):
+    """Decodes many strings and verifies their checksums. ``length`` is the
+    number of bytes including the checksum, e.g. 25 for addresses.
+
+    :type strings: ``list`` of ``str``
+    :param length: The number of bytes every string decodes to.
+    :type length: ``int``
+    :param strict: If ``False``, invalid strings result in ``None`` instead
+                   of raising.
+    :type strict: ``bool``
+    :rtype: ``list`` of ``bytes``
+    :raises ValueError: If a string is invalid and ``strict`` is ``True``.
+    """
+    strings = list(strings)
+    shortened = []
+
+    for string, decoded in zip(strings, b58decode_many(strings, length, strict=False)):
+        if decoded is not None and double_sha256_checksum(decoded[:-4]) == decoded[-4:]:
+            shortened.append(decoded[:-4])
+        elif strict:
+            raise ValueError('"{}" is not a valid base58check encoded string.'.format(string))
+        else:
+            shortened.append(None)
+
+    return shortened
+
+
+def _np_encode(bytestrs):
+    count = len(bytestrs)
+    length = len(bytestrs[0])
+
+    # Left-pad to whole big-endian 32-bit limbs.
+    limb_count = -(-length // 4)
+    pad = limb_count * 4 - length
+    data = numpy.zeros((count, limb_count * 4), dtype=numpy.uint8)
+    data[:, pad:] = numpy.frombuffer(b''.join(bytestrs), dtype=numpy.uint8).reshape(count, length)
+    limbs = data.view('>u4').astype(numpy.uint64)
+
+    digit_count = int(length * 8 / 5.857980995127572) + 1  # log2(58)
+    group_count = -(-digit_count // _GROUP_DIGITS)
+
+    # Long division of all numbers at once; every pass yields 5 digits.
+    groups = numpy.empty((count, group_count), dtype=numpy.uint64)
+    for g in range(group_count - 1, -1, -1):
+        remainder = numpy.zeros(count, dtype=numpy.uint64)
+        for m in range(limb_count):
+            current = (remainder << numpy.uint64(32)) | limbs[:, m]
+            limbs[:, m] = current // numpy.uint64(_GROUP)
+            remainder = current % numpy.uint64(_GROUP)
+        groups[:, g] = remainder
+
+    digits = numpy.empty((count, group_count * _GROUP_DIGITS), dtype=numpy.uint8)
+    for d in range(_GROUP_DIGITS - 1, -1, -1):
+        digits[:, d::_GROUP_DIGITS] = groups % numpy.uint64(58)
+        groups //= numpy.uint64(58)
+
+    width = digits.shape[1]
+    nonzero = digits != 0
+    leading_digits = numpy.where(nonzero.any(axis=1), nonzero.argmax(axis=1), width)
+    nonzero_bytes = data[:, pad:] != 0
+    leading_bytes = numpy.where(nonzero_bytes.any(axis=1), nonzero_bytes.argmax(axis=1), length)
+
+    alphabet = numpy.frombuffer(BASE58_ALPHABET.encode(), dtype=numpy.uint8)
+    encoded = alphabet[digits].tobytes().decode()
+
+    return [
+        '1' * int(zero_bytes) + encoded[i * width + int(zero_digits):(i + 1) * width]
+        for i, (zero_digits, zero_bytes) in enumerate(zip(leading_digits, leading_bytes))
+    ]
+
+
+_DECODE_TABLE = None
+
+
+def _np_decode_table():
+    global _DECODE_TABLE
+    if _DECODE_TABLE is None:
+        table = numpy.full(256, 255, dtype=numpy.uint8)
+        for index, char in enumerate(BASE58_ALPHABET):
+            table[ord(char)] = index
+        _DECODE_TABLE = table
+    return _DECODE_TABLE
+
+
+def _np_decode(strings, length):
+    decoded = [None] * len(strings)
+
+    by_width = {}
+    for i, string in enumerate(strings):
+        by_width.setdefault(len(string), []).append(i)
+
+    for width, indices in by_width.items():
+        group = [strings[i] for i in indices]
+        try:
+            raw = ''.join(group).encode('ascii')
+        except UnicodeEncodeError:
+            raw = None
+
+        if raw is None or width == 0:
+            # Falls back to single strings to find the invalid ones.
+            for i in indices:
+                try:
+                    bytestr = b58decode(strings[i])
+                except ValueError:
+                    continue
+                if len(bytestr) == length:
+                    decoded[i] = bytestr
+            continue
+
+        for i, bytestr in zip(indices, _np_decode_width(raw, len(group), width, length)):
+            decoded[i] = bytestr
+
+    return decoded
+
+
+def _np_decode_width(raw, count, width, length):
+    digits = _np_decode_table()[numpy.frombuffer(raw, dtype=numpy.uint8).reshape(count, width)]
+    valid = (digits != 255).all(axis=1)
+    digits[~valid] = 0
+
+    # Left-pad to whole groups of 5 digits.
+    group_count = -(-width // _GROUP_DIGITS)
+    padded = numpy.zeros((count, group_count * _GROUP_DIGITS), dtype=numpy.uint64)
+    padded[:, group_count * _GROUP_DIGITS - width:] = digits
+    groups = numpy.zeros((count, group_count), dtype=numpy.uint64)
+    for d in range(_GROUP_DIGITS):
+        groups = groups * numpy.uint64(58) + padded[:, d::_GROUP_DIGITS]
+
+    limb_count = -(-length // 4)
+    limbs = numpy.zeros((count, limb_count), dtype=numpy.uint64)
+    mask = numpy.uint64(0xffffffff)
+    for g in range(group_count):
+        carry = groups[:, g]
+        for m in range(limb_count - 1, -1, -1):
+            current = limbs[:, m] * numpy.uint64(_GROUP) + carry
+            limbs[:, m] = current & mask
+            carry = current >> numpy.uint64(32)
+        valid &= carry == 0
+
+    pad = limb_count * 4 - length
+    data = limbs.astype('>u4').view(numpy.uint8).reshape(count, limb_count * 4)
+    if pad:
+        valid &= ~data[:, :pad].any(axis=1)
+    data = data[:, pad:]
+
+    # Leading '1's must match the leading zero bytes exactly.
+    nonzero_bytes = data != 0
+    leading_bytes = numpy.where(nonzero_bytes.any(axis=1), nonzero_bytes.argmax(axis=1), length)
+    nonzero_digits = digits != 0
+    leading_digits = numpy.where(nonzero_digits.any(axis=1), nonzero_digits.argmax(axis=1), width)
+    valid &= leading_bytes == leading_digits
+
+    raw = data.tobytes()
+    return [
+        raw[i * length:(i + 1) * length] if ok else None
+        for i, ok in enumerate(valid.tolist())
+    ]
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+from .crypto import double_sha256
+from .transaction import parse_tx
+from .utils import bytes_to_hex, read_varint
+
+HEADER_SIZE = 80
+
+BlockHeader = namedtuple('BlockHeader', ('hash', 'version', 'prev_hash', 'merkle_root', 'time', 'bits', 'nonce'))
+Block = namedtuple('Block', ('hash', 'header', 'transactions'))
+
+
+def parse_header(data, pos=0):
+    """Parses the 80 byte header of a serialized block.
+
+    :param data: The serialized block or header.
+    :type data: ``bytes``
+    :param pos: The position of the header in ``data``.
+    :type pos: ``int``
+    :rtype: :class:`BlockHeader`
+    :raises ValueError: If ``data`` is too short.
+    """
+    header = data[pos:pos + HEADER_SIZE]
+
+    if len(header) != HEADER_SIZE:
+        raise ValueError('A block header must be {} bytes.'.format(HEADER_SIZE))
+
+    return BlockHeader(
+        bytes_to_hex(double_sha256(header)[::-1]),
+        int.from_bytes(header[:4], 'little'),
+        bytes_to_hex(header[35:3:-1]),
+        bytes_to_hex(header[67:35:-1]),
+        int.from_bytes(header[68:72], 'little'),
+        int.from_bytes(header[72:76], 'little'),
+        int.from_bytes(header[76:80], 'little'),
+    )
+
+
+def iter_transactions(data, pos=HEADER_SIZE):
+    """Yields the transactions of a serialized block one by one, without
+    parsing the rest of the block first.
+
+    :param data: The serialized block.
+    :type data: ``bytes``
+    :param pos: The position of the transaction count in ``data``.
+    :type pos: ``int``
+    :returns: A generator of pairs of txid and :class:`~aioufobit.transaction.TxObj`.
+    """
+    count, pos = read_varint(data, pos)
+
+    for _ in range(count):
+        tx, txid, pos = parse_tx(data, pos)
+        yield txid, tx
+
+
+def parse_block(data):
+    """Parses a serialized block, e.g. as returned by ``getblock`` with
+    verbosity 0 or published on the ``rawblock`` ZMQ topic.
+
+    :param data: The serialized block.
+    :type data: ``bytes`` or ``str`` of hex
+    :rtype: :class:`Block`
+    """
+    if isinstance(data, str):
+        data = bytes.fromhex(data)
+
+    header = parse_header(data)
+
+    return Block(header.hash, header, list(iter_transactions(data)))
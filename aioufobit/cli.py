@@ -9,7 +9,15 @@ def bit():
 
 
 @bit.command()
-@click.argument('prefix')
+@click.argument('prefixes', nargs=-1, required=True)
 @click.option('--cores', '-c', default='all')
-def gen(prefix, cores):
-    click.echo(generate_matching_address(prefix, cores))
+@click.option('--ignore-case', '-i', is_flag=True)
+def gen(prefixes, cores, ignore_case):
+
+    def show(progress):
+        click.echo('Keys generated: {} ({:.0f}/s, {:.1%} chance so far)\r'.format(
+            progress.keys, progress.keys_per_second, progress.probability), nl=False)
+
+    wif, address = generate_matching_address(list(prefixes), cores, case_sensitive=not ignore_case,
+                                             callback=show)
+    click.echo('\n\nWIF: {}\nAddress: {}'.format(wif, address))
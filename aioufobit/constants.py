@@ -8,6 +8,8 @@ TEST_SCRIPT_HASH = b'\xc4'
 TEST_PRIVATE_KEY = b'\xef'
 TEST_BIP32_PUBKEY = b'\x045\x87\xcf'
 TEST_BIP32_PRIVKEY = b'\x045\x83\x94'
+MAIN_BECH32_HRP = 'uf'
+TEST_BECH32_HRP = 'ut'
 PUBLIC_KEY_UNCOMPRESSED = b'\x04'
 PUBLIC_KEY_COMPRESSED_EVEN_Y = b'\x02'
 PUBLIC_KEY_COMPRESSED_ODD_Y = b'\x03'
@@ -15,12 +17,19 @@ PRIVATE_KEY_COMPRESSED_PUBKEY = b'\x01'
 
 VERSION_1 = 0x01.to_bytes(4, byteorder='little')
 SEQUENCE = 0xffffffff.to_bytes(4, byteorder='little')
+# Inputs with a lower sequence signal that the transaction may be replaced (BIP-125).
+RBF_SEQUENCE = 0xfffffffd.to_bytes(4, byteorder='little')
+# The highest sequence that still enforces the lock time of a transaction.
+LOCKTIME_SEQUENCE = 0xfffffffe.to_bytes(4, byteorder='little')
+# Lock times below this are block heights, others UNIX timestamps.
+LOCKTIME_THRESHOLD = 500000000
 LOCK_TIME = 0x00.to_bytes(4, byteorder='little')
 HASH_TYPE = 0x01.to_bytes(4, byteorder='little')
 
 OP_0 = b'\x00'
 OP_CHECKLOCKTIMEVERIFY = b'\xb1'
 OP_CHECKSIG = b'\xac'
+OP_DROP = b'u'
 OP_DUP = b'v'
 OP_EQUALVERIFY = b'\x88'
 OP_HASH160 = b'\xa9'
@@ -29,6 +38,7 @@ OP_RETURN = b'\x6a'
 OP_EQUAL = b'\x87'
 
 MESSAGE_LIMIT = 40
+MIN_TX_FEE = 100000
 
 UFOSHI = 1
 uUFO = 10 ** 2
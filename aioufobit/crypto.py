@@ -1,6 +1,50 @@
 from hashlib import new, sha256 as _sha256
+from os import getpid
 
-from coincurve import PrivateKey as ECPrivateKey, PublicKey as ECPublicKey
+from coincurve import Context, PrivateKey as ECPrivateKey, PublicKey as ECPublicKey
+
+# The secp256k1 context of this process, see get_context.
+_context = None
+_context_pid = None
+
+
+def get_context():
+    """Returns the secp256k1 context shared by all key creation, signing
+    and verification of this process. It is made and randomized against
+    side channels once; a forked process makes its own instead of sharing
+    the randomization of its parent.
+
+    :rtype: ``coincurve.Context``
+    """
+    if _context_pid != getpid():
+        set_context()
+    return _context
+
+
+def set_context(context=None, seed=None):
+    """Replaces the context of this process.
+
+    :param context: The context to use. By default a new one is made.
+    :type context: ``coincurve.Context``
+    :param seed: 32 bytes randomizing a new context. By default random.
+    :type seed: ``bytes``
+    :rtype: ``coincurve.Context``
+    """
+    global _context, _context_pid
+    _context = context or Context(seed=seed, name='aioufobit')
+    _context_pid = getpid()
+    return _context
+
+
+def init_worker(seed=None):
+    """An initializer for process and thread pools, giving each worker
+    process its context before its first task.
+
+    :param seed: 32 bytes randomizing the context. By default random.
+    :type seed: ``bytes``
+    """
+    if seed is not None or _context_pid != getpid():
+        set_context(seed=seed)
 
 
 def sha256(bytestr):
@@ -0,0 +1,376 @@
+from collections import namedtuple
+
+from .constants import MIN_TX_FEE, OP_DUP, RBF_SEQUENCE
+from .exceptions import InsufficientFunds
+from .format import address_to_scriptpubkey
+from .network.meta import Unspent
+from .transaction import (
+    TxObj, TxOut, calc_vsize, create_unsigned_transaction, estimate_tx_vsize, is_replaceable, parse_tx, sign_tx
+)
+from .utils import bytes_to_hex, hex_to_bytes
+from .wallet import Wallet, broadcast_leased
+
+# Change below this is not worth an output and goes to the miners instead.
+DUST_LIMIT = 546
+# The fee per virtual byte a replacement must add for its own relay (BIP-125 rule 4).
+DEFAULT_RELAY_FEE = 1
+
+TrackedTx = namedtuple('TrackedTx', ('txid', 'tx_hex', 'unspents', 'fee', 'vsize'))
+
+
+def package_feerate(transactions):
+    """Returns the fee per virtual byte of a package of transactions, which
+    miners consider when a child's fee makes its parents worth including.
+
+    :param transactions: The fee and virtual size of every transaction.
+    :type transactions: ``list`` of ``tuple``
+    :rtype: ``float``
+    """
+    fee = vsize = 0
+    for tx_fee, tx_vsize in transactions:
+        fee += tx_fee
+        vsize += tx_vsize
+    return fee / vsize
+
+
+class FeeBumper:
+    """Sends transactions that signal replace-by-fee (BIP-125) and replaces
+    them with ones paying a higher fee while they are stuck. A replacement
+    spends the same inputs and pays the same outputs; the fee is taken from
+    the change, and unspents leased from the signer's
+    :class:`~aioufobit.utxo.UTXOManager` are added if the change does not
+    cover it. Every replacement is tracked, so a transaction can be bumped
+    again by any txid of its chain. Unconfirmed transactions paying to the
+    signer, outgoing or incoming, can be accelerated by a child spending
+    their outputs instead (CPFP).
+
+    :param signer: The key or wallet owning the inputs.
+    :type signer: :class:`~aioufobit.PrivateKey` or :class:`~aioufobit.Wallet`
+    :param relay_fee: The incremental relay fee of the network in ufoshi per
+                      virtual byte.
+    :type relay_fee: ``int``
+    """
+
+    def __init__(self, signer, relay_fee=DEFAULT_RELAY_FEE):
+        self.signer = signer
+        self.keys = signer.keys if isinstance(signer, Wallet) else [signer]
+        self.utxos = signer.utxos
+        self.relay_fee = relay_fee
+        self.compressed = all(key.is_compressed() for key in self.keys)
+
+        # scriptpubkey -> address of the signer, identifying change outputs
+        self._change = {}
+        for key in self.keys:
+            self._change[key.scriptpubkey] = key.address
+            if key.sw_address:
+                self._change[key.sw_scriptpubkey] = key.sw_address
+                self._change[key.bech32_scriptpubkey] = key.bech32_address
+
+        # txid -> TrackedTx
+        self.transactions = {}
+        # txid -> txid of the transaction replacing it, and the reverse
+        self.replaced_by = {}
+        self.replaces = {}
+
+    def track(self, tx_hex, unspents):
+        """Tracks a replaceable transaction of the signer sent by other means.
+
+        :param tx_hex: The signed transaction as hex.
+        :type tx_hex: ``str``
+        :param unspents: The unspents spent by its inputs, in order.
+        :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        :returns: The transaction ID.
+        :rtype: ``str``
+        :raises ValueError: If the transaction does not signal replace-by-fee.
+        """
+        tx, txid, _ = parse_tx(hex_to_bytes(tx_hex))
+
+        if not is_replaceable(tx):
+            raise ValueError('Transaction {} does not signal replace-by-fee.'.format(txid))
+        if len(unspents) != len(tx.TxIn):
+            raise ValueError('Expected {} unspents, got {}.'.format(len(tx.TxIn), len(unspents)))
+
+        fee = sum(unspent.amount for unspent in unspents) - sum(
+            int.from_bytes(txout.value, 'little') for txout in tx.TxOut
+        )
+        self.transactions[txid] = TrackedTx(
+            txid, tx_hex, list(unspents), fee, estimate_tx_vsize(unspents, len(tx.TxOut), self.compressed)
+        )
+        return txid
+
+    def latest(self, txid):
+        """Returns the txid of the latest replacement of a transaction, or
+        ``txid`` itself if it was not replaced.
+
+        :rtype: ``str``
+        """
+        while txid in self.replaced_by:
+            txid = self.replaced_by[txid]
+        return txid
+
+    def history(self, txid):
+        """Returns the txids of the replacement chain of a transaction,
+        oldest first.
+
+        :rtype: ``list`` of ``str``
+        """
+        txid = self.latest(txid)
+        chain = [txid]
+        while txid in self.replaces:
+            txid = self.replaces[txid]
+            chain.append(txid)
+        return chain[::-1]
+
+    def forget(self, txid):
+        """Stops tracking the replacement chain of a transaction, e.g. once
+        one of them confirmed.
+
+        :type txid: ``str``
+        """
+        for txid in self.history(txid):
+            self.transactions.pop(txid, None)
+            self.replaced_by.pop(txid, None)
+            self.replaces.pop(txid, None)
+
+    async def send(self, outputs, fee=None, leftover=None, combine=False, message=None):
+        """Creates a replaceable transaction from leased unspents, broadcasts
+        and tracks it. This accepts the arguments of
+        :func:`~aioufobit.utxo.UTXOManager.reserve`.
+
+        :returns: The transaction ID, or ``None`` if the broadcast was rejected.
+        :rtype: ``str``
+        """
+        lease = self.utxos.reserve(outputs, fee, leftover or self.keys[0].address,
+                                   combine=combine, message=message, compressed=self.compressed)
+
+        txid, tx_hex = await broadcast_leased(lease, lambda lease: self._sign(
+            create_unsigned_transaction(lease.unspents, lease.outputs, RBF_SEQUENCE), lease.unspents
+        ))
+
+        if txid:
+            self._apply(txid, tx_hex)
+            self.track(tx_hex, lease.unspents)
+
+        return txid
+
+    def create_replacement(self, txid, fee):
+        """Creates a replacement of the latest transaction in the chain of
+        ``txid`` paying ``fee`` per virtual byte, or more if the rules of
+        BIP-125 demand it, and leases any unspents it adds. The lease must
+        be spent or released.
+
+        :param txid: Any txid of the replacement chain.
+        :type txid: ``str``
+        :param fee: The fee in ufoshi per virtual byte.
+        :type fee: ``int``
+        :returns: The signed replacement as hex and its lease.
+        :rtype: ``tuple``
+        :raises InsufficientFunds: If the change and available confirmed
+                                   unspents do not cover the fee.
+        """
+        record = self.transactions.get(self.latest(txid))
+        if record is None:
+            raise ValueError('Transaction {} is not tracked.'.format(txid))
+
+        original = parse_tx(hex_to_bytes(record.tx_hex))[0]
+        unspents = list(record.unspents)
+        outputs = [TxOut(txout.value, txout.script) for txout in original.TxOut]
+
+        change = next((i for i, txout in enumerate(outputs) if txout.script in self._change), None)
+        if change is None:
+            outputs.append(TxOut(bytes(8), address_to_scriptpubkey(self.keys[0].address)))
+            change = len(outputs) - 1
+
+        # Neither the inputs nor the outputs of the replaced transaction
+        # qualify, and BIP-125 forbids adding unconfirmed inputs.
+        spent = {(unspent.txid, unspent.txindex) for unspent in unspents}
+        candidates = sorted((unspent for unspent in self.utxos.available()
+                             if (unspent.txid, unspent.txindex) not in spent and unspent.txid != record.txid
+                             and unspent.confirmations > 0),
+                            key=lambda unspent: unspent.amount, reverse=True)
+        added = []
+
+        total_in = sum(unspent.amount for unspent in unspents)
+        total_out = sum(int.from_bytes(txout.value, 'little') for i, txout in enumerate(outputs) if i != change)
+
+        while True:
+            remaining = total_in - total_out - self._required_fee(record, unspents, len(outputs), fee)
+            if remaining >= DUST_LIMIT:
+                outputs[change] = TxOut(remaining.to_bytes(8, 'little'), outputs[change].script)
+                break
+
+            # Leave out the change, paying it to the miners.
+            if total_in - total_out >= self._required_fee(record, unspents, len(outputs) - 1, fee):
+                del outputs[change]
+                change = None
+                break
+
+            if not candidates:
+                raise InsufficientFunds('Balance {} is less than {} (including fee).'.format(total_in, total_out))
+
+            unspent = candidates.pop(0)
+            unspents.append(unspent)
+            added.append(unspent)
+            total_in += unspent.amount
+
+        lease = self.utxos.lease(
+            added, [(self._change.get(txout.script), int.from_bytes(txout.value, 'little')) for txout in outputs],
+            change
+        )
+
+        try:
+            inputs = create_unsigned_transaction(unspents, (), RBF_SEQUENCE).TxIn
+            tx_hex = self._sign(TxObj(original.version, inputs, outputs, original.locktime), unspents)
+        except BaseException:
+            lease.release()
+            raise
+
+        return tx_hex, lease
+
+    async def bump(self, txid, fee):
+        """Replaces the latest transaction in the chain of ``txid`` with one
+        paying ``fee`` per virtual byte and broadcasts it, see
+        :func:`~FeeBumper.create_replacement`.
+
+        :returns: The ID of the replacement, or ``None`` if the broadcast
+                  was rejected.
+        :rtype: ``str``
+        """
+        old = self.latest(txid)
+        tx_hex, lease = self.create_replacement(old, fee)
+        unspents = self.transactions[old].unspents + lease.unspents
+
+        new, _ = await broadcast_leased(lease, lambda lease: tx_hex)
+        if not new:
+            return None
+
+        if isinstance(self.signer, Wallet):
+            self.signer.discard_transaction(old)
+        else:
+            self.utxos.discard(old)
+        self._apply(new, tx_hex)
+
+        self.track(tx_hex, unspents)
+        self.replaced_by[old] = new
+        self.replaces[new] = old
+        return new
+
+    def create_child(self, parents, fee, leftover=None):
+        """Creates a transaction spending the outputs of unconfirmed
+        ``parents`` that pay to the signer, with a fee lifting the package
+        of parents and child to ``fee`` per virtual byte (child pays for
+        parent). Unspents leased from the manager are added if the parents'
+        outputs do not cover the fee. The lease must be spent or released.
+
+        :param parents: The parent transactions as hex, each with the fee it
+                        pays or ``None`` if it is tracked by this bumper.
+        :type parents: ``list`` of ``tuple``
+        :param fee: The fee of the package in ufoshi per virtual byte.
+        :type fee: ``int``
+        :param leftover: The destination of the child's only output. By
+                         default the first key's address.
+        :type leftover: ``str``
+        :returns: The signed child as hex and its lease.
+        :rtype: ``tuple``
+        :raises ValueError: If no parent pays to the signer or the parents
+                            already pay ``fee``.
+        :raises InsufficientFunds: If the outputs and available unspents do
+                                   not cover the fee.
+        """
+        tx_hex, _, lease = self._create_child(parents, fee, leftover)
+        return tx_hex, lease
+
+    def _create_child(self, parents, fee, leftover):
+        package = []
+        unspents = []
+
+        for tx_hex, paid in parents:
+            tx, txid, _ = parse_tx(hex_to_bytes(tx_hex))
+            if paid is None:
+                if txid not in self.transactions:
+                    raise ValueError('The fee of transaction {} is unknown.'.format(txid))
+                paid = self.transactions[txid].fee
+            package.append((paid, calc_vsize(tx_hex)))
+
+            for txindex, txout in enumerate(tx.TxOut):
+                if txout.script in self._change and self.utxos.is_spendable(txid, txindex):
+                    unspents.append(Unspent(int.from_bytes(txout.value, 'little'), 0, bytes_to_hex(txout.script),
+                                            txid, txindex, segwit=txout.script[:1] != OP_DUP))
+
+        if not unspents:
+            raise ValueError('No parent pays to a spendable output of the signer.')
+        if package_feerate(package) >= fee:
+            raise ValueError('The parents already pay {} per virtual byte.'.format(fee))
+
+        parents_fee = sum(paid for paid, _ in package)
+        parents_vsize = sum(vsize for _, vsize in package)
+
+        # Confirmed unspents first, so the child adds no further ancestors.
+        spent = {(unspent.txid, unspent.txindex) for unspent in unspents}
+        candidates = sorted((unspent for unspent in self.utxos.available()
+                             if (unspent.txid, unspent.txindex) not in spent),
+                            key=lambda unspent: (unspent.confirmations > 0, unspent.amount), reverse=True)
+
+        total_in = sum(unspent.amount for unspent in unspents)
+
+        while True:
+            vsize = estimate_tx_vsize(unspents, 1, self.compressed)
+            child_fee = max(fee * (parents_vsize + vsize) - parents_fee, vsize * self.relay_fee, MIN_TX_FEE)
+            if total_in - child_fee >= DUST_LIMIT:
+                break
+
+            if not candidates:
+                raise InsufficientFunds('Balance {} is less than {} (including fee).'.format(total_in, child_fee))
+
+            unspent = candidates.pop(0)
+            unspents.append(unspent)
+            total_in += unspent.amount
+
+        outputs = [(leftover or self.keys[0].address, total_in - child_fee)]
+        lease = self.utxos.lease(unspents, outputs, 0)
+
+        try:
+            tx_hex = self._sign(create_unsigned_transaction(unspents, outputs, RBF_SEQUENCE), unspents)
+        except BaseException:
+            lease.release()
+            raise
+
+        return tx_hex, unspents, lease
+
+    async def accelerate(self, parents, fee, leftover=None):
+        """Creates a child lifting the package of ``parents`` to ``fee`` per
+        virtual byte, see :func:`~FeeBumper.create_child`, broadcasts and
+        tracks it. The child signals replace-by-fee, so it can be bumped in
+        turn.
+
+        :returns: The ID of the child, or ``None`` if the broadcast was
+                  rejected.
+        :rtype: ``str``
+        """
+        tx_hex, unspents, lease = self._create_child(parents, fee, leftover)
+
+        txid, _ = await broadcast_leased(lease, lambda lease: tx_hex)
+        if txid:
+            self._apply(txid, tx_hex)
+            self.track(tx_hex, unspents)
+
+        return txid
+
+    def _required_fee(self, record, unspents, n_out, fee):
+        vsize = estimate_tx_vsize(unspents, n_out, self.compressed)
+        return max(vsize * fee, record.fee + vsize * self.relay_fee, MIN_TX_FEE)
+
+    def _sign(self, tx, unspents):
+        if isinstance(self.signer, Wallet):
+            return self.signer.sign_tx(tx, unspents)
+        return sign_tx(self.signer, tx, unspents=unspents)
+
+    def _apply(self, txid, tx_hex):
+        if isinstance(self.signer, Wallet):
+            self.signer.apply_transaction(txid, parse_tx(hex_to_bytes(tx_hex))[0])
+
+    def __contains__(self, txid):
+        return txid in self.transactions
+
+    def __len__(self):
+        return len(self.transactions)
@@ -1,11 +1,15 @@
+from collections import namedtuple
+from functools import lru_cache
+
 from coincurve import verify_signature as _vs
 
-from .base58 import b58decode_check, b58encode_check
-from .crypto import ripemd160_sha256, sha256
+from .base32 import decode as segwit_decode, encode as segwit_encode
+from .base58 import b58decode_check, b58decode_check_many, b58encode_check
+from .crypto import get_context, ripemd160_sha256, sha256
 from .curve import x_to_y
 from .constants import *
 
-from .utils import int_to_unknown_bytes
+from .utils import hex_to_bytes, int_to_unknown_bytes, int_to_varint, script_push
 
 
 def verify_sig(signature, data, public_key):
@@ -19,28 +23,192 @@ def verify_sig(signature, data, public_key):
     :type public_key: ``bytes``
     :returns: ``True`` if all checks pass, ``False`` otherwise.
     """
-    return _vs(signature, data, public_key)
+    return _vs(signature, data, public_key, context=get_context())
+
+
+DEFAULT_ADDRESS_CACHE_SIZE = 4096
+
+BECH32_VERSIONS = {MAIN_BECH32_HRP: 'main', TEST_BECH32_HRP: 'test', 'bc': 'main', 'tb': 'test'}
+
+# Output script templates around the 20 byte hash.
+P2PKH_SCRIPT_PREFIX = OP_DUP + OP_HASH160 + OP_PUSH_20
+P2PKH_SCRIPT_SUFFIX = OP_EQUALVERIFY + OP_CHECKSIG
+P2SH_SCRIPT_PREFIX = OP_HASH160 + OP_PUSH_20
+P2SH_SCRIPT_SUFFIX = OP_EQUAL
+
+ParsedAddress = namedtuple('ParsedAddress', ('type', 'version', 'hash', 'scriptpubkey'))
+
+
+def set_address_cache_size(size):
+    """Sets the number of parsed addresses kept by :func:`parse_address`.
+    This also clears the cache."""
+    global _parse_address_cached
+    _parse_address_cached = lru_cache(maxsize=size)(_parse_address)
+
+
+def address_cache_info():
+    """Returns the hits, misses, maximum and current size of the parsed
+    address cache as a :func:`functools.lru_cache` ``CacheInfo``."""
+    return _parse_address_cached.cache_info()
+
+
+def parse_address(address):
+    """Decodes and validates an address. Results are kept in a bounded LRU
+    cache, see :func:`set_address_cache_size`.
+
+    :param address: A P2PKH, P2SH or bech32 address.
+    :type address: ``str``
+    :returns: The address ``type`` (``'p2pkh'``, ``'p2sh'`` or
+              ``'witness_v<n>'``), its ``version`` (``'main'`` or
+              ``'test'``), its public key, script or witness program
+              ``hash`` and its ``scriptpubkey``.
+    :rtype: ``ParsedAddress``
+    :raises ValueError: If the address is invalid or of an unknown network.
+    """
+    return _parse_address_cached(address)
+
+
+def _bech32_hrp(address):
+    hrp = address[:address.rfind('1')].lower()
+    return hrp if hrp in BECH32_VERSIONS else None
+
+
+def _parse_address(address):
+    hrp = _bech32_hrp(address)
+
+    if hrp:
+        witver, witprog = segwit_decode(hrp, address)
+        # Base58 addresses may look like they had a bech32 prefix.
+        if witver is not None:
+            return ParsedAddress('witness_v{}'.format(witver), BECH32_VERSIONS[hrp],
+                                 witprog, segwit_scriptpubkey(witver, witprog))
+
+    decoded = b58decode_check(address)
+    prefix, hashed = decoded[:1], decoded[1:]
+
+    if prefix == MAIN_PUBKEY_HASH or prefix == TEST_PUBKEY_HASH:
+        address_type = 'p2pkh'
+        script = P2PKH_SCRIPT_PREFIX + hashed + P2PKH_SCRIPT_SUFFIX
+    elif prefix == MAIN_SCRIPT_HASH or prefix == TEST_SCRIPT_HASH:
+        address_type = 'p2sh'
+        script = P2SH_SCRIPT_PREFIX + hashed + P2SH_SCRIPT_SUFFIX
+    else:
+        raise ValueError('{} does not correspond to a mainnet nor '
+                         'testnet address.'.format(prefix))
+
+    if len(hashed) != 20:
+        raise ValueError('{} is an invalid length for an address hash.'.format(len(hashed)))
+
+    version = 'main' if prefix == MAIN_PUBKEY_HASH or prefix == MAIN_SCRIPT_HASH else 'test'
+
+    return ParsedAddress(address_type, version, hashed, script)
+
+
+_parse_address_cached = lru_cache(maxsize=DEFAULT_ADDRESS_CACHE_SIZE)(_parse_address)
 
 
 def address_to_public_key_hash(address):
     # Raise ValueError if we cannot identify the address.
-    get_version(address)
-    return b58decode_check(address)[1:]
+    return parse_address(address).hash
 
 
 def get_version(address):
-    segwit_versions = {'bc': MAIN_PUBKEY_HASH, 'tb': TEST_PUBKEY_HASH}
-    version = segwit_versions.get(address[0:2])
-    if not version:
-        version = b58decode_check(address)[:1]
-
-    if version == MAIN_PUBKEY_HASH or version == MAIN_SCRIPT_HASH:
-        return 'main'
-    elif version == TEST_PUBKEY_HASH or version == TEST_SCRIPT_HASH:
-        return 'test'
-    else:
-        raise ValueError('{} does not correspond to a mainnet nor '
-                         'testnet address.'.format(version))
+    return parse_address(address).version
+
+
+def address_to_scriptpubkey(address):
+    """Returns the output script paying to an address.
+
+    :param address: A P2PKH, P2SH or bech32 address.
+    :type address: ``str``
+    :rtype: ``bytes``
+    :raises ValueError: If the address is invalid.
+    """
+    return parse_address(address).scriptpubkey
+
+
+def addresses_to_scriptpubkeys(addresses, packed=False):
+    """Returns the output scripts paying to many addresses. Base58 addresses
+    are decoded in bulk and bypass the :func:`parse_address` cache, so large
+    batches do not evict its entries.
+
+    :param addresses: P2PKH, P2SH or bech32 addresses.
+    :type addresses: ``list`` of ``str``
+    :param packed: If ``True``, returns the scripts concatenated into one
+                   buffer, each prefixed by its length as a varint.
+    :type packed: ``bool``
+    :rtype: ``list`` of ``bytes`` or ``bytes``
+    :raises ValueError: If an address is invalid.
+    """
+    addresses = list(addresses)
+    scripts = [None] * len(addresses)
+
+    base58 = []
+    for i, address in enumerate(addresses):
+        if _bech32_hrp(address):
+            scripts[i] = _parse_address(address).scriptpubkey
+        else:
+            base58.append(i)
+
+    decoded = b58decode_check_many([addresses[i] for i in base58], length=25)
+
+    for i, payload in zip(base58, decoded):
+        prefix, hashed = payload[:1], payload[1:]
+        if prefix == MAIN_PUBKEY_HASH or prefix == TEST_PUBKEY_HASH:
+            scripts[i] = P2PKH_SCRIPT_PREFIX + hashed + P2PKH_SCRIPT_SUFFIX
+        elif prefix == MAIN_SCRIPT_HASH or prefix == TEST_SCRIPT_HASH:
+            scripts[i] = P2SH_SCRIPT_PREFIX + hashed + P2SH_SCRIPT_SUFFIX
+        else:
+            raise ValueError('{} does not correspond to a mainnet nor '
+                             'testnet address.'.format(prefix))
+
+    if packed:
+        return b''.join(int_to_varint(len(script)) + script for script in scripts)
+
+    return scripts
+
+
+def scriptpubkey_to_address(script, version='main'):
+    """Returns the address an output script pays to.
+
+    :param script: A P2PKH, P2SH or segwit output script.
+    :type script: ``bytes``
+    :param version: The network of the address, ``'main'`` or ``'test'``.
+    :type version: ``str``
+    :rtype: ``str``
+    :raises ValueError: If the script has no address form.
+    """
+    length = len(script)
+
+    if (length == 25 and script[:3] == P2PKH_SCRIPT_PREFIX and
+            script[23:] == P2PKH_SCRIPT_SUFFIX):
+        prefix = TEST_PUBKEY_HASH if version == 'test' else MAIN_PUBKEY_HASH
+        return b58encode_check(prefix + script[3:23])
+
+    if (length == 23 and script[:2] == P2SH_SCRIPT_PREFIX and
+            script[22:] == P2SH_SCRIPT_SUFFIX):
+        prefix = TEST_SCRIPT_HASH if version == 'test' else MAIN_SCRIPT_HASH
+        return b58encode_check(prefix + script[2:22])
+
+    if 4 <= length <= 42 and (script[0] == 0 or 0x51 <= script[0] <= 0x60) and script[1] == length - 2:
+        hrp = next(hrp for hrp, v in BECH32_VERSIONS.items() if v == version)
+        address = segwit_encode(hrp, script[0] - 0x50 if script[0] else 0, script[2:])
+        if address:
+            return address
+
+    raise ValueError('{} is not a standard output script.'.format(script.hex()))
+
+
+def scriptpubkey_index(addresses):
+    """Maps the output script of each address back to the address, e.g. to
+    find which outputs of a block pay to a set of watched addresses.
+
+    :param addresses: P2PKH, P2SH or bech32 addresses.
+    :type addresses: ``list`` of ``str``
+    :rtype: ``dict`` of ``bytes`` to ``str``
+    """
+    addresses = list(addresses)
+    return dict(zip(addresses_to_scriptpubkeys(addresses), addresses))
 
 
 def bytes_to_wif(private_key, version='main', compressed=False):
@@ -122,17 +290,27 @@ def public_key_to_segwit_address(public_key, version='main'):
     return b58encode_check(version + ripemd160_sha256(b'\x00\x14' + ripemd160_sha256(public_key)))
 
 
-def multisig_to_redeemscript(public_keys, m):
-    # public_keys must be provided as a list
-    from bit_sw.utils import hex_to_bytes, script_push
+def public_key_to_bech32_address(public_key, version='main'):
+    hrp = TEST_BECH32_HRP if version == 'test' else MAIN_BECH32_HRP
+
+    length = len(public_key)
+
+    if length != 33:
+        raise ValueError(
+            '{} is an invalid length for a public key. Segwit only uses compressed public keys'.format(length))
 
+    return segwit_encode(hrp, 0, ripemd160_sha256(public_key))
+
+
+def multisig_to_redeemscript(public_keys, m):
+    # public_keys must be provided as a list of bytes or hex strings
     if m > 16:
         raise ValueError('More than the allowed maximum of 16 public keys cannot be used.')
 
     redeemscript = int_to_unknown_bytes(m + 80)
 
     for key in public_keys:
-        key_byte = hex_to_bytes(key)
+        key_byte = hex_to_bytes(key) if isinstance(key, str) else key
         length = len(key_byte)
 
         if length not in (33, 65):
@@ -167,9 +345,54 @@ def multisig_to_segwit_address(public_keys, m, version='main'):
     return b58encode_check(version + ripemd160_sha256(b'\x00\x20' + sha256(multisig_to_redeemscript(public_keys, m))))
 
 
+def timelock_to_redeemscript(public_key, locktime):
+    """Returns the script locking funds to a public key until a block height
+    or UNIX timestamp (BIP-65):
+    ``<locktime> OP_CHECKLOCKTIMEVERIFY OP_DROP <public key> OP_CHECKSIG``.
+
+    :param public_key: The public key as bytes or hex.
+    :type public_key: ``bytes`` or ``str``
+    :param locktime: A block height below 500000000, a timestamp otherwise.
+    :type locktime: ``int``
+    :rtype: ``bytes``
+    :raises ValueError: If ``locktime`` does not fit 4 bytes.
+    """
+    public_key = hex_to_bytes(public_key) if isinstance(public_key, str) else public_key
+
+    if not 0 < locktime < 2 ** 32:
+        raise ValueError('{} is not a valid lock time.'.format(locktime))
+
+    if locktime <= 16:
+        locktime = bytes([locktime + 80])
+    else:
+        # Minimally encoded number, with room for the sign bit.
+        number = locktime.to_bytes((locktime.bit_length() + 8) // 8, 'little')
+        locktime = script_push(len(number)) + number
+
+    return locktime + OP_CHECKLOCKTIMEVERIFY + OP_DROP + script_push(len(public_key)) + public_key + OP_CHECKSIG
+
+
+def timelock_to_address(public_key, locktime, version='main'):
+    if version == 'test':
+        version = TEST_SCRIPT_HASH
+    else:
+        version = MAIN_SCRIPT_HASH
+
+    return b58encode_check(version + ripemd160_sha256(timelock_to_redeemscript(public_key, locktime)))
+
+
+def timelock_to_segwit_address(public_key, locktime, version='main'):
+    if version == 'test':
+        version = TEST_SCRIPT_HASH
+    else:
+        version = MAIN_SCRIPT_HASH
+
+    return b58encode_check(version + ripemd160_sha256(b'\x00\x20' + sha256(timelock_to_redeemscript(public_key, locktime))))
+
+
 def segwit_scriptpubkey(witver, witprog):
     """Construct a Segwit scriptPubKey for a given witness program."""
-    return bytes([witver + 0x50 if witver else 0, len(witprog)] + witprog)
+    return bytes([witver + 0x50 if witver else 0, len(witprog)]) + bytes(witprog)
 
 
 def public_key_to_coords(public_key):
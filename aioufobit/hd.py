@@ -0,0 +1,382 @@
+import hmac
+from hashlib import sha512
+
+from .base58 import b58decode_check, b58encode_check
+from .constants import (
+    MAIN_BIP32_PRIVKEY, MAIN_BIP32_PUBKEY, MAIN_PUBKEY_HASH, MAIN_SCRIPT_HASH,
+    TEST_BIP32_PRIVKEY, TEST_BIP32_PUBKEY
+)
+from .crypto import ECPublicKey, get_context, ripemd160_sha256
+from .curve import GROUP_ORDER
+
+HARDENED = 0x80000000
+SEED_KEY = b'Bitcoin seed'
+
+XKEY_VERSIONS = {
+    MAIN_BIP32_PRIVKEY: ('main', True),
+    MAIN_BIP32_PUBKEY: ('main', False),
+    TEST_BIP32_PRIVKEY: ('test', True),
+    TEST_BIP32_PUBKEY: ('test', False),
+}
+
+
+def parse_path(path):
+    """Converts a derivation path such as ``m/44'/0'/0'/0`` to a list of
+    child indices. Hardened steps may be marked with ``'``, ``h`` or ``H``.
+
+    :param path: The derivation path.
+    :type path: ``str``
+    :rtype: ``list`` of ``int``
+    :raises ValueError: If the path is malformed.
+    """
+    steps = path.strip().split('/')
+
+    if steps[0] in ('m', 'M'):
+        steps = steps[1:]
+
+    indices = []
+
+    for step in steps:
+        if not step:
+            raise ValueError('{} is not a valid derivation path.'.format(path))
+
+        hardened = step[-1] in "'hH"
+        index = int(step[:-1] if hardened else step)
+
+        if not 0 <= index < HARDENED:
+            raise ValueError('{} is an invalid child index.'.format(step))
+
+        indices.append(index + HARDENED if hardened else index)
+
+    return indices
+
+
+class HDKey:
+    """This class represents a BIP-32 extended key. It holds either a
+    private key or only a public key; the latter can still derive
+    non-hardened children, which makes it suitable for watch-only wallets.
+
+    Use :func:`~aioufobit.hd.HDKey.from_seed` or
+    :func:`~aioufobit.hd.HDKey.from_extended_key` to create one.
+
+    :param chain_code: The 32-byte chain code.
+    :type chain_code: ``bytes``
+    :param secret: The 32-byte private key, if known.
+    :type secret: ``bytes``
+    :param public_key: The compressed public key. It is computed from
+                       ``secret`` if not supplied.
+    :type public_key: ``bytes``
+    :param depth: The number of derivation steps from the master key.
+    :type depth: ``int``
+    :param parent_fingerprint: The first 4 bytes of the parent's hash160.
+    :type parent_fingerprint: ``bytes``
+    :param index: The child index of this key.
+    :type index: ``int``
+    :param version: ``'main'`` or ``'test'``.
+    :type version: ``str``
+    :raises ValueError: If neither ``secret`` nor ``public_key`` is supplied.
+    """
+    __slots__ = ('chain_code', 'depth', 'parent_fingerprint', 'index', 'version', '_secret', '_public_key',
+                 '_ec_public_key', '_hmac', '_fingerprint', '_children')
+
+    def __init__(self, chain_code, secret=None, public_key=None, depth=0, parent_fingerprint=b'\x00\x00\x00\x00',
+                 index=0, version='main'):
+        if secret is None and public_key is None:
+            raise ValueError('Either a secret or a public key is required.')
+
+        self.chain_code = chain_code
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.index = index
+        self.version = version
+
+        self._secret = secret
+        self._public_key = public_key
+        self._ec_public_key = None
+        self._hmac = None
+        self._fingerprint = None
+        # Intermediate nodes of paths resolved with ``derive``.
+        self._children = {}
+
+    @classmethod
+    def from_seed(cls, seed, version='main'):
+        """Creates the master key of a seed.
+
+        :param seed: Between 16 and 64 bytes of entropy.
+        :type seed: ``bytes``
+        :rtype: :class:`~aioufobit.hd.HDKey`
+        """
+        digest = hmac.new(SEED_KEY, seed, sha512).digest()
+        secret = digest[:32]
+
+        if not 0 < int.from_bytes(secret, 'big') < GROUP_ORDER:  # pragma: no cover
+            raise ValueError('The seed produced an invalid master key, use another seed.')
+
+        return cls(digest[32:], secret=secret, version=version)
+
+    @classmethod
+    def from_extended_key(cls, xkey):
+        """Imports a serialized extended private (xprv) or public (xpub) key.
+
+        :param xkey: The extended key.
+        :type xkey: ``str``
+        :rtype: :class:`~aioufobit.hd.HDKey`
+        :raises ValueError: If the extended key is malformed.
+        """
+        data = b58decode_check(xkey)
+
+        if len(data) != 78:
+            raise ValueError('{} is an invalid length for an extended key.'.format(len(data)))
+
+        try:
+            version, private = XKEY_VERSIONS[data[:4]]
+        except KeyError:
+            raise ValueError('{} does not correspond to a mainnet nor '
+                             'testnet extended key.'.format(data[:4])) from None
+
+        depth = data[4]
+        parent_fingerprint = data[5:9]
+        index = int.from_bytes(data[9:13], 'big')
+        chain_code = data[13:45]
+        key = data[45:]
+
+        if private:
+            if key[:1] != b'\x00' or not 0 < int.from_bytes(key[1:], 'big') < GROUP_ORDER:
+                raise ValueError('The extended key contains an invalid private key.')
+            return cls(chain_code, secret=key[1:], depth=depth, parent_fingerprint=parent_fingerprint,
+                       index=index, version=version)
+
+        # Parsing validates that the point is on the curve.
+        ec_public_key = ECPublicKey(key, context=get_context())
+        hd_key = cls(chain_code, public_key=key, depth=depth, parent_fingerprint=parent_fingerprint,
+                     index=index, version=version)
+        hd_key._ec_public_key = ec_public_key
+        return hd_key
+
+    @property
+    def is_private(self):
+        """Whether or not the private key is known."""
+        return self._secret is not None
+
+    @property
+    def secret(self):
+        """The 32-byte private key, or ``None`` for public-only keys."""
+        return self._secret
+
+    @property
+    def public_key(self):
+        """The compressed public key."""
+        if self._public_key is None:
+            self._public_key = ECPublicKey.from_secret(self._secret, context=get_context()).format()
+        return self._public_key
+
+    @property
+    def fingerprint(self):
+        """The first 4 bytes of the hash160 of the public key."""
+        if self._fingerprint is None:
+            self._fingerprint = ripemd160_sha256(self.public_key)[:4]
+        return self._fingerprint
+
+    @property
+    def address(self):
+        """The P2PKH address of the public key."""
+        return b58encode_check(MAIN_PUBKEY_HASH + ripemd160_sha256(self.public_key))
+
+    @property
+    def sw_address(self):
+        """The P2SH-P2WPKH address of the public key."""
+        return b58encode_check(MAIN_SCRIPT_HASH + ripemd160_sha256(b'\x00\x14' + ripemd160_sha256(self.public_key)))
+
+    def to_xprv(self):
+        """Serializes the extended private key.
+
+        :rtype: ``str``
+        :raises ValueError: If this is a public-only key.
+        """
+        if not self.is_private:
+            raise ValueError('A public-only key cannot be serialized as xprv.')
+        prefix = TEST_BIP32_PRIVKEY if self.version == 'test' else MAIN_BIP32_PRIVKEY
+        return self._serialize(prefix, b'\x00' + self._secret)
+
+    def to_xpub(self):
+        """Serializes the extended public key.
+
+        :rtype: ``str``
+        """
+        prefix = TEST_BIP32_PUBKEY if self.version == 'test' else MAIN_BIP32_PUBKEY
+        return self._serialize(prefix, self.public_key)
+
+    def to_public(self):
+        """Returns the public-only (neutered) version of this key.
+
+        :rtype: :class:`~aioufobit.hd.HDKey`
+        """
+        return HDKey(self.chain_code, public_key=self.public_key, depth=self.depth,
+                     parent_fingerprint=self.parent_fingerprint, index=self.index, version=self.version)
+
+    def to_private_key(self):
+        """Returns the key as a :class:`~aioufobit.PrivateKey`.
+
+        :raises ValueError: If this is a public-only key.
+        """
+        from .wallet import PrivateKey
+
+        if not self.is_private:
+            raise ValueError('A public-only key has no private key.')
+        return PrivateKey.from_bytes(self._secret)
+
+    def child(self, index):
+        """Derives a single child key. Indices of :data:`HARDENED` and above
+        derive hardened children.
+
+        :param index: The child index.
+        :type index: ``int``
+        :rtype: :class:`~aioufobit.hd.HDKey`
+        :raises ValueError: If a hardened child is requested from a
+                            public-only key.
+        """
+        return self.derive_range(index, 1)[0]
+
+    def derive(self, path):
+        """Derives the key at a path relative to this key, e.g.
+        ``m/44'/0'/0'/0/7``. All nodes before the last step are kept, so
+        resolving many paths below a common account is cheap.
+
+        :param path: The derivation path, or a list of child indices.
+        :type path: ``str`` or ``list`` of ``int``
+        :rtype: :class:`~aioufobit.hd.HDKey`
+        """
+        indices = parse_path(path) if isinstance(path, str) else list(path)
+
+        if not indices:
+            return self
+
+        node = self
+        for index in indices[:-1]:
+            child = node._children.get(index)
+            if child is None:
+                child = node._children[index] = node.child(index)
+            node = child
+
+        return node.child(indices[-1])
+
+    def derive_range(self, start, count, hardened=False, executor=None, chunk_size=1000):
+        """Derives ``count`` consecutive children starting at ``start``. The
+        parent's public key, fingerprint and keyed HMAC state are computed
+        once for the whole range.
+
+        :param start: The first child index, not counting the hardened offset.
+        :type start: ``int``
+        :param count: The number of children to derive.
+        :type count: ``int``
+        :param hardened: Whether or not to derive hardened children.
+        :type hardened: ``bool``
+        :param executor: If supplied, the range is split into chunks which
+                         are derived by the workers of this
+                         :class:`concurrent.futures.Executor`.
+        :param chunk_size: The number of children derived per task.
+        :type chunk_size: ``int``
+        :rtype: ``list`` of :class:`~aioufobit.hd.HDKey`
+        """
+        first = start + HARDENED if hardened and start < HARDENED else start
+
+        if executor is None or count <= chunk_size:
+            return [self._from_raw(index, raw) for index, raw in
+                    zip(range(first, first + count), self._derive_raw(first, count))]
+
+        xkey = self.to_xprv() if self.is_private else self.to_xpub()
+
+        futures = [
+            executor.submit(_derive_raw_chunk, xkey, chunk_start, min(chunk_size, first + count - chunk_start))
+            for chunk_start in range(first, first + count, chunk_size)
+        ]
+
+        children = []
+        index = first
+        for future in futures:
+            for raw in future.result():
+                children.append(self._from_raw(index, raw))
+                index += 1
+
+        return children
+
+    def _derive_raw(self, first, count):
+        if first + count > 2 ** 32:
+            raise ValueError('Child indices cannot exceed 2**32 - 1.')
+        if first + count > HARDENED and first < HARDENED:
+            raise ValueError('A range cannot cross into hardened indices.')
+
+        hardened = first >= HARDENED
+        if hardened and not self.is_private:
+            raise ValueError('Hardened children cannot be derived from a public key.')
+
+        if self._hmac is None:
+            self._hmac = hmac.new(self.chain_code, digestmod=sha512)
+
+        if hardened:
+            prefix = b'\x00' + self._secret
+        else:
+            prefix = self.public_key
+
+        base = self._hmac
+        derived = []
+
+        if self.is_private:
+            parent = int.from_bytes(self._secret, 'big')
+
+            for index in range(first, first + count):
+                h = base.copy()
+                h.update(prefix + index.to_bytes(4, 'big'))
+                digest = h.digest()
+
+                tweak = int.from_bytes(digest[:32], 'big')
+                secret = (tweak + parent) % GROUP_ORDER
+                if tweak >= GROUP_ORDER or secret == 0:  # pragma: no cover
+                    raise ValueError('Child {} is invalid, use the next index.'.format(index))
+
+                derived.append((secret.to_bytes(32, 'big'), None, digest[32:]))
+        else:
+            if self._ec_public_key is None:
+                self._ec_public_key = ECPublicKey(self._public_key, context=get_context())
+            parent = self._ec_public_key
+
+            for index in range(first, first + count):
+                h = base.copy()
+                h.update(prefix + index.to_bytes(4, 'big'))
+                digest = h.digest()
+
+                try:
+                    public_key = parent.add(digest[:32]).format()
+                except ValueError:  # pragma: no cover
+                    raise ValueError('Child {} is invalid, use the next index.'.format(index)) from None
+
+                derived.append((None, public_key, digest[32:]))
+
+        return derived
+
+    def _from_raw(self, index, raw):
+        secret, public_key, chain_code = raw
+        return HDKey(chain_code, secret=secret, public_key=public_key, depth=self.depth + 1,
+                     parent_fingerprint=self.fingerprint, index=index, version=self.version)
+
+    def _serialize(self, prefix, key):
+        return b58encode_check(
+            prefix +
+            self.depth.to_bytes(1, 'big') +
+            self.parent_fingerprint +
+            self.index.to_bytes(4, 'big') +
+            self.chain_code +
+            key
+        )
+
+    def __eq__(self, other):
+        return (self.chain_code == other.chain_code and
+                self.public_key == other.public_key and
+                self._secret == other._secret)
+
+    def __repr__(self):
+        return '<HDKey: {}>'.format(self.to_xpub())
+
+
+def _derive_raw_chunk(xkey, first, count):  # pragma: no cover
+    return HDKey.from_extended_key(xkey)._derive_raw(first, count)
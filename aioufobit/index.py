@@ -0,0 +1,385 @@
+from struct import Struct
+
+from .format import (
+    P2PKH_SCRIPT_PREFIX, P2PKH_SCRIPT_SUFFIX, P2SH_SCRIPT_PREFIX, P2SH_SCRIPT_SUFFIX,
+    address_to_scriptpubkey, parse_address
+)
+from .network.meta import Unspent
+from .utils import bytes_to_hex, hex_to_bytes
+
+try:
+    import lmdb
+except ImportError:  # pragma: no cover
+    lmdb = None
+
+DEFAULT_MAP_SIZE = 1 << 30
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_REORG_DEPTH = 100
+
+# Addresses are keyed by a type byte and their 20 byte hash.
+P2PKH = b'\x00'
+P2SH = b'\x01'
+P2WPKH = b'\x02'
+ADDRESS_TYPES = {'p2pkh': P2PKH, 'p2sh': P2SH, 'witness_v0': P2WPKH}
+P2WPKH_SCRIPT_PREFIX = b'\x00\x14'
+
+KEY_SIZE = 21
+# Outpoints are the txid in display order and the big-endian output index,
+# so the unspents of an address are sorted by txid.
+OUTPOINT_SIZE = 36
+HEIGHT = Struct('>I')
+VALUE = Struct('>QI')  # amount, height
+UNDO_HEADER = Struct('>III')
+CREATED_SIZE = OUTPOINT_SIZE + KEY_SIZE
+SPENT_SIZE = OUTPOINT_SIZE + KEY_SIZE + VALUE.size
+HISTORY_SIZE = KEY_SIZE + HEIGHT.size + 32
+
+
+def script_key(script):
+    """Returns the index key of the address an output script pays to, or
+    ``None`` if it has no 20 byte hash address form.
+
+    :type script: ``bytes``
+    :rtype: ``bytes``
+    """
+    length = len(script)
+
+    if length == 25 and script[:3] == P2PKH_SCRIPT_PREFIX and script[23:] == P2PKH_SCRIPT_SUFFIX:
+        return P2PKH + script[3:23]
+    if length == 23 and script[:2] == P2SH_SCRIPT_PREFIX and script[22:] == P2SH_SCRIPT_SUFFIX:
+        return P2SH + script[2:22]
+    if length == 22 and script[:2] == P2WPKH_SCRIPT_PREFIX:
+        return P2WPKH + script[2:]
+
+    return None
+
+
+def address_key(address):
+    """Returns the index key of an address.
+
+    :type address: ``str``
+    :rtype: ``bytes``
+    :raises ValueError: If the address is invalid or not a P2PKH, P2SH or
+                        P2WPKH address.
+    """
+    parsed = parse_address(address)
+    address_type = ADDRESS_TYPES.get(parsed.type)
+
+    if address_type is None:
+        raise ValueError('{} addresses are not indexed.'.format(parsed.type))
+
+    return address_type + parsed.hash
+
+
+class AddressIndex:
+    """An on-disk index of the unspents and transaction history of every
+    P2PKH, P2SH and P2WPKH address, built from the blocks of the chain, e.g.
+    by following a :class:`~aioufobit.network.sync.ChainSync`. Requires
+    ``lmdb``.
+
+    Blocks are written in batches: they become visible to queries once
+    :func:`~aioufobit.index.AddressIndex.flush` is called, which happens
+    every ``batch_size`` blocks and whenever a followed sync saves its
+    progress, and are discarded when the sync fails. Undo data is kept
+    for the last ``reorg_depth`` blocks.
+
+    The coroutines ``get_balance``, ``get_transactions``, ``get_unspent`` and
+    ``get_unspents_by_address`` mirror the network backends, so the index
+    can serve as the ``service`` of a :class:`~aioufobit.Wallet`.
+
+    :param path: The directory of the database.
+    :type path: ``str``
+    :param map_size: The maximum size of the database in bytes.
+    :type map_size: ``int``
+    :param batch_size: The number of blocks written per transaction.
+    :type batch_size: ``int``
+    :param reorg_depth: The number of blocks that can be disconnected.
+    :type reorg_depth: ``int``
+    """
+
+    def __init__(self, path, map_size=DEFAULT_MAP_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 reorg_depth=DEFAULT_REORG_DEPTH):
+        if lmdb is None:
+            raise ImportError('AddressIndex requires lmdb.')
+
+        self.env = lmdb.open(path, map_size=map_size, max_dbs=5)
+        # address + outpoint -> amount, height
+        self._utxo = self.env.open_db(b'utxo')
+        # outpoint -> address, amount, height
+        self._outputs = self.env.open_db(b'outputs')
+        # address + height + txid -> b''
+        self._history = self.env.open_db(b'history')
+        # height -> undo record
+        self._undo = self.env.open_db(b'undo')
+        # height -> block hash
+        self._blocks = self.env.open_db(b'blocks')
+
+        self.batch_size = batch_size
+        self.reorg_depth = reorg_depth
+        self._txn = None
+        self._pending = 0
+
+        with self.env.begin(db=self._blocks) as txn:
+            cursor = txn.cursor()
+            self.height = HEIGHT.unpack(cursor.key())[0] if cursor.last() else -1
+
+    def follow(self, sync):
+        """Keeps the index up to date with ``sync``, which resumes from the
+        last block of the index.
+
+        :type sync: :class:`~aioufobit.network.sync.ChainSync`
+        """
+        hashes = self.block_hashes()
+        if hashes:
+            sync.height = self.height
+            sync.hashes = hashes
+        sync.reorg_depth = self.reorg_depth
+
+        sync.subscribe('connect', self.connect_block)
+        sync.subscribe('disconnect', self.disconnect_block)
+        sync.subscribe('save', self.flush)
+        sync.subscribe('rollback', self.rollback)
+
+    def block_hashes(self):
+        """Returns the hashes of the blocks that can be disconnected.
+
+        :rtype: ``dict`` of ``int`` to ``str``
+        """
+        if self._txn is not None:
+            return self._block_hashes(self._txn)
+
+        with self.env.begin() as txn:
+            return self._block_hashes(txn)
+
+    def _block_hashes(self, txn):
+        return {
+            HEIGHT.unpack(height)[0]: bytes_to_hex(block_hash)
+            for height, block_hash in txn.cursor(db=self._blocks)
+        }
+
+    def connect_block(self, height, block):
+        """Adds the outputs of a block to the index and removes the outputs
+        it spends. A block that is already indexed at ``height`` is skipped,
+        so blocks delivered again after a failed sync are not indexed twice.
+        If the block cannot be read, the pending blocks are rolled back.
+
+        :param height: The height of the block.
+        :type height: ``int``
+        :type block: :class:`~aioufobit.block.Block`
+        :raises ValueError: If the block does not follow the last one.
+        """
+        if 0 <= height <= self.height and self._get(HEIGHT.pack(height), self._blocks) == hex_to_bytes(block.hash):
+            return
+        if self.height >= 0 and height != self.height + 1:
+            raise ValueError('Block {} does not follow block {}.'.format(height, self.height))
+
+        try:
+            self._connect_block(height, block)
+        except BaseException:
+            self.rollback()
+            raise
+
+        self.height = height
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def _connect_block(self, height, block):
+        txn = self._write()
+        utxo, outputs, history = self._utxo, self._outputs, self._history
+        packed_height = HEIGHT.pack(height)
+
+        created = []
+        spent = []
+        added = []
+
+        for txid, tx in block.transactions:
+            txid = bytes.fromhex(txid)
+            touched = set()
+
+            for txin in tx.TxIn:
+                outpoint = txin.txid[::-1] + txin.txindex[::-1]
+                value = txn.pop(outpoint, db=outputs)
+                if value is None:
+                    continue
+                key = value[:KEY_SIZE]
+                txn.delete(key + outpoint, db=utxo)
+                spent.append(outpoint + value)
+                touched.add(key)
+
+            for index, txout in enumerate(tx.TxOut):
+                key = script_key(txout.script)
+                if key is None:
+                    continue
+                outpoint = txid + HEIGHT.pack(index)
+                value = txout.value[::-1] + packed_height
+                txn.put(outpoint, key + value, db=outputs)
+                txn.put(key + outpoint, value, db=utxo)
+                created.append(outpoint + key)
+                touched.add(key)
+
+            for key in touched:
+                history_key = key + packed_height + txid
+                txn.put(history_key, b'', db=history)
+                added.append(history_key)
+
+        txn.put(packed_height, b''.join([
+            UNDO_HEADER.pack(len(created), len(spent), len(added)),
+            *created, *spent, *added
+        ]), db=self._undo)
+        txn.put(packed_height, bytes.fromhex(block.hash), db=self._blocks)
+
+        old = HEIGHT.pack(height - self.reorg_depth) if height >= self.reorg_depth else None
+        if old is not None:
+            txn.delete(old, db=self._undo)
+            txn.delete(old, db=self._blocks)
+
+    def disconnect_block(self, height, block_hash=None):
+        """Reverts the last block of the index.
+
+        :param height: The height of the block.
+        :type height: ``int``
+        :param block_hash: The hash of the block, checked if given.
+        :type block_hash: ``str``
+        :raises ValueError: If the block is not the last one or its undo
+                            data is gone.
+        """
+        if height != self.height:
+            raise ValueError('Block {} is not the last block {}.'.format(height, self.height))
+
+        txn = self._write()
+        utxo, outputs, history = self._utxo, self._outputs, self._history
+        packed_height = HEIGHT.pack(height)
+
+        stored_hash = txn.get(packed_height, db=self._blocks)
+        record = txn.get(packed_height, db=self._undo)
+        if record is None or (block_hash is not None and bytes_to_hex(stored_hash) != block_hash):
+            raise ValueError('No undo data for block {}.'.format(block_hash or height))
+
+        n_created, n_spent, n_added = UNDO_HEADER.unpack_from(record)
+        pos = UNDO_HEADER.size
+        created_end = pos + n_created * CREATED_SIZE
+        spent_end = created_end + n_spent * SPENT_SIZE
+
+        for i in range(spent_end, spent_end + n_added * HISTORY_SIZE, HISTORY_SIZE):
+            txn.delete(record[i:i + HISTORY_SIZE], db=history)
+
+        for i in range(created_end, spent_end, SPENT_SIZE):
+            outpoint = record[i:i + OUTPOINT_SIZE]
+            value = record[i + OUTPOINT_SIZE:i + SPENT_SIZE]
+            txn.put(outpoint, value, db=outputs)
+            txn.put(value[:KEY_SIZE] + outpoint, value[KEY_SIZE:], db=utxo)
+
+        for i in range(pos, created_end, CREATED_SIZE):
+            outpoint = record[i:i + OUTPOINT_SIZE]
+            txn.delete(outpoint, db=outputs)
+            txn.delete(record[i + OUTPOINT_SIZE:i + CREATED_SIZE] + outpoint, db=utxo)
+
+        txn.delete(packed_height, db=self._undo)
+        txn.delete(packed_height, db=self._blocks)
+
+        self.height = height - 1
+        self._pending += 1
+
+    def flush(self):
+        """Commits the pending blocks."""
+        if self._txn is not None:
+            self._txn.commit()
+            self._txn = None
+            self._pending = 0
+
+    def rollback(self):
+        """Discards the pending blocks, returning to the last committed one."""
+        if self._txn is not None:
+            self._txn.abort()
+            self._txn = None
+            self._pending = 0
+
+        with self.env.begin(db=self._blocks) as txn:
+            cursor = txn.cursor()
+            self.height = HEIGHT.unpack(cursor.key())[0] if cursor.last() else -1
+
+    def close(self):
+        """Commits the pending blocks and closes the database."""
+        self.flush()
+        self.env.close()
+
+    def _write(self):
+        if self._txn is None:
+            self._txn = self.env.begin(write=True)
+        return self._txn
+
+    def _get(self, key, db):
+        if self._txn is not None:
+            return self._txn.get(key, db=db)
+
+        with self.env.begin() as txn:
+            return txn.get(key, db=db)
+
+    def _scan(self, txn, db, prefix):
+        cursor = txn.cursor(db=db)
+        if cursor.set_range(prefix):
+            for key, value in cursor:
+                if not key.startswith(prefix):
+                    break
+                yield key, value
+
+    def unspents(self, address):
+        """Returns the unspents of an address.
+
+        :type address: ``str``
+        :rtype: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        prefix = address_key(address)
+        script = bytes_to_hex(address_to_scriptpubkey(address))
+        segwit = prefix[:1] != P2PKH
+
+        with self.env.begin() as txn:
+            cursor = txn.cursor(db=self._blocks)
+            tip = HEIGHT.unpack(cursor.key())[0] if cursor.last() else -1
+            return [
+                Unspent(amount, tip - height + 1, script, bytes_to_hex(key[KEY_SIZE:KEY_SIZE + 32]),
+                        HEIGHT.unpack(key[KEY_SIZE + 32:])[0], segwit)
+                for key, (amount, height) in (
+                    (key, VALUE.unpack(value)) for key, value in self._scan(txn, self._utxo, prefix)
+                )
+            ]
+
+    def balance(self, address):
+        """Returns the balance of an address in ufoshi.
+
+        :type address: ``str``
+        :rtype: ``int``
+        """
+        with self.env.begin() as txn:
+            return sum(VALUE.unpack(value)[0] for _, value in self._scan(txn, self._utxo, address_key(address)))
+
+    def transactions(self, address):
+        """Returns the IDs of the transactions involving an address, newest first.
+
+        :type address: ``str``
+        :rtype: ``list`` of ``str``
+        """
+        with self.env.begin() as txn:
+            txids = [bytes_to_hex(key[KEY_SIZE + HEIGHT.size:])
+                     for key, _ in self._scan(txn, self._history, address_key(address))]
+        txids.reverse()
+        return txids
+
+    async def get_balance(self, address):
+        return self.balance(address)
+
+    async def get_transactions(self, address):
+        return self.transactions(address)
+
+    async def get_unspent(self, address):
+        return self.unspents(address)
+
+    async def get_unspents_by_address(self, addresses):
+        return {address: self.unspents(address) for address in addresses}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,93 +1,466 @@
-import sys
+import asyncio
+import math
 import time
-from multiprocessing import Event, Process, Queue, Value, cpu_count
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import product
+from multiprocessing import Array, Event, Pool, Process, Queue, cpu_count
+from os import urandom
+from queue import Empty
 
-from coincurve import Context
-
-from aioufobit.base58 import BASE58_ALPHABET, b58encode_check
-from aioufobit.crypto import ECPrivateKey, ripemd160_sha256
+from aioufobit.base32 import encode_many as segwit_encode_many
+from aioufobit.base58 import BASE58_ALPHABET, b58decode, b58encode, b58encode_check, b58encode_check_many
+from aioufobit.constants import (
+    MAIN_BECH32_HRP, MAIN_PRIVATE_KEY, MAIN_PUBKEY_HASH, MAIN_SCRIPT_HASH, PRIVATE_KEY_COMPRESSED_PUBKEY
+)
+from aioufobit.crypto import ECPrivateKey, ECPublicKey, get_context, init_worker, ripemd160_sha256
+from aioufobit.curve import GROUP_ORDER
 from aioufobit.format import bytes_to_wif, public_key_to_address
 
+# Candidates checked between two looks at the shared counter and stop event.
+BATCH_SIZE = 1024
+# Keys generated per task of the bulk pipeline.
+CHUNK_SIZE = 1000
+
+KeyRecord = namedtuple('KeyRecord', ('wif', 'address', 'sw_address', 'bech32_address'))
+
 
 def generate_key_address_pair():  # pragma: no cover
-    private_key = ECPrivateKey()
+    private_key = ECPrivateKey(context=get_context())
     address = public_key_to_address(private_key.public_key.format())
-    return bytes_to_wif(private_key.secret), address
+    return bytes_to_wif(private_key.secret, compressed=True), address
 
 
-def generate_matching_address(prefix, cores='all'):  # pragma: no cover
+def generate_keys(count, cores=1, chunk_size=CHUNK_SIZE):
+    """Streams ``count`` independent random keys with their legacy, nested
+    segwit and native segwit addresses. Chunks of keys are generated by a
+    pool of ``cores`` processes, each reusing its context from
+    :func:`~aioufobit.crypto.get_context`.
 
-    for char in prefix:
-        if char not in BASE58_ALPHABET:
-            raise ValueError('{} is an invalid base58 encoded '
-                             'character.'.format(char))
+    :param count: The number of keys.
+    :type count: ``int``
+    :param cores: The number of worker processes or ``'all'``.
+    :param chunk_size: The number of keys per task.
+    :type chunk_size: ``int``
+    :rtype: generator of :class:`KeyRecord`
+    """
+    for chunk in generate_key_chunks(count, cores, chunk_size):
+        yield from chunk
 
-    if not prefix:
-        return generate_key_address_pair()
-    elif not prefix.startswith('1'):
-        prefix = '1' + prefix
 
+def generate_key_chunks(count, cores=1, chunk_size=CHUNK_SIZE):
+    """Like :func:`generate_keys`, but yields lists of up to ``chunk_size``
+    keys as soon as each is done, in order.
+
+    :rtype: generator of ``list`` of :class:`KeyRecord`
+    """
+    sizes = [chunk_size] * (count // chunk_size)
+    if count % chunk_size:
+        sizes.append(count % chunk_size)
+
+    cores = resolve_cores(cores)
+
+    if cores == 1:
+        for size in sizes:
+            yield generate_key_chunk(size)
+        return
+
+    with Pool(cores, initializer=init_worker) as pool:  # pragma: no cover
+        yield from pool.imap(generate_key_chunk, sizes)
+
+
+def write_keys(file, count, cores=1, chunk_size=CHUNK_SIZE):
+    """Writes ``count`` keys from :func:`generate_keys` as CSV with a
+    header, one chunk at a time.
+
+    :param file: A path or a text file object.
+    :type file: ``str`` or file
+    :returns: The number of keys written.
+    :rtype: ``int``
+    """
+    if isinstance(file, str):
+        with open(file, 'w') as f:
+            return write_keys(f, count, cores, chunk_size)
+
+    file.write(','.join(KeyRecord._fields) + '\n')
+
+    written = 0
+    for chunk in generate_key_chunks(count, cores, chunk_size):
+        file.write(''.join(','.join(record) + '\n' for record in chunk))
+        written += len(chunk)
+
+    return written
+
+
+def generate_key_chunk(count):
+    """Generates ``count`` keys and encodes their WIFs and addresses in
+    bulk.
+
+    :rtype: ``list`` of :class:`KeyRecord`
+    """
+    context = get_context()
+    from_secret = ECPublicKey.from_secret
+
+    # Only the public key is derived, PrivateKey objects would also
+    # compute an x-only key for each secret.
+    secrets = []
+    hashes = []
+    while len(secrets) < count:
+        secret = urandom(32)
+        if not 0 < int.from_bytes(secret, 'big') < GROUP_ORDER:  # pragma: no cover
+            continue
+        secrets.append(secret)
+        hashes.append(ripemd160_sha256(from_secret(secret, context=context).format()))
+
+    wifs = b58encode_check_many(MAIN_PRIVATE_KEY + secret + PRIVATE_KEY_COMPRESSED_PUBKEY for secret in secrets)
+    addresses = b58encode_check_many(MAIN_PUBKEY_HASH + hashed for hashed in hashes)
+    sw_addresses = b58encode_check_many(
+        MAIN_SCRIPT_HASH + ripemd160_sha256(b'\x00\x14' + hashed) for hashed in hashes
+    )
+    bech32_addresses = segwit_encode_many(MAIN_BECH32_HRP, 0, hashes)
+
+    return [KeyRecord(*record) for record in zip(wifs, addresses, sw_addresses, bech32_addresses)]
+
+
+def resolve_cores(cores):
     available_cores = cpu_count()
 
     if cores == 'all':
-        cores = available_cores
+        return available_cores
     elif 0 < int(cores) <= available_cores:
-        cores = int(cores)
+        return int(cores)
     else:
-        cores = 1
-
-    counter = Value('i')
-    match = Event()
-    queue = Queue()
-
-    workers = []
-    for _ in range(cores):
-        workers.append(
-            Process(
-                target=generate_key_address_pairs,
-                args=(prefix, counter, match, queue)
+        return 1
+
+
+VanityProgress = namedtuple('VanityProgress', (
+    'keys', 'keys_per_second', 'worker_keys_per_second', 'elapsed', 'expected', 'probability', 'eta'
+))
+
+
+def generate_matching_address(prefix, cores='all', case_sensitive=True, callback=None,
+                              interval=1.0):  # pragma: no cover
+    """Searches for a key whose address starts with ``prefix``.
+
+    :param prefix: One or more base58 prefixes, see :func:`prefix_ranges`.
+    :type prefix: ``str`` or ``list`` of ``str``
+    :param cores: The number of worker processes or ``'all'``.
+    :param case_sensitive: If ``False``, any case of the letters matches.
+    :type case_sensitive: ``bool``
+    :param callback: Called with a :class:`VanityProgress` every
+                     ``interval`` seconds while searching.
+    :returns: The compressed WIF and the address.
+    :rtype: ``tuple`` of ``str``
+    """
+    if not prefix:
+        return generate_key_address_pair()
+
+    return VanitySearch(prefix, cores, case_sensitive).run(callback, interval)
+
+
+class VanitySearch:
+    """A vanity address search running in worker processes. Use
+    :meth:`run` to block until a match, or iterate asynchronously over
+    its progress::
+
+        search = VanitySearch('Bufo')
+        async for progress in search:
+            print(progress.keys_per_second, progress.eta)
+        wif, address = search.result
+
+    :param prefix: One or more base58 prefixes, see :func:`prefix_ranges`.
+    :type prefix: ``str`` or ``list`` of ``str``
+    :param cores: The number of worker processes or ``'all'``.
+    :param case_sensitive: If ``False``, any case of the letters matches.
+    :type case_sensitive: ``bool``
+    """
+
+    def __init__(self, prefix, cores='all', case_sensitive=True):
+        self.prefixes, self.ranges = prefix_ranges(prefix, case_sensitive=case_sensitive)
+        self.difficulty = prefix_difficulty(self.ranges)
+
+        self.cores = resolve_cores(cores)
+        self.result = None
+
+        self._counters = None
+        self._match = None
+        self._queue = None
+        self._workers = []
+        self._started = None
+        self._last = None
+
+    def start(self):  # pragma: no cover
+        if self._workers:
+            return
+
+        self._counters = Array('Q', self.cores, lock=False)
+        self._match = Event()
+        self._queue = Queue()
+
+        for index in range(self.cores):
+            self._workers.append(
+                Process(
+                    target=generate_key_address_pairs,
+                    args=(self.prefixes, self._counters, self._match, self._queue,
+                          self.ranges, BATCH_SIZE, index)
+                )
             )
-        )
 
-    for worker in workers:
-        worker.start()
+        self._started = time.monotonic()
+        self._last = (self._started, [0] * self.cores)
+
+        for worker in self._workers:
+            worker.start()
 
-    keys_generated = 0
-    while True:
-        time.sleep(1)
-        current = counter.value
-        if current == keys_generated:
-            if current == 0:
+    def stop(self):  # pragma: no cover
+        """Stops and joins all workers."""
+        if self._match is not None:
+            self._match.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def poll(self, timeout=None):  # pragma: no cover
+        """Waits up to ``timeout`` seconds for a match.
+
+        :returns: The compressed WIF and the address, or ``None``.
+        """
+        if self.result is None:
+            try:
+                private_key, address = self._queue.get(timeout=timeout)
+            except Empty:
+                return None
+            self.result = (bytes_to_wif(private_key, compressed=True), address)
+            self.stop()
+        return self.result
+
+    def progress(self):  # pragma: no cover
+        """Measures the rates since the previous call.
+
+        :rtype: :class:`VanityProgress`
+        """
+        now = time.monotonic()
+        counts = list(self._counters)
+        last_time, last_counts = self._last
+        self._last = (now, counts)
+        return vanity_progress(counts, last_counts, now - last_time, now - self._started, self.difficulty)
+
+    def run(self, callback=None, interval=1.0):  # pragma: no cover
+        """Blocks until a match is found.
+
+        :param callback: Called with a :class:`VanityProgress` every
+                         ``interval`` seconds.
+        :returns: The compressed WIF and the address.
+        :rtype: ``tuple`` of ``str``
+        """
+        self.start()
+        try:
+            while self.poll(interval) is None:
+                if callback:
+                    callback(self.progress())
+        finally:
+            self.stop()
+        return self.result
+
+    async def watch(self, interval=1.0):  # pragma: no cover
+        """Yields a :class:`VanityProgress` every ``interval`` seconds until
+        a match is found and stored in :attr:`result`."""
+        self.start()
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self.poll(0) is not None:
+                    return
+                yield self.progress()
+        finally:
+            self.stop()
+
+    def __aiter__(self):  # pragma: no cover
+        return self.watch()
+
+
+def prefix_difficulty(ranges):
+    """The expected number of candidates until one falls in ``ranges``.
+
+    :rtype: ``float``
+    """
+    return (1 << 160) / sum(high - low + 1 for low, high in ranges)
+
+
+def vanity_progress(counts, last_counts, interval, elapsed, difficulty):
+    """Builds a :class:`VanityProgress` from per-worker key counts.
+
+    :param counts: The keys checked by each worker so far.
+    :param last_counts: The counts ``interval`` seconds ago.
+    :param elapsed: The seconds since the search started.
+    :param difficulty: See :func:`prefix_difficulty`.
+    """
+    keys = sum(counts)
+    worker_rates = [
+        (count - last) / interval if interval > 0 else 0.0 for count, last in zip(counts, last_counts)
+    ]
+    rate = sum(worker_rates)
+
+    if difficulty > 1:
+        # Every candidate is an independent trial.
+        per_key = math.log1p(-1 / difficulty)
+        probability = -math.expm1(keys * per_key)
+        # Keys until the chance of a match reaches one half.
+        half = math.log(0.5) / per_key
+    else:
+        # Every candidate matches.
+        probability = 1.0 if keys else 0.0
+        half = 1
+
+    eta = max(half - keys, 0) / rate if rate else None
+
+    return VanityProgress(keys, rate, worker_rates, elapsed, difficulty, probability, eta)
+
+
+def generate_key_address_pairs(prefixes, counter, match, queue, ranges=None,
+                               batch_size=BATCH_SIZE, index=None):  # pragma: no cover
+    # ``counter`` is either a shared value or, with ``index``, an array with
+    # a slot per worker that needs no lock.
+
+    if ranges is None:
+        prefixes, ranges = prefix_ranges(prefixes)
+    else:
+        prefixes = tuple(prefixes)
+
+    starts = [low for low, _ in ranges]
+    from_bytes = int.from_bytes
+
+    context = get_context()
+
+    # Consecutive keys k, k + 1, ... cost one point addition each
+    # instead of a full scalar multiplication.
+    private_key = ECPrivateKey(context=context)
+    secret = private_key.to_int()
+    point = private_key.public_key
+    generator = ECPrivateKey.from_int(1, context=context).public_key
+
+    while not match.is_set():
+        if secret + batch_size >= GROUP_ORDER:  # pragma: no cover
+            private_key = ECPrivateKey(context=context)
+            secret = private_key.to_int()
+            point = private_key.public_key
+
+        hashes, point = public_key_hashes(point, generator, batch_size, context)
+
+        for offset, hashed in enumerate(hashes):
+            # Only hashes within a prefix range are worth encoding.
+            number = from_bytes(hashed, 'big')
+            i = bisect_right(starts, number) - 1
+            if i < 0 or number > ranges[i][1]:
                 continue
-            break
-        keys_generated = current
-        s = 'Keys generated: {}\r'.format(keys_generated)
-        sys.stdout.write(s)
-        sys.stdout.flush()
 
-    private_key, address = queue.get()
-    print('\n\n'
-          'WIF: {}\n'
-          'Address: {}'.format(bytes_to_wif(private_key), address))
+            address = b58encode_check(MAIN_PUBKEY_HASH + hashed)
+            if address.startswith(prefixes):
+                match.set()
+                queue.put_nowait(((secret + offset).to_bytes(32, 'big'), address))
+                return
 
+        secret += batch_size
 
-def generate_key_address_pairs(prefix, counter, match, queue):  # pragma: no cover
+        if index is None:
+            with counter.get_lock():
+                counter.value += batch_size
+        else:
+            counter[index] += batch_size
 
-    context = Context()
 
-    while True:
-        if match.is_set():
-            return
+def prefix_ranges(prefixes, case_sensitive=True, version=MAIN_PUBKEY_HASH):
+    """Computes the ranges of public key hashes whose addresses may start
+    with any of ``prefixes``. A prefix not starting with a possible first
+    character of the address version is tried after each of them.
 
-        with counter.get_lock():
-            counter.value += 1
+    :param prefixes: One or more base58 prefixes.
+    :type prefixes: ``str`` or ``list`` of ``str``
+    :param case_sensitive: If ``False``, any case of the letters matches.
+    :type case_sensitive: ``bool``
+    :param version: The version byte of the addresses.
+    :type version: ``bytes``
+    :returns: The concrete prefixes and the sorted, disjoint inclusive
+              ranges of hashes as integers. Hashes at the edges of a range
+              may still miss the prefix because of their checksum.
+    :rtype: ``tuple`` of ``tuple`` of ``str`` and ``list`` of ``tuple``
+    :raises ValueError: If a prefix has invalid characters or no address
+                        can start with any of them.
+    """
+    if isinstance(prefixes, str):
+        prefixes = [prefixes]
 
-        private_key = ECPrivateKey(context=context)
-        address = b58encode_check(
-            b'\x00' + ripemd160_sha256(private_key.public_key.format())
-        )
+    base = int.from_bytes(version, 'big') << 192
+    top = base + (1 << 192) - 1
+    lowest = b58encode(base.to_bytes(25, 'big'))
+    highest = b58encode(top.to_bytes(25, 'big'))
+    first_chars = BASE58_ALPHABET[BASE58_ALPHABET.index(lowest[0]):BASE58_ALPHABET.index(highest[0]) + 1]
 
-        if address.startswith(prefix):
-            match.set()
-            queue.put_nowait((private_key.secret, address))
-            return
+    concrete = []
+    for prefix in prefixes:
+        for variant in _prefix_variants(prefix, case_sensitive):
+            if variant[0] in first_chars:
+                concrete.append(variant)
+            else:
+                concrete.extend(char + variant for char in first_chars)
+
+    ranges = []
+    matching = []
+    for prefix in concrete:
+        found = False
+        for length in range(len(lowest), len(highest) + 1):
+            if len(prefix) > length:
+                continue
+            low = max(int.from_bytes(b58decode(prefix.ljust(length, '1')), 'big'), base)
+            high = min(int.from_bytes(b58decode(prefix.ljust(length, 'z')), 'big'), top)
+            if low <= high:
+                ranges.append(((low - base) >> 32, (high - base) >> 32))
+                found = True
+        if found:
+            matching.append(prefix)
+
+    if not ranges:
+        raise ValueError('No address of version {} can start with {}.'.format(
+            version.hex(), ', '.join(prefixes)))
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for low, high in ranges[1:]:
+        if low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+
+    return tuple(matching), merged
+
+
+def _prefix_variants(prefix, case_sensitive):
+    options = []
+    for char in prefix:
+        if case_sensitive:
+            chars = [char] if char in BASE58_ALPHABET else []
+        else:
+            chars = sorted({c for c in (char.lower(), char.upper()) if c in BASE58_ALPHABET})
+        if not chars:
+            raise ValueError('{} is an invalid base58 encoded '
+                             'character.'.format(char))
+        options.append(chars)
+
+    return [''.join(chars) for chars in product(*options)]
+
+
+def public_key_hashes(point, generator, count, context):
+    """Hashes the compressed public keys ``point``, ``point + generator``,
+    ... of ``count`` consecutive private keys.
+
+    :returns: The hashes and the point following the last one.
+    :rtype: ``tuple`` of ``list`` of ``bytes`` and ``coincurve.PublicKey``
+    """
+    combine = ECPublicKey.combine_keys
+    hashes = []
+
+    for _ in range(count):
+        hashes.append(ripemd160_sha256(point.format()))
+        point = combine([point, generator], context=context)
+
+    return hashes, point
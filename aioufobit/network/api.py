@@ -49,4 +49,28 @@ class RPCAPI(object):
                 timeout=aiohttp.ClientTimeout(total=10),
             )
             
+            return response
+
+    async def make_batch_request(self, calls):
+        """Sends many calls in one JSON-RPC batch; call ``i`` gets id ``i``."""
+        async with aiohttp.ClientSession() as session:
+            session.verify_ssl = self.http_verify
+
+            response = await session.post(
+                self._url,
+                headers=self._headers,
+                data=json.dumps([
+                        {
+                        "method": method,
+                        "params": args or [],
+                        "jsonrpc": "2.0",
+                        "id": i
+                        }
+                        for i, (method, args) in enumerate(calls)
+                    ]),
+                timeout=aiohttp.ClientTimeout(total=60),
+            )
+
+            # Read while the session is open.
+            await response.read()
             return response
\ No newline at end of file
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from aioufobit.transaction import calc_txid
+
+from .meta import TX_TRUST_HIGH, TX_TRUST_LOW, TX_TRUST_MEDIUM
+from .rpc import RPCHost
+from .services import NetworkAPI
+
+# The outcomes of a broadcast attempt.
+ACCEPTED = 'accepted'
+KNOWN = 'known'
+CONFLICT = 'conflict'
+REJECTED = 'rejected'
+TRANSIENT = 'transient'
+
+# The states of a queued transaction.
+PENDING = 'pending'
+BROADCAST = 'broadcast'
+CONFIRMED = 'confirmed'
+FAILED = 'failed'
+
+EVENTS = ('broadcast', 'confirmation', 'failed')
+TRUST_LEVELS = (TX_TRUST_LOW, TX_TRUST_MEDIUM, TX_TRUST_HIGH)
+
+KNOWN_ERRORS = (
+    'already in block chain', 'already in mempool', 'already known', 'already have transaction',
+    'txn-already-in-mempool', 'txn-already-known',
+)
+CONFLICT_ERRORS = (
+    'txn-mempool-conflict', 'missingorspent', 'inputs-spent', 'already spent',
+    'insufficient fee', 'unspents were already used',
+)
+TRANSIENT_ERRORS = (
+    ConnectionError, asyncio.TimeoutError, OSError,
+)
+# Inputs are missing until the parent transaction reaches the provider.
+TRANSIENT_MESSAGES = (
+    'missing inputs', 'status code: 5',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def classify_error(error):
+    """Tells apart why a provider did not accept a transaction.
+
+    :param error: The exception raised by the provider.
+    :type error: ``Exception``
+    :returns: :data:`KNOWN` if the transaction is already in the mempool or
+              chain, :data:`CONFLICT` if its inputs are spent by another
+              one, :data:`TRANSIENT` if the provider could not be reached,
+              failed or misses its inputs, and :data:`REJECTED` otherwise.
+    :rtype: ``str``
+    """
+    message = str(error).lower()
+
+    if any(known in message for known in KNOWN_ERRORS):
+        return KNOWN
+    if any(conflict in message for conflict in CONFLICT_ERRORS):
+        return CONFLICT
+    if isinstance(error, TRANSIENT_ERRORS) or any(transient in message for transient in TRANSIENT_MESSAGES):
+        return TRANSIENT
+
+    return REJECTED
+
+
+def default_providers():
+    """Returns the broadcast providers of
+    :class:`~aioufobit.network.NetworkAPI`. A connected node submits with
+    ``sendrawtransaction``, which raises the node's error rather than
+    logging it, so the failure can be classified.
+
+    :rtype: ``list``
+    """
+    return [
+        api_call.__self__.sendrawtransaction if isinstance(getattr(api_call, '__self__', None), RPCHost)
+        else api_call
+        for api_call in NetworkAPI.BROADCAST_TX_MAIN
+    ]
+
+
+async def get_confirmations(txid):
+    """Returns the confirmations of a transaction from the network APIs, or
+    ``None`` if they do not know it.
+
+    :type txid: ``str``
+    :rtype: ``int``
+    """
+    tx = await NetworkAPI.get_tx(txid)
+    return tx.get('confirmations', 0) if tx else None
+
+
+class BroadcastQueue:
+    """Gets transactions into the chain. Each submitted transaction is sent
+    to all providers concurrently; transient failures are retried with
+    exponential backoff, transactions still unconfirmed after
+    ``rebroadcast_interval`` seconds or unknown to the network are sent
+    again until confirmed or in conflict with another one, and
+    confirmations are reported as they reach each trust level of
+    ``levels``. The queue is persisted to ``path`` so nothing is lost on
+    restart.
+
+    Callbacks subscribed to an event are called with:
+
+    - ``broadcast``: the txid, once a provider accepted the transaction
+    - ``confirmation``: the txid, the trust level reached and the actual
+      confirmations; the transaction is done after the last level
+    - ``failed``: the txid, :data:`CONFLICT`, :data:`REJECTED` or
+      :data:`TRANSIENT` after ``retries`` attempts, and the error
+
+    Callbacks may be coroutine functions.
+
+    :param providers: Coroutine functions submitting a transaction as hex and
+                      returning its txid and raising why it was not
+                      accepted, e.g. ``[node.sendrawtransaction]`` for an
+                      :class:`~aioufobit.network.rpc.RPCHost`. By default
+                      those of :func:`default_providers`.
+    :type providers: ``list``
+    :param confirmations: A coroutine function returning the confirmations
+                          of a txid, 0 if unconfirmed and ``None`` if
+                          unknown, e.g. ``node.get_confirmations``.
+    :param path: The path of the JSON file the queue is persisted to.
+    :type path: ``str``
+    :param levels: The confirmations to report.
+    :type levels: ``tuple`` of ``int``
+    :param retries: The number of failed attempts before giving up.
+    :type retries: ``int``
+    :param backoff: The seconds to wait after the first failed attempt,
+                    doubled after each further one.
+    :type backoff: ``int``
+    :param max_backoff: The maximum seconds between attempts.
+    :type max_backoff: ``int``
+    :param rebroadcast_interval: The seconds after which an unconfirmed
+                                 transaction is broadcast again.
+    :type rebroadcast_interval: ``int``
+    """
+
+    def __init__(self, providers=None, confirmations=get_confirmations, path=None, levels=TRUST_LEVELS,
+                 retries=10, backoff=1, max_backoff=300, rebroadcast_interval=600):
+        self.providers = providers
+        self.confirmations = confirmations
+        self.path = path
+        self.levels = tuple(sorted(levels))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rebroadcast_interval = rebroadcast_interval
+        self.callbacks = {event: [] for event in EVENTS}
+
+        # txid -> dict of tx_hex, state, attempts, next_attempt, confirmations, level
+        self.entries = {}
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def subscribe(self, event, callback):
+        """Calls ``callback`` for every ``broadcast``, ``confirmation`` or ``failed`` event.
+
+        :type event: ``str``
+        :type callback: ``callable``
+        """
+        if event not in self.callbacks:
+            raise ValueError('{} is not a supported event.'.format(event))
+
+        self.callbacks[event].append(callback)
+
+    def load(self):
+        """Loads the queue from its file."""
+        with open(self.path, 'r') as f:
+            self.entries = json.load(f)
+
+    def save(self):
+        """Atomically writes the queue to its file."""
+        if not self.path:
+            return
+
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.path)
+
+    def state(self, txid):
+        """Returns the state of a queued transaction, or ``None``.
+
+        :rtype: ``str``
+        """
+        entry = self.entries.get(txid)
+        return entry['state'] if entry else None
+
+    async def submit(self, tx_hex):
+        """Queues a transaction and makes the first broadcast attempt.
+
+        :param tx_hex: The signed transaction as hex.
+        :type tx_hex: ``str``
+        :returns: The transaction ID.
+        :rtype: ``str``
+        """
+        txid = calc_txid(tx_hex)
+
+        if txid not in self.entries:
+            self.entries[txid] = {
+                'tx_hex': tx_hex, 'state': PENDING, 'attempts': 0, 'next_attempt': 0,
+                'confirmations': 0, 'level': 0,
+            }
+            self.save()
+            await self._broadcast(txid)
+            self.save()
+
+        return txid
+
+    async def process(self):
+        """Checks the confirmations of broadcast transactions, rebroadcasting
+        those that are due, and retries pending ones whose backoff passed.
+        Finished transactions are dropped.
+        """
+        now = time.time()
+        due = [txid for txid, entry in self.entries.items()
+               if entry['state'] == BROADCAST or entry['state'] == PENDING and entry['next_attempt'] <= now]
+
+        await asyncio.gather(*(self._process(txid) for txid in due))
+
+        for txid in [txid for txid, entry in self.entries.items() if entry['state'] in (CONFIRMED, FAILED)]:
+            del self.entries[txid]
+
+        self.save()
+
+    async def run(self, interval=30):
+        """Processes the queue every ``interval`` seconds until cancelled."""
+        while True:
+            await self.process()
+            await asyncio.sleep(interval)
+
+    async def _process(self, txid):
+        entry = self.entries[txid]
+
+        if entry['state'] == PENDING:
+            await self._broadcast(txid)
+            return
+
+        try:
+            confirmations = await self.confirmations(txid)
+        except Exception as e:
+            logger.warning('Could not check confirmations of %s: %s', txid, e)
+            confirmations = 0
+
+        if confirmations:
+            entry['confirmations'] = confirmations
+            for level in self.levels:
+                if entry['level'] < level <= confirmations:
+                    entry['level'] = level
+                    if level == self.levels[-1]:
+                        entry['state'] = CONFIRMED
+                    await self._emit('confirmation', txid, level, confirmations)
+        elif confirmations is None or entry['next_attempt'] <= time.time():
+            # Unknown to the network, or unconfirmed for too long.
+            await self._broadcast(txid, unknown=confirmations is None)
+
+    async def _broadcast(self, txid, unknown=True):
+        entry = self.entries[txid]
+        providers = self.providers if self.providers is not None else default_providers()
+
+        results = await asyncio.gather(*(provider(entry['tx_hex']) for provider in providers),
+                                       return_exceptions=True)
+
+        outcomes = []
+        errors = []
+        for result in results:
+            if isinstance(result, BaseException):
+                outcomes.append(classify_error(result))
+                errors.append(result)
+            elif result:
+                outcomes.append(ACCEPTED)
+            else:
+                outcomes.append(REJECTED)
+                errors.append(ValueError('Transaction broadcast failed.'))
+
+        now = time.time()
+        entry['attempts'] += 1
+
+        if ACCEPTED in outcomes or KNOWN in outcomes:
+            first = entry['state'] == PENDING
+            entry['state'] = BROADCAST
+            entry['attempts'] = 0
+            entry['next_attempt'] = now + self.rebroadcast_interval
+            if first:
+                await self._emit('broadcast', txid)
+            return
+
+        if entry['state'] == BROADCAST and not (CONFLICT in outcomes and unknown):
+            # An accepted transaction is likely still in the mempool or
+            # mined, unless the network dropped it and its inputs are spent.
+            entry['attempts'] = 0
+            entry['next_attempt'] = now + self.rebroadcast_interval
+            return
+
+        if CONFLICT in outcomes:
+            reason = CONFLICT
+        elif TRANSIENT not in outcomes and outcomes:
+            reason = REJECTED
+        elif entry['attempts'] >= self.retries:
+            reason = TRANSIENT
+        else:
+            entry['next_attempt'] = now + min(self.backoff * 2 ** (entry['attempts'] - 1), self.max_backoff)
+            return
+
+        entry['state'] = FAILED
+        error = errors[0] if errors else None
+        logger.warning('Broadcast of %s failed (%s): %s', txid, reason, error)
+        await self._emit('failed', txid, reason, error)
+
+    async def _emit(self, event, *args):
+        for callback in self.callbacks[event]:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                await result
+
+    def __contains__(self, txid):
+        return txid in self.entries
+
+    def __len__(self):
+        return len(self.entries)
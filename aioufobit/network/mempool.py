@@ -0,0 +1,255 @@
+import asyncio
+from collections import OrderedDict, namedtuple
+
+from aioufobit.exceptions import UfoNodeException
+from aioufobit.format import scriptpubkey_index
+from aioufobit.transaction import parse_tx
+from aioufobit.utils import bytes_to_hex, gather_limited, hex_to_bytes
+
+DEFAULT_MAX_TRANSACTIONS = 100000
+EVENTS = ('payment', 'double_spend', 'remove')
+
+MempoolPayment = namedtuple('MempoolPayment', ('address', 'txid', 'txindex', 'amount'))
+
+
+class MempoolTracker:
+    """Keeps an in-memory view of the unconfirmed transactions of a node,
+    indexed by txid, by the outpoints they spend and by the watched
+    addresses they pay to. It is fed by :func:`~MempoolTracker.poll`, which
+    only fetches the transactions that are new since the last call, or by
+    a :class:`~aioufobit.network.notify.ZMQSubscriber`.
+
+    Only the spent outpoints of a transaction are kept, unless it pays to
+    a watched address. Beyond ``max_transactions`` the oldest transactions
+    are evicted.
+
+    Callbacks subscribed to an event are called with:
+
+    - ``payment``: a :class:`MempoolPayment` to a watched address
+    - ``double_spend``: ``(txid, txindex)`` of the outpoint, the txid of
+      the transaction spending it so far and the txid of the new spender,
+      which is either an accepted replacement or confirmed in a block
+    - ``remove``: the txid and why it left, one of ``'confirmed'``,
+      ``'replaced'``, ``'dropped'`` or ``'evicted'``
+
+    Callbacks may be coroutine functions.
+
+    :param rpc: The node to poll.
+    :type rpc: :class:`~aioufobit.network.rpc.RPCHost`
+    :param addresses: The addresses to watch for payments.
+    :type addresses: ``list`` of ``str``
+    :param max_transactions: The maximum number of tracked transactions.
+    :type max_transactions: ``int``
+    :param concurrency: The maximum number of requests in flight.
+    :type concurrency: ``int``
+    """
+
+    def __init__(self, rpc=None, addresses=(), max_transactions=DEFAULT_MAX_TRANSACTIONS,
+                 concurrency=10):
+        self.rpc = rpc
+        self.max_transactions = max_transactions
+        self.concurrency = concurrency
+        self.callbacks = {event: [] for event in EVENTS}
+
+        # scriptpubkey -> watched address
+        self._scripts = {}
+        # txid -> (spent outpoints, number of outputs), oldest first
+        self.transactions = OrderedDict()
+        # (txid, txindex) -> txid of the spending transaction
+        self.spends = {}
+        # txid -> transaction paying to watched addresses
+        self.relevant = {}
+        # address -> list of MempoolPayment
+        self.payments = {}
+        # txids in the mempool as of the last poll
+        self._polled = set()
+
+        self.watch(addresses)
+
+    def watch(self, addresses):
+        """Reports payments to more addresses.
+
+        :type addresses: ``list`` of ``str``
+        """
+        self._scripts.update(scriptpubkey_index(addresses))
+
+    def subscribe(self, event, callback):
+        """Calls ``callback`` for every ``payment``, ``double_spend`` or ``remove`` event.
+
+        :type event: ``str``
+        :type callback: ``callable``
+        """
+        if event not in self.callbacks:
+            raise ValueError('{} is not a supported event.'.format(event))
+
+        self.callbacks[event].append(callback)
+
+    def attach(self, subscriber):
+        """Feeds the tracker from ``subscriber``, polling the node after
+        missed messages.
+
+        :type subscriber: :class:`~aioufobit.network.notify.ZMQSubscriber`
+        """
+        subscriber.subscribe('rawtx', self.add_transaction)
+        subscriber.subscribe('rawblock', self.apply_block)
+        if self.rpc is not None:
+            subscriber.subscribe('gap', lambda topic, expected, received: self.poll())
+
+    def spender(self, txid, txindex):
+        """Returns the txid of the unconfirmed transaction spending an
+        outpoint, or ``None``.
+
+        :rtype: ``str``
+        """
+        return self.spends.get((txid, txindex))
+
+    def get_payments(self, address):
+        """Returns the unconfirmed payments to a watched address.
+
+        :rtype: ``list`` of :class:`MempoolPayment`
+        """
+        return list(self.payments.get(address, ()))
+
+    async def add_transaction(self, txid, tx):
+        """Adds a transaction accepted by the node. Transactions spending
+        the same outpoints are reported and removed as replaced.
+
+        :param txid: The ID of the transaction.
+        :type txid: ``str``
+        :type tx: :class:`~aioufobit.transaction.TxObj`
+        :returns: Whether the transaction was new.
+        :rtype: ``bool``
+        """
+        if txid in self.transactions:
+            return False
+
+        outpoints = tuple(
+            (bytes_to_hex(txin.txid[::-1]), int.from_bytes(txin.txindex, 'little')) for txin in tx.TxIn
+        )
+
+        await self._remove_conflicts(txid, outpoints, 'replaced')
+
+        for outpoint in outpoints:
+            self.spends[outpoint] = txid
+        self.transactions[txid] = (outpoints, len(tx.TxOut))
+
+        scripts = self._scripts
+        for txindex, txout in enumerate(tx.TxOut):
+            address = scripts.get(txout.script)
+            if address is None:
+                continue
+            payment = MempoolPayment(address, txid, txindex, int.from_bytes(txout.value, 'little'))
+            self.payments.setdefault(address, []).append(payment)
+            self.relevant[txid] = tx
+            await self._emit('payment', payment)
+
+        while len(self.transactions) > self.max_transactions:
+            await self.remove_transaction(next(iter(self.transactions)), 'evicted')
+
+        return True
+
+    async def remove_transaction(self, txid, reason='dropped'):
+        """Removes a transaction from the view.
+
+        :param txid: The ID of the transaction.
+        :type txid: ``str``
+        :param reason: Why the transaction left the mempool.
+        :type reason: ``str``
+        :returns: Whether the transaction was tracked.
+        :rtype: ``bool``
+        """
+        entry = self.transactions.pop(txid, None)
+        if entry is None:
+            return False
+
+        for outpoint in entry[0]:
+            if self.spends.get(outpoint) == txid:
+                del self.spends[outpoint]
+
+        tx = self.relevant.pop(txid, None)
+        if tx is not None:
+            for txout in tx.TxOut:
+                address = self._scripts.get(txout.script)
+                if address in self.payments:
+                    self.payments[address] = [p for p in self.payments[address] if p.txid != txid]
+                    if not self.payments[address]:
+                        del self.payments[address]
+
+        await self._emit('remove', txid, reason)
+        return True
+
+    async def apply_block(self, block):
+        """Removes the transactions confirmed by a block along with those
+        conflicting with it.
+
+        :type block: :class:`~aioufobit.block.Block`
+        """
+        for txid, tx in block.transactions:
+            if await self.remove_transaction(txid, 'confirmed'):
+                continue
+            await self._remove_conflicts(txid, [
+                (bytes_to_hex(txin.txid[::-1]), int.from_bytes(txin.txindex, 'little')) for txin in tx.TxIn
+            ], 'replaced')
+
+    async def poll(self):
+        """Brings the view up to date with the node's mempool, fetching only
+        the transactions that appeared since the last poll.
+
+        :returns: The number of added transactions.
+        :rtype: ``int``
+        """
+        current = set(await self.rpc.getrawmempool())
+
+        for txid in [txid for txid in self.transactions if txid not in current]:
+            await self.remove_transaction(txid, 'dropped')
+
+        new = [txid for txid in current if txid not in self._polled and txid not in self.transactions]
+        self._polled = current
+
+        raws = await gather_limited((self._fetch(txid) for txid in new), self.concurrency)
+
+        added = 0
+        for txid, raw in zip(new, raws):
+            if raw is not None:
+                tx, _, _ = parse_tx(hex_to_bytes(raw))
+                added += await self.add_transaction(txid, tx)
+
+        return added
+
+    async def _fetch(self, txid):
+        try:
+            return await self.rpc.get_transaction_by_id(txid)
+        except UfoNodeException:
+            # Confirmed or evicted since the mempool was listed.
+            return None
+
+    async def _remove_conflicts(self, txid, outpoints, reason):
+        for outpoint in outpoints:
+            other = self.spends.get(outpoint)
+            if other is not None and other != txid:
+                await self._emit('double_spend', outpoint, other, txid)
+                await self._remove_with_descendants(other, reason)
+
+    async def _remove_with_descendants(self, txid, reason):
+        entry = self.transactions.get(txid)
+        if entry is None:
+            return
+
+        for txindex in range(entry[1]):
+            child = self.spends.get((txid, txindex))
+            if child is not None:
+                await self._remove_with_descendants(child, reason)
+
+        await self.remove_transaction(txid, reason)
+
+    async def _emit(self, event, *args):
+        for callback in self.callbacks[event]:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                await result
+
+    def __contains__(self, txid):
+        return txid in self.transactions
+
+    def __len__(self):
+        return len(self.transactions)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+
+from aioufobit.block import parse_block
+from aioufobit.transaction import parse_tx
+from aioufobit.utils import bytes_to_hex
+
+try:
+    import zmq
+    import zmq.asyncio
+except ImportError:  # pragma: no cover
+    zmq = None
+
+TOPICS = ('rawtx', 'rawblock', 'hashblock')
+GAP = 'gap'
+
+logger = logging.getLogger(__name__)
+
+
+class ZMQSubscriber:
+    """Receives new transactions and blocks pushed by a node started with
+    e.g. ``-zmqpubrawtx=tcp://127.0.0.1:28332``, instead of polling for
+    them. Messages are parsed once and handed to the callbacks subscribed
+    to their topic:
+
+    - ``rawtx``: ``callback(txid, tx)``
+    - ``rawblock``: ``callback(block)`` with a :class:`~aioufobit.block.Block`
+    - ``hashblock``: ``callback(block_hash)``
+    - ``gap``: ``callback(topic, expected, received)`` when messages were
+      missed, i.e. the node's sequence numbers skipped some. State kept up
+      to date by notifications must then be refreshed.
+
+    Callbacks may be coroutine functions. Requires ``pyzmq``.
+
+    :param address: The ZMQ endpoint of the node.
+    :type address: ``str``
+    :param topics: The topics to receive; by default those having callbacks.
+    :type topics: ``list`` of ``str``
+    :param context: The ZMQ context to use.
+    :type context: ``zmq.asyncio.Context``
+    """
+
+    def __init__(self, address, topics=None, context=None):
+        if zmq is None:
+            raise ImportError('ZMQSubscriber requires pyzmq.')
+
+        if topics is not None:
+            for topic in topics:
+                if topic not in TOPICS:
+                    raise ValueError('{} is not a supported topic.'.format(topic))
+
+        self.address = address
+        self.topics = topics
+        self.context = context or zmq.asyncio.Context.instance()
+        self.callbacks = {topic: [] for topic in TOPICS + (GAP,)}
+        self.sequences = {}
+        self.socket = None
+
+    def subscribe(self, topic, callback):
+        """Calls ``callback`` for every message of ``topic``.
+
+        :type topic: ``str``
+        :type callback: ``callable``
+        """
+        if topic not in self.callbacks:
+            raise ValueError('{} is not a supported topic.'.format(topic))
+
+        self.callbacks[topic].append(callback)
+
+    def watch_wallet(self, wallet):
+        """Keeps the unspents of ``wallet`` up to date from notifications;
+        after missed messages the wallet is refreshed from its backend.
+
+        :type wallet: :class:`~aioufobit.Wallet`
+        """
+        self.subscribe('rawtx', wallet.apply_transaction)
+        self.subscribe('rawblock', lambda block: wallet.apply_block(block.transactions))
+        self.subscribe(GAP, lambda topic, expected, received: wallet.refresh())
+
+    def connect(self):
+        """Connects to the node and subscribes to the topics."""
+        if self.socket is not None:
+            return
+
+        topics = self.topics
+        if topics is None:
+            topics = [topic for topic in TOPICS if self.callbacks[topic]] or TOPICS
+
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.connect(self.address)
+        for topic in topics:
+            self.socket.setsockopt(zmq.SUBSCRIBE, topic.encode())
+
+    def close(self):
+        """Disconnects from the node."""
+        if self.socket is not None:
+            self.socket.close(linger=0)
+            self.socket = None
+            self.sequences.clear()
+
+    async def receive(self):
+        """Receives and dispatches a single message.
+
+        :returns: The topic of the message.
+        :rtype: ``str``
+        """
+        self.connect()
+        topic, body, *rest = await self.socket.recv_multipart()
+        topic = topic.decode()
+        await self.dispatch(topic, body, int.from_bytes(rest[0], 'little') if rest else None)
+        return topic
+
+    async def run(self):
+        """Receives and dispatches messages until cancelled."""
+        self.connect()
+        try:
+            while True:
+                await self.receive()
+        finally:
+            self.close()
+
+    async def dispatch(self, topic, body, sequence=None):
+        """Parses a message and calls the callbacks subscribed to it.
+
+        :param topic: The topic of the message.
+        :type topic: ``str``
+        :param body: The body of the message.
+        :type body: ``bytes``
+        :param sequence: The sequence number of the message.
+        :type sequence: ``int``
+        """
+        if sequence is not None:
+            expected = self.sequences.get(topic)
+            self.sequences[topic] = (sequence + 1) & 0xffffffff
+            if expected is not None and sequence != expected:
+                await self._call(GAP, topic, expected, sequence)
+
+        callbacks = self.callbacks.get(topic)
+        if not callbacks:
+            return
+
+        if topic == 'rawtx':
+            tx, txid, _ = parse_tx(body)
+            await self._call(topic, txid, tx)
+        elif topic == 'rawblock':
+            await self._call(topic, parse_block(body))
+        elif topic == 'hashblock':
+            await self._call(topic, bytes_to_hex(body))
+
+    async def _call(self, topic, *args):
+        for callback in self.callbacks[topic]:
+            try:
+                result = callback(*args)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception('Callback for %s failed', topic)
+
+    async def __aenter__(self):
+        self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
@@ -11,6 +11,10 @@ from aioufobit.constants import UFO, UFOSHI
 from aioufobit.network import currency_to_ufoshi
 from aioufobit.network.meta import Unspent
 from aioufobit.exceptions import UfoNodeException
+from aioufobit.utils import gather_limited
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_PAYLOAD_CACHE_SIZE = 1024
 
 class RPCHost(RPCAPI):
     def __init__(self, user: str, password: str, host: str, port: int, use_https: bool):
@@ -43,10 +47,71 @@ class RPCHost(RPCAPI):
             raise UfoNodeException("Error in RPC call: " + str(responseJSON["error"]))
         return responseJSON["result"]
 
+    async def rpc_batch(self, calls, batch_size=DEFAULT_BATCH_SIZE, concurrency=4, return_exceptions=False):
+        """Send many rpc calls to UFO node as JSON-RPC batches, saving a
+        round trip per call. The node runs the calls of a batch in order.
+
+        Args:
+            calls (list): [(method, args), ...]
+            batch_size (int): calls per request
+            concurrency (int): maximum number of requests in flight
+            return_exceptions (bool): return a failed call's UfoNodeException
+                in its place instead of raising it
+
+        Raises:
+            ConnectionError: If request failed
+            UfoNodeException: If rpc call failed
+
+        Returns:
+            list: rpc responses, in the order of ``calls``
+        """
+        calls = list(calls)
+        batches = await gather_limited(
+            (self._rpc_batch(calls[i:i + batch_size]) for i in range(0, len(calls), batch_size)),
+            concurrency
+        )
+        results = [result for batch in batches for result in batch]
+
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, UfoNodeException):
+                    raise result
+
+        return results
+
+    async def _rpc_batch(self, calls):
+        try:
+            response = await self.make_batch_request(calls)
+        except aiohttp.ClientConnectionError:
+            raise ConnectionError
+        if response.status not in (200, 500):
+            raise UfoNodeException("RPC connection failure: " + str(response.status) + " " + await response.text())
+        responseJSON = await response.json()
+        # The whole batch was rejected.
+        if isinstance(responseJSON, dict):
+            raise UfoNodeException("Error in RPC call: " + str(responseJSON.get("error")))
+
+        # Responses may come in any order.
+        by_id = {item.get("id"): item for item in responseJSON}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            item = by_id.get(i)
+            if item is None:
+                results.append(UfoNodeException("No response to RPC call: " + method))
+            elif item.get("error") is not None:
+                results.append(UfoNodeException("Error in RPC call: " + str(item["error"])))
+            else:
+                results.append(item["result"])
+        return results
+
     async def getmempoolinfo(self):
         """Returns details on the active state of the TX memory pool."""
         return await self.rpc_call("getmempoolinfo", [])
 
+    async def getrawmempool(self, verbose: bool = False):
+        """Returns all transaction ids in memory pool; details per transaction if verbose."""
+        return await self.rpc_call("getrawmempool", [verbose])
+
     async def getmininginfo(self):
         """Returns a json object containing mining-related information."""
         return await self.rpc_call("getmininginfo", [])
@@ -75,6 +140,14 @@ class RPCHost(RPCAPI):
         """Returns the number of blocks in the longest blockchain."""
         return await self.rpc_call("getblockcount", [])
 
+    async def getblock(self, blockhash: str, verbosity: int = 1):
+        """Returns the block with the given hash; serialized as hex if verbosity is 0."""
+        return await self.rpc_call("getblock", [blockhash, verbosity])
+
+    async def get_raw_block(self, blockhash: str):
+        """Returns the serialized block with the given hash as bytes."""
+        return bytes.fromhex(await self.getblock(blockhash, 0))
+
     async def getwalletinfo(self):
         """Returns an object containing various wallet state info."""
         return await self.rpc_call("getwalletinfo", [])
@@ -162,32 +235,67 @@ class RPCHost(RPCAPI):
 
     async def get_unspents(self, addresses: list):
         unspents = []
-        
-        for address in addresses:
-            unspents += (await self.get_unspent(address))
+
+        for address_unspents in (await self.get_unspents_by_address(addresses)).values():
+            unspents += address_unspents
 
         return unspents
 
+    async def get_unspents_by_address(self, addresses: list):
+        """Fetches the unspents of many addresses with a single ``listunspent`` call.
+
+        Returns:
+            dict: address -> list of Unspent
+        """
+        response = await self.rpc_call("listunspent", [0, 9999999, addresses])
+        unspents = {address: [] for address in addresses}
+        for tx in response:
+            unspents.setdefault(tx["address"], []).append(await self._to_unspent(tx))
+        return unspents
+
     async def get_unspent(self, address):
         response = await self.rpc_call("listunspent", [0, 9999999, [address]])
-        return [
-            Unspent(
-                await currency_to_ufoshi(tx["amount"], "ufo"),
-                tx["confirmations"],
-                tx["scriptPubKey"],
-                tx["txid"],
-                tx["vout"],
-                True if tx['address'][0] == 'U' else False
-            )
-            for tx in response
-        ]
+        return [await self._to_unspent(tx) for tx in response]
+
+    async def _to_unspent(self, tx):
+        return Unspent(
+            await currency_to_ufoshi(tx["amount"], "ufo"),
+            tx["confirmations"],
+            tx["scriptPubKey"],
+            tx["txid"],
+            tx["vout"],
+            True if tx['address'][0] == 'U' or tx['scriptPubKey'][:2] == '00' else False
+        )
 
     async def get_unspent_testnet(self, address):
         return await self.rpc_call("get_unspent", [address])
 
+    async def getrawtransaction(self, txid: str, verbose: bool = False):
+        """Returns the raw transaction as hex, or an object describing it if verbose."""
+        return await self.rpc_call("getrawtransaction", [txid, verbose])
+
+    async def get_confirmations(self, txid):
+        """Returns the number of confirmations of a transaction, 0 while it
+        is in the mempool or ``None`` if the node does not know it."""
+        try:
+            tx = await self.getrawtransaction(txid, True)
+        except UfoNodeException as e:
+            if "No such mempool or blockchain transaction" in str(e):
+                return None
+            raise
+        return tx.get("confirmations", 0)
+
+    async def sendrawtransaction(self, tx_hex):
+        """Submits a raw transaction to the node and returns its txid.
+
+        Raises:
+            UfoNodeException: If the node rejects the transaction
+        """
+        return await self.rpc_call("sendrawtransaction", [tx_hex])
+
     async def broadcast_tx(self, tx_hex):
         try:
-            tx_hex = await self.rpc_call("sendrawtransaction", [tx_hex])
+            tx_hex = await self.sendrawtransaction(tx_hex)
         except UfoNodeException as e:
             logging.warning(e)
             return None
@@ -197,6 +305,23 @@ class RPCHost(RPCAPI):
         return await self.broadcast_tx(tx_hex)
 
 class OMNIRPCHost(RPCHost):
+    def __init__(self, user: str, password: str, host: str, port: int, use_https: bool,
+                 payload_cache_size: int = DEFAULT_PAYLOAD_CACHE_SIZE):
+        super().__init__(user, password, host, port, use_https)
+        # Payloads only depend on the token definition.
+        self.payload_cache_size = payload_cache_size
+        self._payloads = {}
+
+    async def _create_payload(self, method, args):
+        key = (method, tuple(args))
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = await self.rpc_call(method, args)
+            if len(self._payloads) >= self.payload_cache_size:
+                del self._payloads[next(iter(self._payloads))]
+            self._payloads[key] = payload
+        return payload
+
     async def omni_createpayload_issuancefixed(self, ecosystem: int, type: int, previousid: int, category: str, subcategory: str, name: str, url: str, data: str, amount: str) -> str:
         """
         Arguments:
@@ -218,7 +343,7 @@ class OMNIRPCHost(RPCHost):
                         
         9. amount         (string, required) the number of tokens to create
         """
-        return await self.rpc_call("omni_createpayload_issuancefixed", [ecosystem, type, previousid, category, subcategory, name, url, data, amount])
+        return await self._create_payload("omni_createpayload_issuancefixed", [ecosystem, type, previousid, category, subcategory, name, url, data, amount])
 
     async def omni_createpayload_issuancemanaged(self, ecosystem: int, type: int, previousid: int, category: str, subcategory: str, name: str, url: str, data: str) -> str:
         """
@@ -243,7 +368,7 @@ class OMNIRPCHost(RPCHost):
                         
         8. data           (string, required) a description for the new tokens (can be "")
         """
-        return await self.rpc_call("omni_createpayload_issuancemanaged", [ecosystem, type, previousid, category, subcategory, name, url, data])
+        return await self._create_payload("omni_createpayload_issuancemanaged", [ecosystem, type, previousid, category, subcategory, name, url, data])
 
     async def omni_getbalance(self, address: str, propertyid: int):
         """
@@ -256,6 +381,22 @@ class OMNIRPCHost(RPCHost):
         """
         return await self.rpc_call("omni_getbalance", [address, propertyid])
 
+    async def omni_getbalances(self, addresses: list, propertyids: list):
+        """
+        Returns the token balances of many addresses and properties in batched calls.
+
+        Arguments:
+        1. addresses     (list, required) the addresses
+
+        2. propertyids   (list, required) the property identifiers
+
+        Result:
+        dict: (address, propertyid) -> {"balance": "n.nnn", "reserved": "n.nnn", ...}
+        """
+        keys = [(address, propertyid) for address in addresses for propertyid in propertyids]
+        results = await self.rpc_batch(("omni_getbalance", [address, propertyid]) for address, propertyid in keys)
+        return dict(zip(keys, results))
+
     async def omni_gettransaction(self, txid: str):
         return await self.rpc_call("omni_gettransaction", [txid])
     
@@ -292,6 +433,44 @@ class OMNIRPCHost(RPCHost):
         """
         return await self.rpc_call("omni_sendgrant", [from_address, to_address, propertyid, str(amount)])
 
+    async def omni_send_many(self, from_address: str, recipients: list, propertyid: int):
+        """
+        Create and broadcast simple send transactions to many receivers in batched calls.
+
+        Arguments:
+        1. from_address    (string, required) the address to send from
+
+        2. recipients      (list, required) (to_address, amount) of every receiver
+
+        3. propertyid      (numeric, required) the identifier of the tokens to send
+
+        Result:
+        list: the txid of every send, or the UfoNodeException it failed with
+        """
+        return await self.rpc_batch(
+            (("omni_send", [from_address, to_address, propertyid, str(amount)]) for to_address, amount in recipients),
+            return_exceptions=True
+        )
+
+    async def omni_sendgrant_many(self, from_address: str, recipients: list, propertyid: int):
+        """
+        Grant new units of managed tokens to many receivers in batched calls.
+
+        Arguments:
+        1. from_address    (string, required) the address to send from
+
+        2. recipients      (list, required) (to_address, amount) of every receiver
+
+        3. propertyid      (numeric, required) the identifier of the tokens to grant
+
+        Result:
+        list: the txid of every grant, or the UfoNodeException it failed with
+        """
+        return await self.rpc_batch(
+            (("omni_sendgrant", [from_address, to_address, propertyid, str(amount)]) for to_address, amount in recipients),
+            return_exceptions=True
+        )
+
     async def create_nft(self, ecosystem: int, category: str, subcategory: str, name: str, url: str, data: str) -> str:
         """
         omni_createpayload_issuancemanaged ecosystem type previousid "category" "subcategory" "name" "url" "data"
@@ -56,7 +56,7 @@ class UFO(API):
                            tx['scriptPubKey'],
                            tx['txid'],
                            tx['vout'],
-                           True if tx['address'][0] == 'U' else False)  # sic! typo in api itself
+                           True if tx['address'][0] == 'U' or tx['scriptPubKey'][:2] == '00' else False)  # sic! typo in api itself
                    for tx in (await response.json())
                ][::-1]
 
@@ -69,7 +69,7 @@ class UFO(API):
 
     @classmethod
     async def get_transactions(self, address):
-        response = await self.make_request(self.MAIN_ENDPOINT + f'addr/{address}')
+        response = await self.make_request(self.MAIN_ENDPOINT + f'/addr/{address}')
         if response.status >= 400:
             raise Exception(f"Error with status code: {response.status}")
         return [tx['txid'] for tx in (await response.json())['txs']]
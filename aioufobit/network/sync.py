@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import os
+
+from aioufobit.block import Block, iter_transactions, parse_header
+
+DEFAULT_WINDOW = 16
+DEFAULT_REORG_DEPTH = 100
+EVENTS = ('connect', 'disconnect', 'save', 'rollback')
+
+logger = logging.getLogger(__name__)
+
+
+class ChainSync:
+    """Follows the best chain of a node through its RPC interface. Blocks
+    are fetched in parallel windows ahead of the tip, the next window while
+    the current one is being connected, and reorganizations are detected
+    by comparing the stored hashes of recent blocks with the node's.
+
+    Callbacks subscribed to an event are called in chain order:
+
+    - ``connect``: ``callback(height, block)`` with a
+      :class:`~aioufobit.block.Block` whose ``transactions`` is an iterator
+      parsing the transactions as they are consumed
+    - ``disconnect``: ``callback(height, block_hash)``, tip first, when a
+      block left the best chain
+    - ``save``: ``callback()`` whenever the progress is saved, after every
+      window; state built by the other callbacks should be committed then
+    - ``rollback``: ``callback()`` when the sync failed; state built since
+      the last save should be discarded then
+
+    Callbacks of ``connect`` and ``disconnect`` may be coroutine functions. An exception raised by a callback
+    stops the sync and returns it to the last saved progress, so the
+    blocks since then are delivered again on the next run.
+
+    :param rpc: The node to follow.
+    :type rpc: :class:`~aioufobit.network.rpc.RPCHost`
+    :param checkpoint: The path of a JSON file where the progress is saved
+                       after every window and loaded from on creation.
+    :type checkpoint: ``str``
+    :param start_height: The first block to connect without a checkpoint.
+    :type start_height: ``int``
+    :param window: The number of blocks fetched at once.
+    :type window: ``int``
+    :param reorg_depth: The number of recent block hashes kept for
+                        detecting reorganizations.
+    :type reorg_depth: ``int``
+    """
+
+    def __init__(self, rpc, checkpoint=None, start_height=0, window=DEFAULT_WINDOW,
+                 reorg_depth=DEFAULT_REORG_DEPTH):
+        if window < 1:
+            raise ValueError('The window must be at least 1.')
+
+        self.rpc = rpc
+        self.checkpoint = checkpoint
+        self.window = window
+        self.reorg_depth = reorg_depth
+        self.callbacks = {event: [] for event in EVENTS}
+
+        self.height = start_height - 1
+        # height -> block hash of the most recent blocks
+        self.hashes = {}
+
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+        self._saved = (self.height, dict(self.hashes))
+
+    @property
+    def tip(self):
+        """The hash of the last connected block, or ``None``."""
+        return self.hashes.get(self.height)
+
+    def subscribe(self, event, callback):
+        """Calls ``callback`` for every ``connect``, ``disconnect``, ``save``
+        or ``rollback`` event.
+
+        :type event: ``str``
+        :type callback: ``callable``
+        """
+        if event not in self.callbacks:
+            raise ValueError('{} is not a supported event.'.format(event))
+
+        self.callbacks[event].append(callback)
+
+    def load(self):
+        """Loads the progress from the checkpoint file."""
+        with open(self.checkpoint, 'r') as f:
+            data = json.load(f)
+
+        self.height = data['height']
+        self.hashes = {int(height): block_hash for height, block_hash in data['hashes'].items()}
+
+    def save(self):
+        """Atomically writes the progress to the checkpoint file."""
+        for callback in self.callbacks['save']:
+            callback()
+
+        self._saved = (self.height, dict(self.hashes))
+
+        if not self.checkpoint:
+            return
+
+        temp = self.checkpoint + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'height': self.height, 'hashes': self.hashes}, f)
+        os.replace(temp, self.checkpoint)
+
+    def rollback(self):
+        """Returns to the last saved progress."""
+        self.height, hashes = self._saved
+        self.hashes = dict(hashes)
+
+        for callback in self.callbacks['rollback']:
+            callback()
+
+    async def sync(self):
+        """Connects blocks until the node's tip is reached, disconnecting
+        blocks that left the best chain first.
+
+        :returns: The number of connected blocks.
+        :rtype: ``int``
+        """
+        connected = 0
+        self._saved = (self.height, dict(self.hashes))
+
+        try:
+            while True:
+                tip = await self.rpc.getblockcount()
+                await self._rewind(tip)
+                if self.height >= tip:
+                    break
+
+                count, complete = await self._connect_range(tip)
+                connected += count
+                if complete:
+                    break
+        except BaseException:
+            self.rollback()
+            raise
+
+        self.save()
+        return connected
+
+    async def run(self, interval=10, subscriber=None):
+        """Keeps syncing until cancelled, every ``interval`` seconds or as
+        soon as a :class:`~aioufobit.network.notify.ZMQSubscriber` announces
+        a new block.
+
+        :param interval: The seconds between polls.
+        :type interval: ``int``
+        :param subscriber: A running subscriber receiving ``hashblock``.
+        """
+        new_block = asyncio.Event()
+
+        if subscriber is not None:
+            subscriber.subscribe('hashblock', lambda block_hash: new_block.set())
+
+        while True:
+            await self.sync()
+            try:
+                await asyncio.wait_for(new_block.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            new_block.clear()
+
+    async def _connect_range(self, tip):
+        # Returns the number of connected blocks and whether ``tip`` was
+        # reached without the chain changing underneath.
+        connected = 0
+        start = self.height + 1
+        pending = asyncio.ensure_future(self._fetch(start, min(start + self.window, tip + 1)))
+
+        try:
+            while pending is not None:
+                blocks = await pending
+                start += len(blocks)
+                pending = None
+                if start <= tip:
+                    pending = asyncio.ensure_future(self._fetch(start, min(start + self.window, tip + 1)))
+
+                for block_hash, raw in blocks:
+                    header = parse_header(raw)
+                    if self.height in self.hashes and header.prev_hash != self.hashes[self.height]:
+                        logger.info('Reorganization detected at height %d', self.height + 1)
+                        return connected, False
+
+                    await self._connect(block_hash, header, raw)
+                    connected += 1
+
+                self.save()
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+
+        return connected, True
+
+    async def _fetch(self, start, stop):
+        hashes = await asyncio.gather(*(self.rpc.getblockhash(height) for height in range(start, stop)))
+        raws = await asyncio.gather(*(self.rpc.get_raw_block(block_hash) for block_hash in hashes))
+        return list(zip(hashes, raws))
+
+    async def _connect(self, block_hash, header, raw):
+        height = self.height + 1
+
+        for callback in self.callbacks['connect']:
+            result = callback(height, Block(block_hash, header, iter_transactions(raw)))
+            if asyncio.iscoroutine(result):
+                await result
+
+        self.height = height
+        self.hashes[height] = block_hash
+        self.hashes.pop(height - self.reorg_depth, None)
+
+    async def _rewind(self, tip):
+        while self.height in self.hashes:
+            if self.height <= tip and await self.rpc.getblockhash(self.height) == self.hashes[self.height]:
+                return
+
+            block_hash = self.hashes.pop(self.height)
+            for callback in self.callbacks['disconnect']:
+                result = callback(self.height, block_hash)
+                if asyncio.iscoroutine(result):
+                    await result
+            self.height -= 1
+
+            if not self.hashes and self.height >= 0:
+                raise ValueError('Reorganization deeper than the {} kept blocks.'.format(self.reorg_depth))
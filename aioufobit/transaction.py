@@ -1,19 +1,16 @@
 import logging
 from collections import namedtuple
-from itertools import islice
 import re
 
 from .crypto import double_sha256, sha256
 from .exceptions import InsufficientFunds
-from .format import address_to_public_key_hash, segwit_scriptpubkey, TEST_SCRIPT_HASH, MAIN_SCRIPT_HASH
+from .format import address_to_scriptpubkey, get_version
 from .network import NetworkAPI
 from .network.rates import currency_to_ufoshi_cached
 from .utils import (
-    bytes_to_hex, chunk_data, hex_to_bytes, int_to_unknown_bytes, int_to_varint, script_push, get_signatures_from_script
+    bytes_to_hex, chunk_data, hex_to_bytes, int_to_unknown_bytes, int_to_varint, read_varint, script_push,
+    get_signatures_from_script
 )
-from .format import verify_sig, get_version
-from .base58 import b58decode_check
-from .base32 import decode as segwit_decode
 
 from .constants import *
 
@@ -144,8 +141,94 @@ class TxObj:
 
 
 def calc_txid(tx_hex):
-    # return bytes_to_hex(double_sha256(hex_to_bytes(tx_hex))[::-1])
-    return tx_hex
+    return parse_tx(hex_to_bytes(tx_hex))[1]
+
+
+def calc_vsize(tx_hex):
+    """Returns the virtual size of a signed transaction, counting witness
+    data at a quarter of its size.
+
+    :param tx_hex: The transaction as hex.
+    :type tx_hex: ``str``
+    :rtype: ``int``
+    """
+    data = hex_to_bytes(tx_hex)
+    tx, _, size = parse_tx(data)
+
+    # Marker, flag and witnesses are left out of the stripped size.
+    stripped = size
+    if data[4] == 0 and data[5] == 1:
+        stripped -= 2 + sum(len(txin.witness) for txin in tx.TxIn)
+
+    return -(-(stripped * 3 + size) // 4)
+
+
+# Inputs of parsed transactions carry no amount, so it is left zero. They
+# are not flagged segwit, which keeps ``TxIn`` from looking it up on the
+# network.
+UNKNOWN_AMOUNT = b'\x00' * 8
+
+
+def parse_tx(data, pos=0):
+    """Parses a serialized transaction starting at ``pos`` of ``data``,
+    e.g. one of the transactions of a block. Unlike :func:`deserialize`,
+    no input amounts are looked up; inputs with witness data are marked
+    as segwit.
+
+    :param data: The serialized transaction(s).
+    :type data: ``bytes``
+    :param pos: The position of the transaction in ``data``.
+    :type pos: ``int``
+    :returns: The transaction, its txid and the position after it.
+    :rtype: ``tuple`` of (:class:`TxObj`, ``str``, ``int``)
+    """
+    version = data[pos:pos + 4]
+    pos += 4
+
+    # The marker is read as an input count of zero, which is never valid.
+    segwit = data[pos] == 0 and data[pos + 1] == 1
+    if segwit:
+        pos += 2
+
+    start = pos
+
+    n_in, pos = read_varint(data, pos)
+    inputs = []
+    for _ in range(n_in):
+        txid = data[pos:pos + 32]
+        txindex = data[pos + 32:pos + 36]
+        size, pos = read_varint(data, pos + 36)
+        script = data[pos:pos + size]
+        pos += size
+        inputs.append(TxIn(script, txid, txindex, amount=UNKNOWN_AMOUNT, sequence=data[pos:pos + 4]))
+        pos += 4
+
+    n_out, pos = read_varint(data, pos)
+    outputs = []
+    for _ in range(n_out):
+        value = data[pos:pos + 8]
+        size, pos = read_varint(data, pos + 8)
+        outputs.append(TxOut(value, data[pos:pos + size]))
+        pos += size
+
+    end = pos
+
+    if segwit:
+        for txin in inputs:
+            witness_start = pos
+            items, pos = read_varint(data, pos)
+            for _ in range(items):
+                size, pos = read_varint(data, pos)
+                pos += size
+            txin.witness = data[witness_start:pos]
+            txin.segwit = items > 0
+
+    locktime = data[pos:pos + 4]
+    pos += 4
+
+    txid = bytes_to_hex(double_sha256(version + data[start:end] + locktime)[::-1])
+
+    return TxObj(version, inputs, outputs, locktime), txid, pos
 
 
 def estimate_tx_fee(n_in, n_out, satoshis, compressed):
@@ -168,6 +251,68 @@ def estimate_tx_fee(n_in, n_out, satoshis, compressed):
     return estimated_fee
 
 
+# Weight units of an input spending each single-key output type,
+# assuming a 72 byte signature.
+P2PKH_INPUT_WEIGHT = 148 * 4
+P2PKH_UNCOMPRESSED_INPUT_WEIGHT = 180 * 4
+NESTED_P2WPKH_INPUT_WEIGHT = 64 * 4 + 108
+P2WPKH_INPUT_WEIGHT = 41 * 4 + 108
+OUTPUT_SIZE = 34
+
+
+def is_native_segwit(unspent):
+    """Whether an unspent pays to a witness program directly rather than
+    to P2SH, judged by its scriptPubKey."""
+    return unspent.segwit and unspent.script[:2] == '00'
+
+
+def input_weight(unspent, compressed=True, redeemscript=None):
+    if redeemscript is not None:
+        return _script_input_weight(unspent, redeemscript)
+    if unspent.segwit:
+        return P2WPKH_INPUT_WEIGHT if is_native_segwit(unspent) else NESTED_P2WPKH_INPUT_WEIGHT
+    return P2PKH_INPUT_WEIGHT if compressed else P2PKH_UNCOMPRESSED_INPUT_WEIGHT
+
+
+def _script_input_weight(unspent, redeemscript):
+    # The input is unlocked by a signature followed by the redeem script.
+    if unspent.segwit:
+        script_sig = 0 if is_native_segwit(unspent) else 35
+        witness = 1 + 1 + 72 + len(int_to_varint(len(redeemscript))) + len(redeemscript)
+    else:
+        script_sig = 1 + 72 + len(script_push(len(redeemscript))) + len(redeemscript)
+        witness = 0
+    return (40 + len(int_to_varint(script_sig)) + script_sig) * 4 + witness
+
+
+def estimate_tx_vsize(unspents, n_out, compressed=True, redeemscript=None):
+    """Estimates the virtual size of a transaction spending ``unspents``,
+    counting witness data at a quarter of its size.
+
+    :param unspents: The UTXOs to use as the inputs.
+    :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+    :param n_out: The number of outputs.
+    :type n_out: ``int``
+    :param compressed: Whether legacy inputs use a compressed public key.
+    :type compressed: ``bool``
+    :param redeemscript: The script of P2SH or P2WSH inputs unlocked by a
+                         single signature, e.g. of a time lock.
+    :type redeemscript: ``bytes``
+    :rtype: ``int``
+    """
+    return _vsize(len(unspents), n_out, sum(input_weight(u, compressed, redeemscript) for u in unspents),
+                  any(u.segwit for u in unspents))
+
+
+def _vsize(n_in, n_out, inputs_weight, segwit):
+    weight = (
+        4 * (8 + len(int_to_varint(n_in)) + len(int_to_varint(n_out)) + n_out * OUTPUT_SIZE)
+        + inputs_weight
+        + (2 if segwit else 0)  # marker and flag
+    )
+    return -(-weight // 4)
+
+
 def deserialize(txhex, sw_dict={}, sw_scriptcode=None):
 # sw_dict is a dictionary containing segwit-inputs' txid concatenated with txindex using ":" mapping to information of the amount the input contains.
 # E.g.: sw_dict = {'txid:txindex': amount, ...}
@@ -247,11 +392,15 @@ def deserialize(txhex, sw_dict={}, sw_scriptcode=None):
     return txobj
 
 
-def sanitize_tx_data(unspents, outputs, fee, leftover, combine=True, message=None, compressed=True, version='main'):
+def sanitize_tx_data(unspents, outputs, fee, leftover, combine=True, message=None, compressed=True, version='main',
+                     redeemscript=None):
     """
     sanitize_tx_data()
 
-    fee is in satoshis per byte.
+    fee is in satoshis per virtual byte, the total fee is at least MIN_TX_FEE.
+    Without a fee rate the flat MIN_TX_FEE is paid.
+    redeemscript is the script of the inputs if they are unlocked by a single
+    signature and that script, e.g. of a time lock.
     """
 
     outputs = outputs.copy()
@@ -285,27 +434,38 @@ def sanitize_tx_data(unspents, outputs, fee, leftover, combine=True, message=Non
     sum_outputs = sum(out[1] for out in outputs)
 
     total_in = 0
+    total_out = sum_outputs
+    fee_rate = fee or 0
 
     if combine:
-        total_out = sum_outputs
         unspents = unspents.copy()
         total_in += sum(unspent.amount for unspent in unspents)
+        fee = max(estimate_tx_vsize(unspents, num_outputs, compressed, redeemscript) * fee_rate, MIN_TX_FEE)
 
     else:
-        unspents = sorted(unspents, key=lambda x: x.amount)
+        # Among equal amounts lighter inputs, e.g. native segwit, go first.
+        # Inputs costing more in fees than they are worth are left out.
+        unspents = sorted(
+            (u for u in unspents if u.amount * 4 > input_weight(u, compressed, redeemscript) * fee_rate),
+            key=lambda u: (u.amount, input_weight(u, compressed, redeemscript))
+        )
 
         index = 0
+        inputs_weight = 0
+        segwit = False
+        fee = MIN_TX_FEE
 
         for index, unspent in enumerate(unspents):
             total_in += unspent.amount
-            total_out = sum_outputs
+            inputs_weight += input_weight(unspent, compressed, redeemscript)
+            segwit = segwit or unspent.segwit
+            fee = max(_vsize(index + 1, num_outputs, inputs_weight, segwit) * fee_rate, MIN_TX_FEE)
 
-            if total_in >= total_out:
+            if total_in >= total_out + fee:
                 break
 
         unspents[:] = unspents[:index + 1]
 
-    fee = 100000
     remaining = total_in - total_out - fee
 
     if remaining > 0:
@@ -325,28 +485,8 @@ def construct_outputs(outputs):
     for data in outputs:
         dest, amount = data
 
-        # Segwit address (Bech32)
-        if amount and (dest[0:2] == 'bc' or dest[0:2] == 'tb'):
-            hrp = dest[0:2]
-            witver, witprog = segwit_decode(hrp, dest)
-
-            script = segwit_scriptpubkey(witver, witprog)
-            amount = amount.to_bytes(8, byteorder='little')
-
-        # P2SH
-        elif amount and (b58decode_check(dest)[0:1] == MAIN_SCRIPT_HASH or
-                         b58decode_check(dest)[0:1] == TEST_SCRIPT_HASH):
-            script = (OP_HASH160 + OP_PUSH_20 +
-                      address_to_public_key_hash(dest) +
-                      OP_EQUAL)
-
-            amount = amount.to_bytes(8, byteorder='little')
-
-        # P2PKH
-        elif amount:
-            script = (OP_DUP + OP_HASH160 + OP_PUSH_20 +
-                      address_to_public_key_hash(dest) +
-                      OP_EQUALVERIFY + OP_CHECKSIG)
+        if amount:
+            script = address_to_scriptpubkey(dest)
 
             amount = amount.to_bytes(8, byteorder='little')
 
@@ -375,7 +515,6 @@ def construct_witness_block(inputs):
 def construct_input_block(inputs):
 
     input_block = b''
-    sequence = SEQUENCE
 
     for txin in inputs:
         input_block += (
@@ -383,18 +522,20 @@ def construct_input_block(inputs):
             txin.txindex +
             txin.script_len +
             txin.script +
-            sequence
+            txin.sequence
         )
 
     return input_block
 
-def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow override of segwit input dictionary?
+def sign_tx(private_key, tx, j=-1, unspents=None):
 # j is the input to be signed and can be a single index, a list of indices, or denote all inputs (-1)
+# unspents provide the amounts of segwit inputs when ``tx`` is given as hex and default to ``private_key.unspents``
+
+    unspents = unspents or private_key.unspents
 
     if not isinstance(tx, TxObj):
         # Add sw_dict containing unspent segwit txid:txindex and amount to deserialize tx:
         sw_dict = {}
-        unspents = private_key.unspents
         for u in unspents:
             if u.segwit:
                 tx_input = u.txid+':'+str(u.txindex)
@@ -410,51 +551,49 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
     input_count = int_to_varint(tx.input_count)
     output_count = int_to_varint(tx.output_count)
 
-    output_block = b''
-    for i in range(tx.output_count):
-        output_block += tx.TxOut[i].value
-        output_block += tx.TxOut[i].script_len
-        output_block += tx.TxOut[i].script
+    output_block = b''.join([bytes(o) for o in tx.TxOut])
 
     hashPrevouts = double_sha256(b''.join([i.txid+i.txindex for i in tx.TxIn]))
     hashSequence = double_sha256(b''.join([i.sequence for i in tx.TxIn]))
-    hashOutputs = double_sha256(b''.join([bytes(o) for o in tx.TxOut]))
+    hashOutputs = double_sha256(output_block)
+
+    # Every input as it appears with an empty scriptSig in the legacy signature hash of the other inputs.
+    blank_inputs = [ti.txid + ti.txindex + OP_0 + ti.sequence for ti in tx.TxIn]
+    legacy_suffix = output_count + output_block + lock_time + hash_type
+
+    public_key = private_key.public_key
+    public_key_len = script_push(len(public_key))
+
+    scriptCode = private_key.scriptcode
+    scriptCode_len = int_to_varint(len(scriptCode))
 
-    if j<0:  # Sign all inputs
-        j = range(len(tx.TxIn))
-    elif not isinstance(j, list):  # Sign a single input
-        j = [j]
+    # Inputs spending the witness program of the key directly carry no scriptSig.
+    native_script = bytes_to_hex(private_key.sw_scriptcode)
+    native = {(u.txid, u.txindex) for u in unspents if u.segwit and u.script == native_script}
 
-    segwit = False  # Global check if at least one input is segwit
+    if isinstance(j, int):  # Otherwise a list of inputs is signed
+        j = range(len(tx.TxIn)) if j < 0 else [j]  # Sign all inputs or a single input
+
+    # Global check if at least one input is segwit => Transaction must be of segwit-format.
+    # Inputs signed by other keys count as well, so the serialization keeps their witnesses.
+    segwit = any(ti.segwit for ti in tx.TxIn)
 
     for i in j:
         # Check if input is segwit or non-segwit:
         sw = tx.TxIn[i].segwit
-        segwit = segwit or sw  # Global check if at least one input is segwit => Transaction must be of segwit-format
-
-        public_key = private_key.public_key
-        public_key_len = script_push(len(public_key))
-
-        scriptCode = private_key.scriptcode
-        scriptCode_len = int_to_varint(len(scriptCode))
 
         if sw == False:
             hashed = sha256(
                 version +
                 input_count +
-                b''.join(ti.txid + ti.txindex + OP_0 + ti.sequence
-                         for ti in islice(tx.TxIn, i)) +
+                b''.join(blank_inputs[:i]) +
                 tx.TxIn[i].txid +
                 tx.TxIn[i].txindex +
                 scriptCode_len +
                 scriptCode +
                 tx.TxIn[i].sequence +
-                b''.join(ti.txid + ti.txindex + OP_0 + ti.sequence
-                         for ti in islice(tx.TxIn, i + 1, None)) +
-                output_count +
-                output_block +
-                lock_time +
-                hash_type
+                b''.join(blank_inputs[i + 1:]) +
+                legacy_suffix
                 )
 
             input_script_field = tx.TxIn[i].script
@@ -479,6 +618,12 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
 
         signature = private_key.sign(hashed) + b'\x01'
 
+        if native:
+            sw_native = (bytes_to_hex(tx.TxIn[i].txid[::-1]),
+                         int.from_bytes(tx.TxIn[i].txindex, byteorder='little')) in native
+        else:
+            sw_native = False
+
         # ------------------------------------------------------------------
         if private_key.instance == 'MultiSig' or private_key.instance == 'MultiSigTestnet':
             # P2(W)SH input
@@ -488,12 +633,12 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
             witness_count = 3  # count number of witness items (OP_0 + each signature + redeemscript). First signing only adds one signature.
             if input_script_field:  # If tx is already partially signed: Make a dictionary of the provided signatures with public-keys as key-values
                 sig_list = get_signatures_from_script(input_script_field)
-                if len(sig_list) > private_key.m:
-                    raise TypeError('Transaction is already signed with {} of {} needed signatures.').format(len(sig_list), private_key.m)
+                if len(sig_list) >= private_key.m:
+                    raise TypeError('Transaction is already signed with {} of {} needed signatures.'.format(len(sig_list), private_key.m))
                 for sig in sig_list:
-                    for pub in private_key.public_keys:
-                        if verify_sig(sig[:-1], hashed, hex_to_bytes(pub)):
-                            sigs[pub] = sig
+                    pub = private_key.match_signature(sig[:-1], hashed)
+                    if pub is not None:
+                        sigs[pub] = sig
                 script_blob += b'\x00' * (private_key.m - len(sig_list)-1)  # Bitcoin Core convention: Every missing signature is denoted by 0x00. Only used for already partially-signed scriptSigs.
                 witness_count = private_key.m + 2
 
@@ -506,7 +651,7 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
                     length = int_to_varint(len(sig)) if sw == True else script_push(len(sig))
                     witness += length + sig
 
-            script_sig = b'\x22' + private_key.sw_scriptcode
+            script_sig = b'' if sw_native else b'\x22' + private_key.sw_scriptcode
 
             witness = (witness_count.to_bytes(1, byteorder='little') if sw == True else b'') + b'\x00' + witness + script_blob
             witness += (int_to_varint(len(private_key.redeemscript)) if sw == True else script_push(len(private_key.redeemscript))) + private_key.redeemscript
@@ -514,11 +659,30 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
             script_sig = witness if sw == False else script_sig
             witness = b'\x00' if sw == False else witness
 
+        # ------------------------------------------------------------------
+        elif private_key.instance == 'TimeLock':
+            # P2(W)SH input locked by OP_CHECKLOCKTIMEVERIFY
+
+            script_sig = b'' if sw_native else b'\x22' + private_key.sw_scriptcode
+
+            if sw == True:
+                witness = (
+                          b'\x02' +
+                          int_to_varint(len(signature)) + signature +
+                          int_to_varint(len(private_key.redeemscript)) + private_key.redeemscript
+                         )
+            else:
+                script_sig = (
+                             script_push(len(signature)) + signature +
+                             script_push(len(private_key.redeemscript)) + private_key.redeemscript
+                            )
+                witness = b'\x00'
+
         # ------------------------------------------------------------------
         else:
             # P2(W)PKH input
 
-            script_sig = b'\x16' + private_key.sw_scriptcode
+            script_sig = b'' if sw_native else b'\x16' + private_key.sw_scriptcode
 
             witness = (
                       (b'\x02' if sw == True else b'') +  # witness counter
@@ -549,12 +713,28 @@ def sign_tx(private_key, tx, j=-1):  # Future-TODO: add sw_dict to allow overrid
     # Future-TODO: Add return of redeemscript, etc if multisig and not fully signed yet to sign offline or using bitcoin core.
 
 
-def create_new_transaction(private_key, unspents, outputs):
+def is_replaceable(tx):
+    """Whether a transaction signals that it may be replaced by one paying
+    a higher fee (BIP-125), i.e. any of its inputs has a sequence below
+    ``0xfffffffe``.
+
+    :type tx: :class:`TxObj`
+    :rtype: ``bool``
+    """
+    return any(int.from_bytes(txin.sequence, 'little') < 0xfffffffe for txin in tx.TxIn)
+
 
+def create_unsigned_transaction(unspents, outputs, sequence=SEQUENCE, locktime=0):
+    # ``locktime`` is a block height or UNIX timestamp before which the
+    # transaction cannot be mined.
     version = VERSION_1
-    lock_time = LOCK_TIME
+    lock_time = locktime.to_bytes(4, byteorder='little')
     outputs = construct_outputs(outputs)
 
+    # The lock time is only enforced if an input is not final.
+    if locktime and sequence == SEQUENCE:
+        sequence = LOCKTIME_SEQUENCE
+
     # Optimize for speed, not memory, by pre-computing values.
     inputs = []
     for unspent in unspents:
@@ -564,9 +744,14 @@ def create_new_transaction(private_key, unspents, outputs):
         amount = int(unspent.amount).to_bytes(8, byteorder='little')
         sw = unspent.segwit
 
-        inputs.append(TxIn(script, txid, txindex, amount=amount, segwit=sw))
+        inputs.append(TxIn(script, txid, txindex, amount=amount, sequence=sequence, segwit=sw))
+
+    return TxObj(version, inputs, outputs, lock_time)
+
+
+def create_new_transaction(private_key, unspents, outputs, sequence=SEQUENCE, locktime=0):
 
-    tx_unsigned = TxObj(version, inputs, outputs, lock_time)
+    tx_unsigned = create_unsigned_transaction(unspents, outputs, sequence, locktime)
 
-    tx = sign_tx(private_key, tx_unsigned)
+    tx = sign_tx(private_key, tx_unsigned, unspents=unspents)
     return tx
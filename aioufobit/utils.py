@@ -1,3 +1,4 @@
+import asyncio
 import decimal
 from binascii import hexlify
 
@@ -11,6 +12,18 @@ def chunk_data(data, size):
     return (data[i:i + size] for i in range(0, len(data), size))
 
 
+async def gather_limited(aws, limit):
+    """Awaits all ``aws`` concurrently with at most ``limit`` of them in
+    flight at once. Results are returned in order."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
 def int_to_unknown_bytes(num, byteorder='big'):
     """Converts an int to the least number of bytes as possible."""
     return num.to_bytes((num.bit_length() + 7) // 8 or 1, byteorder)
@@ -54,6 +67,23 @@ def int_to_varint(val):
         return b'\xff'+val.to_bytes(8, 'little')
 
 
+def read_varint(data, pos=0):
+    """Reads a variable length integer from ``data`` at ``pos``.
+
+    :type data: ``bytes``
+    :type pos: ``int``
+    :returns: The integer and the position after it.
+    :rtype: ``tuple`` of ``int``
+    """
+    prefix = data[pos]
+
+    if prefix < 253:
+        return prefix, pos + 1
+
+    size = 1 << (prefix - 252)
+    return int.from_bytes(data[pos + 1:pos + 1 + size], 'little'), pos + 1 + size
+
+
 def script_push(val):
 
     if val <= 75:
@@ -0,0 +1,282 @@
+import threading
+import time
+
+from .exceptions import InsufficientFunds
+from .format import parse_address
+from .network.meta import Unspent
+from .transaction import sanitize_tx_data
+from .utils import bytes_to_hex
+
+DEFAULT_LEASE_TIME = 60
+DEFAULT_PENDING_TIME = 600
+
+
+class Lease:
+    """Unspents reserved by :func:`UTXOManager.reserve` for one transaction,
+    along with the outputs selected for them. Exactly one of
+    :func:`~Lease.spend` or :func:`~Lease.release` should be called.
+
+    :param manager: The manager owning the unspents.
+    :param unspents: The reserved unspents.
+    :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+    :param outputs: The outputs as returned by
+                    :func:`~aioufobit.transaction.sanitize_tx_data`.
+    :type outputs: ``list`` of ``tuple``
+    :param change: The index of the change output, or ``None``.
+    :type change: ``int``
+    :param expires: When the lease expires, in :func:`time.monotonic` seconds.
+    :type expires: ``float``
+    """
+
+    __slots__ = ('manager', 'unspents', 'outputs', 'change', 'expires')
+
+    def __init__(self, manager, unspents, outputs, change, expires):
+        self.manager = manager
+        self.unspents = unspents
+        self.outputs = outputs
+        self.change = change
+        self.expires = expires
+
+    def release(self):
+        """Makes the unspents available again, e.g. after a failed broadcast."""
+        self.manager.release(self)
+
+    def spend(self, txid):
+        """Marks the unspents spent by the broadcast transaction ``txid``.
+
+        :type txid: ``str``
+        """
+        self.manager.spend(self, txid)
+
+    def __repr__(self):
+        return '<Lease: {} unspents>'.format(len(self.unspents))
+
+
+class UTXOManager:
+    """Hands out unspents to concurrent spenders, so no two transactions
+    select the same one. Unspents are leased on selection, released if the
+    transaction is not broadcast and marked spent if it is; leases not
+    settled within ``lease_time`` seconds expire. Change paying back to one
+    of ``addresses`` can be spent right away, before it confirms.
+
+    The methods do not await, so they are atomic within an event loop; a
+    lock guards against threads as well.
+
+    :param unspents: The unspents to manage.
+    :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+    :param addresses: The addresses whose unconfirmed change may be spent.
+    :type addresses: ``list`` of ``str``
+    :param lease_time: The seconds after which a lease expires.
+    :type lease_time: ``int``
+    :param pending_time: The seconds unconfirmed change and spent unspents
+                         are kept while the backend does not report them yet.
+    :type pending_time: ``int``
+    """
+
+    def __init__(self, unspents=(), addresses=(), lease_time=DEFAULT_LEASE_TIME,
+                 pending_time=DEFAULT_PENDING_TIME):
+        self.addresses = set(addresses)
+        self.lease_time = lease_time
+        self.pending_time = pending_time
+
+        self._lock = threading.Lock()
+        # (txid, txindex) -> Unspent
+        self._unspents = {}
+        # (txid, txindex) -> Lease
+        self._leases = {}
+        # (txid, txindex) -> expiry of unspents we spent or received as change
+        self._spent = {}
+        self._change = {}
+
+        self.update(unspents)
+
+    def update(self, unspents):
+        """Replaces the unspents with those reported by the backend. Leases
+        stay in place until they expire and spent unspents stay hidden for
+        ``pending_time``, even while the backend does not report them.
+        Unconfirmed change is kept until the backend catches up or
+        ``pending_time`` passes.
+
+        :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            reported = {(unspent.txid, unspent.txindex): unspent for unspent in unspents}
+
+            self._spent = {
+                outpoint: expires for outpoint, expires in self._spent.items() if expires > now
+            }
+            self._change = {
+                outpoint: expires for outpoint, expires in self._change.items()
+                if outpoint not in reported and expires > now
+            }
+
+            for outpoint in self._change:
+                reported[outpoint] = self._unspents[outpoint]
+            for outpoint in self._spent:
+                reported.pop(outpoint, None)
+
+            self._unspents = reported
+            self._leases = {
+                outpoint: lease for outpoint, lease in self._leases.items() if lease.expires > now
+            }
+
+    @property
+    def unspents(self):
+        """All unspents not spent yet, leased or not."""
+        return list(self._unspents.values())
+
+    def available(self):
+        """Returns the unspents not currently leased.
+
+        :rtype: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            return self._available(now)
+
+    def _available(self, now):
+        leases = self._leases
+        return [
+            unspent for outpoint, unspent in self._unspents.items()
+            if outpoint not in leases or leases[outpoint].expires <= now
+        ]
+
+    @property
+    def balance(self):
+        """The sum of all unspents not spent yet, in ufoshi."""
+        return sum(unspent.amount for unspent in self._unspents.values())
+
+    def reserve(self, outputs, fee, leftover, combine=False, message=None, compressed=True):
+        """Selects unspents for a transaction among those available and
+        leases them. This accepts the arguments of
+        :func:`~aioufobit.transaction.sanitize_tx_data`, except that
+        ``combine`` defaults to ``False`` so concurrent spenders each get a
+        part of the unspents.
+
+        :returns: The lease of the selected unspents.
+        :rtype: :class:`Lease`
+        :raises InsufficientFunds: If the available unspents do not cover
+                                   the outputs, e.g. as all are leased.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            available = self._available(now)
+            if not available:
+                raise InsufficientFunds('None of the {} unspents are available.'.format(len(self._unspents)))
+
+            unspents, sanitized = sanitize_tx_data(
+                available, outputs, fee, leftover, combine=combine,
+                message=message, compressed=compressed, version='main'
+            )
+
+            change = len(outputs)
+            if not (change < len(sanitized) and sanitized[change][0] == leftover and sanitized[change][1]):
+                change = None
+
+            lease = Lease(self, unspents, sanitized, change, now + self.lease_time)
+            for unspent in unspents:
+                self._leases[(unspent.txid, unspent.txindex)] = lease
+
+        return lease
+
+    def is_spendable(self, txid, txindex):
+        """Whether an outpoint is available, or unknown to the manager but
+        not spent by it, e.g. an unconfirmed output the backend does not
+        report yet.
+
+        :type txid: ``str``
+        :type txindex: ``int``
+        :rtype: ``bool``
+        """
+        with self._lock:
+            return self._is_spendable((txid, txindex), time.monotonic())
+
+    def _is_spendable(self, outpoint, now):
+        if outpoint in self._spent:
+            return False
+        lease = self._leases.get(outpoint)
+        return lease is None or lease.expires <= now
+
+    def lease(self, unspents, outputs=(), change=None):
+        """Leases the given unspents, e.g. inputs added to a transaction
+        selected by other means than :func:`~UTXOManager.reserve`. Unspents
+        unknown to the manager are leased as well, so they stay hidden once
+        they are reported.
+
+        :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        :param outputs: The outputs of the transaction as ``(address, amount)``.
+        :type outputs: ``list`` of ``tuple``
+        :param change: The index of the change output, or ``None``.
+        :type change: ``int``
+        :rtype: :class:`Lease`
+        :raises ValueError: If an unspent is leased or spent.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            for unspent in unspents:
+                if not self._is_spendable((unspent.txid, unspent.txindex), now):
+                    raise ValueError('Unspent {}:{} is not available.'.format(unspent.txid, unspent.txindex))
+
+            lease = Lease(self, list(unspents), list(outputs), change, now + self.lease_time)
+            for unspent in unspents:
+                self._leases[(unspent.txid, unspent.txindex)] = lease
+
+        return lease
+
+    def release(self, lease):
+        """Makes the unspents of ``lease`` available again.
+
+        :type lease: :class:`Lease`
+        """
+        with self._lock:
+            for unspent in lease.unspents:
+                outpoint = (unspent.txid, unspent.txindex)
+                if self._leases.get(outpoint) is lease:
+                    del self._leases[outpoint]
+
+    def spend(self, lease, txid):
+        """Marks the unspents of ``lease`` spent by the transaction ``txid``
+        and adds its change to the unspents if it pays to one of
+        :attr:`addresses`.
+
+        :type lease: :class:`Lease`
+        :type txid: ``str``
+        """
+        expires = time.monotonic() + self.pending_time
+
+        with self._lock:
+            for unspent in lease.unspents:
+                outpoint = (unspent.txid, unspent.txindex)
+                self._leases.pop(outpoint, None)
+                self._unspents.pop(outpoint, None)
+                self._change.pop(outpoint, None)
+                self._spent[outpoint] = expires
+
+            if lease.change is not None:
+                address, amount = lease.outputs[lease.change]
+                if address in self.addresses:
+                    parsed = parse_address(address)
+                    outpoint = (txid, lease.change)
+                    self._unspents[outpoint] = Unspent(amount, 0, bytes_to_hex(parsed.scriptpubkey), txid,
+                                                       lease.change, segwit=parsed.type != 'p2pkh')
+                    self._change[outpoint] = expires
+
+    def discard(self, txid):
+        """Drops the unspents created by a transaction that will not
+        confirm, e.g. because it was replaced.
+
+        :type txid: ``str``
+        """
+        with self._lock:
+            for outpoint in [outpoint for outpoint in self._unspents if outpoint[0] == txid]:
+                del self._unspents[outpoint]
+                self._leases.pop(outpoint, None)
+                self._change.pop(outpoint, None)
+
+    def __len__(self):
+        return len(self._unspents)
@@ -1,15 +1,26 @@
+import asyncio
 import json
 
-from .crypto import ECPrivateKey, ripemd160_sha256
+from .base58 import b58encode_check
+from .base32 import encode as segwit_encode
+from .constants import (
+    LOCKTIME_THRESHOLD, MAIN_BECH32_HRP, MAIN_PUBKEY_HASH, MAIN_SCRIPT_HASH, OP_EQUAL, RBF_SEQUENCE, SEQUENCE
+)
+from .crypto import ECPrivateKey, ECPublicKey, get_context, ripemd160_sha256, sha256
 from .curve import Point
+from .hd import HDKey
 from .format import (
-    bytes_to_wif, public_key_to_address, public_key_to_coords, wif_to_bytes, address_to_public_key_hash, public_key_to_segwit_address
+    bytes_to_wif, public_key_to_coords, wif_to_bytes, multisig_to_address, multisig_to_redeemscript, multisig_to_segwit_address,
+    timelock_to_address, timelock_to_redeemscript, timelock_to_segwit_address
 )
-from .network import NetworkAPI, get_fee_cached, ufoshi_to_currency_cached
+from .network import NetworkAPI, ufoshi_to_currency_cached
 from .network.meta import Unspent
 from .transaction import (
-    create_new_transaction, sanitize_tx_data, OP_CHECKSIG, OP_DUP, OP_EQUALVERIFY, OP_HASH160, OP_PUSH_20
+    create_new_transaction, create_unsigned_transaction, parse_tx, sanitize_tx_data, sign_tx, OP_CHECKSIG, OP_DUP,
+    OP_EQUALVERIFY, OP_HASH160, OP_PUSH_20
     )
+from .utils import bytes_to_hex, gather_limited, hex_to_bytes
+from .utxo import UTXOManager
 
 
 
@@ -25,6 +36,34 @@ def wif_to_key(wif):
         raise NotImplementedError('Testnet not implemented in this library')
 
 
+async def broadcast_leased(lease, build):
+    """Builds and broadcasts a transaction spending the unspents of a
+    :class:`~aioufobit.utxo.Lease`. The lease is released if this fails and
+    marked spent otherwise.
+
+    :param lease: The leased unspents and outputs.
+    :type lease: :class:`~aioufobit.utxo.Lease`
+    :param build: Returns the signed transaction as hex for the lease.
+    :type build: ``callable``
+    :returns: The transaction ID, or ``None`` if the broadcast was rejected,
+              and the transaction as hex.
+    :rtype: ``tuple`` of ``str``
+    """
+    try:
+        tx_hex = build(lease)
+        txid = await NetworkAPI.broadcast_tx(tx_hex)
+    except BaseException:
+        lease.release()
+        raise
+
+    if not txid:
+        lease.release()
+        return None, tx_hex
+
+    lease.spend(txid)
+    return txid, tx_hex
+
+
 class BaseKey:
     """This class represents a point on the elliptic curve secp256k1 and
     provides all necessary cryptographic functionality. You shouldn't use
@@ -37,23 +76,25 @@ class BaseKey:
     :type wif: ``str``
     :raises TypeError: If ``wif`` is not a ``str``.
     """
+    __slots__ = ('_pk', '_public_key', '_public_point', '_compressed')
 
     def __init__(self, wif=None):
         if wif:
             if isinstance(wif, str):
                 private_key_bytes, compressed, version = wif_to_bytes(wif)
-                self._pk = ECPrivateKey(private_key_bytes)
+                self._pk = ECPrivateKey(private_key_bytes, context=get_context())
             elif isinstance(wif, ECPrivateKey):
                 self._pk = wif
                 compressed = True
             else:
                 raise TypeError('Wallet Import Format must be a string.')
         else:
-            self._pk = ECPrivateKey()
+            self._pk = ECPrivateKey(context=get_context())
             compressed = True
 
         self._public_point = None
         self._public_key = self._pk.public_key.format(compressed=compressed)
+        self._compressed = compressed
 
     @property
     def public_key(self):
@@ -115,7 +156,7 @@ class BaseKey:
 
         :rtype: ``bool``
         """
-        return True if len(self.public_key) == 33 else False
+        return self._compressed
 
     def __eq__(self, other):
         return self.to_int() == other.to_int()
@@ -131,51 +172,86 @@ class PrivateKey(BaseKey):
     :type wif: ``str``
     :raises TypeError: If ``wif`` is not a ``str``.
     """
+    __slots__ = ('_hash160', '_address', '_sw_address', '_bech32_address', '_scriptcode', '_sw_scriptcode',
+                 '_sw_scriptpubkey', '_utxos', 'balance', 'unspents', 'transactions', 'version', 'instance')
 
     def __init__(self, wif=None):
         super().__init__(wif=wif)
 
-        self._address = None
-        self._sw_address = None
-        self._scriptcode = None
-        self._sw_scriptcode = None
+        # Everything derived from the public key is computed once here, so
+        # signing an input only costs the ECDSA operation.
+        self._hash160 = ripemd160_sha256(self._public_key)
+        self._address = b58encode_check(MAIN_PUBKEY_HASH + self._hash160)
+        self._scriptcode = (OP_DUP + OP_HASH160 + OP_PUSH_20 +
+                            self._hash160 +
+                            OP_EQUALVERIFY + OP_CHECKSIG)
+        self._sw_scriptcode = b'\x00' + b'\x14' + self._hash160
+
+        if self._compressed:  # Only make segwit address if public key is compressed
+            # See: https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki#New_script_semantics and
+            #      https://github.com/bitcoin/bips/blob/master/bip-0143.mediawiki#Restrictions_on_public_key_type
+            sw_script_hash = ripemd160_sha256(self._sw_scriptcode)
+            self._sw_address = b58encode_check(MAIN_SCRIPT_HASH + sw_script_hash)
+            self._sw_scriptpubkey = OP_HASH160 + OP_PUSH_20 + sw_script_hash + OP_EQUAL
+            self._bech32_address = segwit_encode(MAIN_BECH32_HRP, 0, self._hash160)
+        else:
+            self._sw_address = None
+            self._sw_scriptpubkey = None
+            self._bech32_address = None
 
         self.balance = 0
         self.unspents = []
         self.transactions = []
+        self._utxos = None
 
         self.version = 'main'
         self.instance = 'PrivateKey'
 
+    @property
+    def hash160(self):
+        """The RIPEMD-160 hash of the SHA-256 hash of the public key."""
+        return self._hash160
+
     @property
     def address(self):
         """The public address you share with others to receive funds."""
-        if self._address is None:
-            self._address = public_key_to_address(self._public_key, version='main')
         return self._address
 
     @property
     def sw_address(self):
         """The public segwit nested in P2SH address you share with others to receive funds."""
-        if self._sw_address is None and self.is_compressed():  # Only make segwit address if public key is compressed
-            # See: https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki#New_script_semantics and
-            #      https://github.com/bitcoin/bips/blob/master/bip-0143.mediawiki#Restrictions_on_public_key_type
-            self._sw_address = public_key_to_segwit_address(self._public_key, version='main')
         return self._sw_address
 
+    @property
+    def bech32_address(self):
+        """The public native segwit (P2WPKH) address you share with others to receive funds."""
+        return self._bech32_address
+
     @property
     def scriptcode(self):
-        self._scriptcode = (OP_DUP + OP_HASH160 + OP_PUSH_20 +
-                            address_to_public_key_hash(self.address) +
-                            OP_EQUALVERIFY + OP_CHECKSIG)
+        """The P2PKH script, used as scriptPubKey and as scriptCode when signing."""
+        return self._scriptcode
+
+    @property
+    def scriptpubkey(self):
+        """The scriptPubKey of :attr:`address`."""
         return self._scriptcode
 
     @property
     def sw_scriptcode(self):
-        self._sw_scriptcode = (b'\x00' + b'\x14' +
-                               ripemd160_sha256(self.public_key))
+        """The P2WPKH witness program, used as redeem script of :attr:`sw_address`."""
         return self._sw_scriptcode
 
+    @property
+    def sw_scriptpubkey(self):
+        """The scriptPubKey of :attr:`sw_address`."""
+        return self._sw_scriptpubkey
+
+    @property
+    def bech32_scriptpubkey(self):
+        """The scriptPubKey of :attr:`bech32_address`, which is the witness program itself."""
+        return self._sw_scriptcode if self._compressed else None
+
     def to_wif(self):
         return bytes_to_wif(
             self._pk.secret,
@@ -198,6 +274,18 @@ class PrivateKey(BaseKey):
     def get_sw_address(self):
         return self.sw_address
 
+    def get_bech32_address(self):
+        return self.bech32_address
+
+    @property
+    def utxos(self):
+        """The :class:`~aioufobit.utxo.UTXOManager` leasing :attr:`unspents`
+        to concurrent :func:`~aioufobit.PrivateKey.send` calls."""
+        if self._utxos is None:
+            addresses = [self.address, self.sw_address, self.bech32_address] if self._compressed else [self.address]
+            self._utxos = UTXOManager(self.unspents, addresses)
+        return self._utxos
+
     async def get_balance(self, currency='ufoshi'):
         """Fetches the current balance by calling
         :func:`~bit.PrivateKey.get_unspents` and returns it using
@@ -215,11 +303,14 @@ class PrivateKey(BaseKey):
 
         :rtype: ``list`` of :class:`~bit.network.meta.Unspent`
         """
-        self.unspents[:] = (await NetworkAPI.get_unspent(self.address))
-        if self.is_compressed():  # Only check segwit balance if public key is compressed
-            sw_unspents = (await NetworkAPI.get_unspent(self.sw_address))
-            self.unspents += sw_unspents
+        # Only check segwit balance if public key is compressed
+        addresses = ([self.address, self.sw_address, self.bech32_address] if self.is_compressed()
+                     else [self.address])
+        unspents = await asyncio.gather(*(NetworkAPI.get_unspent(address) for address in addresses))
+        self.unspents[:] = [unspent for address_unspents in unspents for unspent in address_unspents]
         self.balance = sum(unspent.amount for unspent in self.unspents)
+        if self._utxos is not None:
+            self._utxos.update(self.unspents)
         return self.unspents
 
     async def get_transactions(self):
@@ -227,13 +318,15 @@ class PrivateKey(BaseKey):
 
         :rtype: ``list`` of ``str`` transaction IDs
         """
-        self.transactions[:] = await NetworkAPI.get_transactions(self.address)
-        if self.is_compressed():  # Only check segwit transactions if public key is compressed
-            self.transactions += await NetworkAPI.get_transactions(self.sw_address)
+        # Only check segwit transactions if public key is compressed
+        addresses = ([self.address, self.sw_address, self.bech32_address] if self.is_compressed()
+                     else [self.address])
+        transactions = await asyncio.gather(*(NetworkAPI.get_transactions(address) for address in addresses))
+        self.transactions[:] = [txid for address_transactions in transactions for txid in address_transactions]
         return self.transactions
 
     def create_transaction(self, outputs, fee=None, leftover=None, combine=True,
-                           message=None, unspents=None):  # pragma: no cover
+                           message=None, unspents=None, replaceable=False, locktime=0):  # pragma: no cover
         """Creates a signed P2PKH transaction.
 
         :param outputs: A sequence of outputs you wish to send in the form
@@ -242,10 +335,9 @@ class PrivateKey(BaseKey):
                         a valid input to ``decimal.Decimal``. The currency
                         must be :ref:`supported <supported currencies>`.
         :type outputs: ``list`` of ``tuple``
-        :param fee: The number of satoshi per byte to pay to miners. By default
-                    Bit will poll `<https://bitcoinfees.earn.com>`_ and use a fee
-                    that will allow your transaction to be confirmed as soon as
-                    possible.
+        :param fee: The number of ufoshi per virtual byte to pay to miners,
+                    with a total of at least 100000 ufoshi. By default the
+                    flat fee of 100000 ufoshi is paid.
         :type fee: ``int``
         :param leftover: The destination that will receive any change from the
                          transaction. By default Bit will send any change to
@@ -262,6 +354,14 @@ class PrivateKey(BaseKey):
         :param unspents: The UTXOs to use as the inputs. By default Bit will
                          communicate with the blockchain itself.
         :type unspents: ``list`` of :class:`~bit.network.meta.Unspent`
+        :param replaceable: Whether the transaction signals that it may be
+                            replaced by one paying a higher fee (BIP-125),
+                            see :class:`~aioufobit.feebump.FeeBumper`.
+        :type replaceable: ``bool``
+        :param locktime: The block height or UNIX timestamp before which the
+                         transaction cannot be mined, so it can be signed
+                         ahead of time and broadcast later.
+        :type locktime: ``int``
         :returns: The signed transaction as hex.
         :rtype: ``str``
         """
@@ -269,7 +369,7 @@ class PrivateKey(BaseKey):
         unspents, outputs = sanitize_tx_data(
             unspents or self.unspents,
             outputs,
-            fee or get_fee_cached(),
+            fee,
             leftover or self.address,
             combine=combine,
             message=message,
@@ -277,10 +377,10 @@ class PrivateKey(BaseKey):
             version='main'
         )
 
-        return create_new_transaction(self, unspents, outputs)
+        return create_new_transaction(self, unspents, outputs, RBF_SEQUENCE if replaceable else SEQUENCE, locktime)
 
-    async def send(self, outputs, fee=None, leftover=None, combine=True,
-             message=None, unspents=None):  # pragma: no cover
+    async def send(self, outputs, fee=None, leftover=None, combine=None,
+             message=None, unspents=None, replaceable=False, locktime=0):  # pragma: no cover
         """Creates a signed P2PKH transaction and attempts to broadcast it on
         the blockchain. This accepts the same arguments as
         :func:`~bit.PrivateKey.create_transaction`.
@@ -291,10 +391,9 @@ class PrivateKey(BaseKey):
                         a valid input to ``decimal.Decimal``. The currency
                         must be :ref:`supported <supported currencies>`.
         :type outputs: ``list`` of ``tuple``
-        :param fee: The number of satoshi per byte to pay to miners. By default
-                    Bit will poll `<https://bitcoinfees.earn.com>`_ and use a fee
-                    that will allow your transaction to be confirmed as soon as
-                    possible.
+        :param fee: The number of ufoshi per virtual byte to pay to miners,
+                    with a total of at least 100000 ufoshi. By default the
+                    flat fee of 100000 ufoshi is paid.
         :type fee: ``int``
         :param leftover: The destination that will receive any change from the
                          transaction. By default Bit will send any change to
@@ -302,30 +401,47 @@ class PrivateKey(BaseKey):
         :type leftover: ``str``
         :param combine: Whether or not Bit should use all available UTXOs to
                         make future transactions smaller and therefore reduce
-                        fees. By default Bit will consolidate UTXOs.
+                        fees. By default Bit will consolidate given
+                        ``unspents``, but lease only the UTXOs needed, so
+                        concurrent sends can run in parallel.
         :type combine: ``bool``
         :param message: A message to include in the transaction. This will be
                         stored in the blockchain forever. Due to size limits,
                         each message will be stored in chunks of 40 bytes.
         :type message: ``str``
-        :param unspents: The UTXOs to use as the inputs. By default Bit will
-                         communicate with the blockchain itself.
+        :param unspents: The UTXOs to use as the inputs. By default they are
+                         leased from :attr:`utxos`, so concurrent calls do
+                         not select the same ones.
         :type unspents: ``list`` of :class:`~bit.network.meta.Unspent`
+        :param replaceable: Whether the transaction signals that it may be
+                            replaced by one paying a higher fee (BIP-125).
+        :type replaceable: ``bool``
+        :param locktime: The block height or UNIX timestamp before which the
+                         transaction cannot be mined.
+        :type locktime: ``int``
         :returns: The transaction ID.
         :rtype: ``str``
         """
 
-        tx_hex = self.create_transaction(
-            outputs, fee=fee, leftover=leftover, combine=combine, message=message, unspents=unspents
-        )
+        if unspents:
+            tx_hex = self.create_transaction(
+                outputs, fee=fee, leftover=leftover, combine=combine is not False, message=message,
+                unspents=unspents, replaceable=replaceable, locktime=locktime
+            )
+            return await NetworkAPI.broadcast_tx(tx_hex)
 
-        txid = await NetworkAPI.broadcast_tx(tx_hex)
+        lease = self.utxos.reserve(outputs, fee, leftover or self.address,
+                                   combine=bool(combine), message=message, compressed=self.is_compressed())
+        sequence = RBF_SEQUENCE if replaceable else SEQUENCE
 
+        txid, _ = await broadcast_leased(
+            lease, lambda lease: create_new_transaction(self, lease.unspents, lease.outputs, sequence, locktime)
+        )
         return txid
 
     @classmethod
     async def prepare_transaction(cls, address, outputs, compressed=True, fee=None, leftover=None,
-                            combine=True, message=None, unspents=None):  # pragma: no cover
+                            combine=True, message=None, unspents=None, locktime=0):  # pragma: no cover
         """Prepares a P2PKH transaction for offline signing.
 
         :param address: The address the funds will be sent from.
@@ -339,10 +455,9 @@ class PrivateKey(BaseKey):
         :param compressed: Whether or not the ``address`` corresponds to a
                            compressed public key. This influences the fee.
         :type compressed: ``bool``
-        :param fee: The number of satoshi per byte to pay to miners. By default
-                    Bit will poll `<https://bitcoinfees.earn.com>`_ and use a fee
-                    that will allow your transaction to be confirmed as soon as
-                    possible.
+        :param fee: The number of ufoshi per virtual byte to pay to miners,
+                    with a total of at least 100000 ufoshi. By default the
+                    flat fee of 100000 ufoshi is paid.
         :type fee: ``int``
         :param leftover: The destination that will receive any change from the
                          transaction. By default Bit will send any change to
@@ -359,13 +474,16 @@ class PrivateKey(BaseKey):
         :param unspents: The UTXOs to use as the inputs. By default Bit will
                          communicate with the blockchain itself.
         :type unspents: ``list`` of :class:`~bit.network.meta.Unspent`
+        :param locktime: The block height or UNIX timestamp before which the
+                         transaction cannot be mined.
+        :type locktime: ``int``
         :returns: JSON storing data required to create an offline transaction.
         :rtype: ``str``
         """
         unspents, outputs = sanitize_tx_data(
             unspents or (await NetworkAPI.get_unspent(address)),
             outputs,
-            fee or get_fee_cached(),
+            fee,
             leftover or address,
             combine=combine,
             message=message,
@@ -377,6 +495,8 @@ class PrivateKey(BaseKey):
             'unspents': [unspent.to_dict() for unspent in unspents],
             'outputs': outputs
         }
+        if locktime:
+            data['locktime'] = locktime
 
         return json.dumps(data, separators=(',', ':'))
 
@@ -394,7 +514,7 @@ class PrivateKey(BaseKey):
         unspents = [Unspent.from_dict(unspent) for unspent in data['unspents']]
         outputs = data['outputs']
 
-        return create_new_transaction(self, unspents, outputs)
+        return create_new_transaction(self, unspents, outputs, locktime=data.get('locktime', 0))
 
     @classmethod
     def from_hex(cls, hexed):
@@ -403,7 +523,7 @@ class PrivateKey(BaseKey):
         :type hexed: ``str``
         :rtype: :class:`~bit.PrivateKey`
         """
-        return PrivateKey(ECPrivateKey.from_hex(hexed))
+        return PrivateKey(ECPrivateKey.from_hex(hexed, context=get_context()))
 
     @classmethod
     def from_bytes(cls, bytestr):
@@ -412,7 +532,7 @@ class PrivateKey(BaseKey):
         :type bytestr: ``bytes``
         :rtype: :class:`~bit.PrivateKey`
         """
-        return PrivateKey(ECPrivateKey(bytestr))
+        return PrivateKey(ECPrivateKey(bytestr, context=get_context()))
 
     @classmethod
     def from_der(cls, der):
@@ -421,7 +541,7 @@ class PrivateKey(BaseKey):
         :type der: ``bytes``
         :rtype: :class:`~bit.PrivateKey`
         """
-        return PrivateKey(ECPrivateKey.from_der(der))
+        return PrivateKey(ECPrivateKey.from_der(der, context=get_context()))
 
     @classmethod
     def from_pem(cls, pem):
@@ -430,7 +550,7 @@ class PrivateKey(BaseKey):
         :type pem: ``bytes``
         :rtype: :class:`~bit.PrivateKey`
         """
-        return PrivateKey(ECPrivateKey.from_pem(pem))
+        return PrivateKey(ECPrivateKey.from_pem(pem, context=get_context()))
 
     @classmethod
     def from_int(cls, num):
@@ -439,10 +559,790 @@ class PrivateKey(BaseKey):
         :type num: ``int``
         :rtype: :class:`~bit.PrivateKey`
         """
-        return PrivateKey(ECPrivateKey.from_int(num))
+        return PrivateKey(ECPrivateKey.from_int(num, context=get_context()))
 
     def __repr__(self):
         return '<PrivateKey: {}>'.format(self.address)
 
 
+class MultiSig:
+    """This class represents a m-of-n multisignature contract. The redeem
+    script, the P2SH address and the P2SH-P2WSH address are computed once on
+    creation, so signing only costs the ECDSA operation.
+
+    :param private_key: The private key of one of the cosigners.
+    :type private_key: :class:`~aioufobit.PrivateKey`
+    :param public_keys: The public keys of all cosigners, in the order they
+                        appear in the redeem script.
+    :type public_keys: ``list`` of ``bytes`` or ``str``
+    :param m: The number of signatures required to spend.
+    :type m: ``int``
+    :raises TypeError: If ``private_key`` is not a ``PrivateKey`` or
+                       ``public_keys`` is not a ``list``.
+    :raises ValueError: If the public key of ``private_key`` is not part of
+                        ``public_keys`` or ``m`` is out of range.
+    """
+    __slots__ = ('_pk', 'public_key', 'public_keys', 'ec_public_keys', 'm', 'redeemscript', 'address',
+                 'segwit_address', 'scriptcode', 'sw_scriptcode', 'balance', 'unspents', 'transactions',
+                 'version', 'instance')
+
+    def __init__(self, private_key, public_keys, m):
+        if not isinstance(private_key, PrivateKey):
+            raise TypeError('The private key must be a PrivateKey.')
+        if not isinstance(public_keys, (list, tuple)):
+            raise TypeError('The public keys must be provided as a list.')
+
+        public_keys = [bytes_to_hex(key) if isinstance(key, bytes) else key.lower() for key in public_keys]
+
+        if bytes_to_hex(private_key.public_key) not in public_keys:
+            raise ValueError('The public key of the private key must be one of the public keys.')
+        if not 0 < m <= len(public_keys):
+            raise ValueError('{} signatures cannot be required with {} public keys.'.format(m, len(public_keys)))
+
+        self._pk = private_key
+        self.public_key = private_key.public_key
+        self.public_keys = public_keys
+        # Parsed once, used to match existing signatures of partially-signed transactions.
+        self.ec_public_keys = {key: ECPublicKey(hex_to_bytes(key), context=get_context()) for key in public_keys}
+        self.m = m
+
+        self.redeemscript = multisig_to_redeemscript(public_keys, m)
+        self.address = multisig_to_address(public_keys, m, version='main')
+        self.segwit_address = multisig_to_segwit_address(public_keys, m, version='main')
+        self.scriptcode = self.redeemscript
+        self.sw_scriptcode = b'\x00' + b'\x20' + sha256(self.redeemscript)
+
+        self.balance = 0
+        self.unspents = []
+        self.transactions = []
+
+        self.version = 'main'
+        self.instance = 'MultiSig'
+
+    def sign(self, data):
+        """Signs some data with the private key of this cosigner.
+
+        :param data: The message to sign.
+        :type data: ``bytes``
+        :rtype: ``bytes``
+        """
+        return self._pk.sign(data)
+
+    def match_signature(self, signature, data):
+        """Returns the hex public key among the cosigners which created
+        ``signature`` over ``data``, or ``None``.
+
+        :rtype: ``str``
+        """
+        for key, ec_public_key in self.ec_public_keys.items():
+            if ec_public_key.verify(signature, data):
+                return key
+        return None
+
+    def balance_as(self, currency):
+        """Returns your balance as a formatted string in a particular currency.
+
+        :param currency: One of the :ref:`supported currencies`.
+        :type currency: ``str``
+        :rtype: ``str``
+        """
+        return ufoshi_to_currency_cached(self.balance, currency)
+
+    async def get_balance(self, currency='ufoshi'):
+        """Fetches the current balance by calling
+        :func:`~aioufobit.MultiSig.get_unspents` and returns it using
+        :func:`~aioufobit.MultiSig.balance_as`.
+
+        :param currency: One of the :ref:`supported currencies`.
+        :type currency: ``str``
+        :rtype: ``str``
+        """
+        await self.get_unspents()
+        return self.balance_as(currency)
+
+    async def get_unspents(self):
+        """Fetches all available unspent transaction outputs of both the
+        P2SH and the P2SH-P2WSH address.
+
+        :rtype: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        unspents, sw_unspents = await asyncio.gather(
+            NetworkAPI.get_unspent(self.address),
+            NetworkAPI.get_unspent(self.segwit_address)
+        )
+        # Both addresses share the script-hash version byte, so the segwit
+        # flag reported by the services cannot tell them apart.
+        for unspent in unspents:
+            unspent.segwit = False
+        for unspent in sw_unspents:
+            unspent.segwit = True
+
+        self.unspents[:] = unspents + sw_unspents
+        self.balance = sum(unspent.amount for unspent in self.unspents)
+        return self.unspents
+
+    async def get_transactions(self):
+        """Fetches transaction history.
+
+        :rtype: ``list`` of ``str`` transaction IDs
+        """
+        transactions, sw_transactions = await asyncio.gather(
+            NetworkAPI.get_transactions(self.address),
+            NetworkAPI.get_transactions(self.segwit_address)
+        )
+        self.transactions[:] = transactions + sw_transactions
+        return self.transactions
+
+    def create_transaction(self, outputs, fee=None, leftover=None, combine=True,
+                           message=None, unspents=None):  # pragma: no cover
+        """Creates a transaction spending from the multisignature contract
+        and signs it with this cosigner's key. The result has to be passed
+        to the remaining cosigners' :func:`~aioufobit.MultiSig.sign_transaction`.
+        This accepts the same arguments as
+        :func:`~aioufobit.PrivateKey.create_transaction`.
+
+        :returns: The partially signed transaction as hex.
+        :rtype: ``str``
+        """
+        unspents, outputs = sanitize_tx_data(
+            unspents or self.unspents,
+            outputs,
+            fee,
+            leftover or self.address,
+            combine=combine,
+            message=message,
+            compressed=True,
+            version='main'
+        )
+
+        return create_new_transaction(self, unspents, outputs)
+
+    def sign_transaction(self, tx_data, unspents=None):  # pragma: no cover
+        """Adds this cosigner's signature to a transaction.
+
+        :param tx_data: Output of :func:`~aioufobit.PrivateKey.prepare_transaction`
+                        or a partially signed transaction as hex.
+        :type tx_data: ``str``
+        :param unspents: The UTXOs spent by a partially signed transaction.
+                         These provide the amounts of segwit inputs. By
+                         default the last fetched unspents are used.
+        :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        :returns: The signed transaction as hex.
+        :rtype: ``str``
+        """
+        if not tx_data.lstrip().startswith('{'):
+            return sign_tx(self, tx_data, unspents=unspents)
+
+        data = json.loads(tx_data)
+        unspents = [Unspent.from_dict(unspent) for unspent in data['unspents']]
+        outputs = data['outputs']
+
+        return create_new_transaction(self, unspents, outputs)
+
+    def __repr__(self):
+        return '<MultiSig: {}>'.format(self.address)
+
+
+class TimeLock:
+    """This class represents funds locked to a key until a block height or
+    UNIX timestamp with ``OP_CHECKLOCKTIMEVERIFY`` (BIP-65). Anyone knowing
+    the public key can pay to its P2SH or P2SH-P2WSH address with
+    :func:`~aioufobit.format.timelock_to_address`; only the key can spend
+    the funds, and not before ``locktime``.
+
+    :param private_key: The key the funds are locked to.
+    :type private_key: :class:`~aioufobit.PrivateKey`
+    :param locktime: A block height below 500000000, a UNIX timestamp otherwise.
+    :type locktime: ``int``
+    :raises TypeError: If ``private_key`` is not a ``PrivateKey``.
+    :raises ValueError: If ``locktime`` does not fit 4 bytes.
+    """
+    __slots__ = ('_pk', 'public_key', 'locktime', 'redeemscript', 'address', 'segwit_address', 'scriptcode',
+                 'sw_scriptcode', 'balance', 'unspents', 'transactions', 'version', 'instance')
+
+    def __init__(self, private_key, locktime):
+        if not isinstance(private_key, PrivateKey):
+            raise TypeError('The private key must be a PrivateKey.')
+
+        self._pk = private_key
+        self.public_key = private_key.public_key
+        self.locktime = locktime
+
+        self.redeemscript = timelock_to_redeemscript(self.public_key, locktime)
+        self.address = timelock_to_address(self.public_key, locktime, version='main')
+        self.segwit_address = timelock_to_segwit_address(self.public_key, locktime, version='main')
+        self.scriptcode = self.redeemscript
+        self.sw_scriptcode = b'\x00' + b'\x20' + sha256(self.redeemscript)
+
+        self.balance = 0
+        self.unspents = []
+        self.transactions = []
+
+        self.version = 'main'
+        self.instance = 'TimeLock'
+
+    def sign(self, data):
+        """Signs some data with the private key.
+
+        :param data: The message to sign.
+        :type data: ``bytes``
+        :rtype: ``bytes``
+        """
+        return self._pk.sign(data)
+
+    def is_unlocked(self, height, timestamp):
+        """Whether the funds can be spent in the next block.
+
+        :param height: The height of the best block.
+        :type height: ``int``
+        :param timestamp: The median time of the last 11 blocks.
+        :type timestamp: ``int``
+        :rtype: ``bool``
+        """
+        # A transaction is final once its lock time is below the height of
+        # its block or the median time of the blocks before it.
+        if self.locktime < LOCKTIME_THRESHOLD:
+            return height >= self.locktime
+        return timestamp > self.locktime
+
+    def balance_as(self, currency):
+        """Returns your balance as a formatted string in a particular currency.
+
+        :param currency: One of the :ref:`supported currencies`.
+        :type currency: ``str``
+        :rtype: ``str``
+        """
+        return ufoshi_to_currency_cached(self.balance, currency)
+
+    async def get_balance(self, currency='ufoshi'):
+        """Fetches the current balance by calling
+        :func:`~aioufobit.TimeLock.get_unspents` and returns it using
+        :func:`~aioufobit.TimeLock.balance_as`.
+
+        :param currency: One of the :ref:`supported currencies`.
+        :type currency: ``str``
+        :rtype: ``str``
+        """
+        await self.get_unspents()
+        return self.balance_as(currency)
+
+    async def get_unspents(self):
+        """Fetches all available unspent transaction outputs of both the
+        P2SH and the P2SH-P2WSH address.
+
+        :rtype: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        unspents, sw_unspents = await asyncio.gather(
+            NetworkAPI.get_unspent(self.address),
+            NetworkAPI.get_unspent(self.segwit_address)
+        )
+        for unspent in unspents:
+            unspent.segwit = False
+        for unspent in sw_unspents:
+            unspent.segwit = True
+
+        self.unspents[:] = unspents + sw_unspents
+        self.balance = sum(unspent.amount for unspent in self.unspents)
+        return self.unspents
+
+    async def get_transactions(self):
+        """Fetches transaction history.
+
+        :rtype: ``list`` of ``str`` transaction IDs
+        """
+        transactions, sw_transactions = await asyncio.gather(
+            NetworkAPI.get_transactions(self.address),
+            NetworkAPI.get_transactions(self.segwit_address)
+        )
+        self.transactions[:] = transactions + sw_transactions
+        return self.transactions
+
+    def create_transaction(self, outputs, fee=None, leftover=None, combine=True,
+                           message=None, unspents=None):  # pragma: no cover
+        """Creates a signed transaction spending the locked funds. Its lock
+        time is :attr:`locktime`, so it can be signed at any time but not
+        be mined before. This accepts the same arguments as
+        :func:`~aioufobit.PrivateKey.create_transaction`, except that change
+        goes to the address of the key by default rather than being locked
+        again.
+
+        :returns: The signed transaction as hex.
+        :rtype: ``str``
+        """
+        unspents, outputs = sanitize_tx_data(
+            unspents or self.unspents,
+            outputs,
+            fee,
+            leftover or self._pk.address,
+            combine=combine,
+            message=message,
+            version='main',
+            redeemscript=self.redeemscript
+        )
+
+        return create_new_transaction(self, unspents, outputs, locktime=self.locktime)
+
+    def __repr__(self):
+        return '<TimeLock: {}>'.format(self.address)
+
+
+class WatchOnlyWallet:
+    """This class tracks the addresses of an extended public key without
+    holding any private key. Receive addresses are derived from the external
+    chain ``0`` and change addresses from the internal chain ``1`` of the
+    key, and each chain keeps ``gap_limit`` unused addresses ahead of the
+    last used one.
+
+    :param xpub: The extended public key of the account, e.g. the key at
+                 ``m/44'/0'/0'``. Extended private keys are neutered.
+    :type xpub: ``str`` or :class:`~aioufobit.hd.HDKey`
+    :param gap_limit: The number of consecutive unused addresses after which
+                      scanning stops.
+    :type gap_limit: ``int``
+    :param address_type: ``'legacy'`` for P2PKH or ``'segwit'`` for
+                         P2SH-P2WPKH addresses.
+    :type address_type: ``str``
+    :param service: The backend used for scanning, either
+                    :class:`~aioufobit.network.NetworkAPI` or a connected
+                    :class:`~aioufobit.network.rpc.RPCHost`.
+    :param executor: An optional :class:`concurrent.futures.Executor` used
+                     to derive large address pools.
+    :raises ValueError: If ``address_type`` is unknown.
+    """
+    RECEIVE = 0
+    CHANGE = 1
+
+    def __init__(self, xpub, gap_limit=20, address_type='legacy', service=NetworkAPI, executor=None):
+        if address_type not in ('legacy', 'segwit'):
+            raise ValueError('{} is not a supported address type.'.format(address_type))
+
+        hd_key = xpub if isinstance(xpub, HDKey) else HDKey.from_extended_key(xpub)
+
+        self.hd_key = hd_key.to_public() if hd_key.is_private else hd_key
+        self.gap_limit = gap_limit
+        self.address_type = address_type
+        self.service = service
+        self.executor = executor
+
+        self._nodes = {chain: self.hd_key.child(chain) for chain in (self.RECEIVE, self.CHANGE)}
+        self._chains = {self.RECEIVE: [], self.CHANGE: []}
+        self._last_used = {self.RECEIVE: -1, self.CHANGE: -1}
+
+        self.paths = {}
+        self.unspents = {}
+        self.transactions = {}
+        self.balance = 0
+
+        for chain in self._chains:
+            self._fill(chain)
+
+    @property
+    def addresses(self):
+        """All addresses of the pool, receive addresses first."""
+        return self._chains[self.RECEIVE] + self._chains[self.CHANGE]
+
+    def receive_address(self):
+        """Returns the first receive address after the last used one.
+
+        :rtype: ``str``
+        """
+        return self._chains[self.RECEIVE][self._last_used[self.RECEIVE] + 1]
+
+    def change_address(self):
+        """Returns the first change address after the last used one.
+
+        :rtype: ``str``
+        """
+        return self._chains[self.CHANGE][self._last_used[self.CHANGE] + 1]
+
+    def get_unspents(self):
+        """Returns the unspents of all addresses found by the last scan.
+
+        :rtype: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        """
+        return [unspent for unspents in self.unspents.values() for unspent in unspents]
+
+    async def scan(self, batch_size=100, concurrency=10):
+        """Fetches the history and unspents of every address of the pool,
+        extending the pool until ``gap_limit`` consecutive addresses of each
+        chain are unused. Addresses are queried in batches of ``batch_size``;
+        backends offering ``get_unspents_by_address`` receive a single call
+        per batch.
+
+        :param batch_size: The number of addresses queried per batch.
+        :type batch_size: ``int``
+        :param concurrency: The maximum number of requests in flight.
+        :type concurrency: ``int``
+        :returns: The balance of the pool in ufoshi.
+        :rtype: ``int``
+        """
+        await asyncio.gather(*(
+            self._scan_chain(chain, batch_size, concurrency) for chain in self._chains
+        ))
+        self.balance = sum(unspent.amount for unspent in self.get_unspents())
+        return self.balance
+
+    async def _scan_chain(self, chain, batch_size, concurrency):
+        addresses = self._chains[chain]
+        scanned = 0
+
+        while scanned < len(addresses):
+            batch = addresses[scanned:scanned + batch_size]
+            await self._scan_batch(batch, concurrency)
+            scanned += len(batch)
+            self._fill(chain)
+
+    async def _scan_batch(self, addresses, concurrency):
+        service = self.service
+
+        histories = await gather_limited(
+            (service.get_transactions(address) for address in addresses), concurrency
+        )
+
+        used = []
+        for address, history in zip(addresses, histories):
+            self.transactions[address] = history
+            if history:
+                used.append(address)
+                chain, index = self.paths[address]
+                if index > self._last_used[chain]:
+                    self._last_used[chain] = index
+            else:
+                # Addresses without history cannot hold unspents.
+                self.unspents.pop(address, None)
+
+        if not used:
+            return
+
+        if hasattr(service, 'get_unspents_by_address'):
+            self.unspents.update(await service.get_unspents_by_address(used))
+        else:
+            unspents = await gather_limited(
+                (service.get_unspent(address) for address in used), concurrency
+            )
+            self.unspents.update(zip(used, unspents))
+
+    def _fill(self, chain):
+        addresses = self._chains[chain]
+        missing = self._last_used[chain] + self.gap_limit + 1 - len(addresses)
+
+        if missing <= 0:
+            return
+
+        start = len(addresses)
+        children = self._nodes[chain].derive_range(start, missing, executor=self.executor)
+
+        for index, child in enumerate(children, start):
+            address = child.address if self.address_type == 'legacy' else child.sw_address
+            addresses.append(address)
+            self.paths[address] = (chain, index)
+
+    def __repr__(self):
+        return '<WatchOnlyWallet: {}>'.format(self.hd_key.to_xpub())
+
+
+class Wallet:
+    """This class holds many private keys and keeps an index of the unspents
+    of all their addresses, so funds spread across keys can be refreshed
+    and spent together.
+
+    :param keys: The private keys of the wallet.
+    :type keys: ``list`` of :class:`~aioufobit.PrivateKey`
+    :param service: The backend used for fetching unspents, either
+                    :class:`~aioufobit.network.NetworkAPI` or a connected
+                    :class:`~aioufobit.network.rpc.RPCHost`.
+    """
+
+    def __init__(self, keys=(), service=NetworkAPI):
+        self.service = service
+        self.keys = []
+        self._keys_by_address = {}
+        self._keys_by_script = {}
+
+        # (txid, txindex) -> Unspent and (txid, txindex) -> owning key
+        self.unspents = {}
+        self._owners = {}
+        self.balance = 0
+        # Leases unspents to concurrent sends.
+        self.utxos = UTXOManager()
+
+        for key in keys:
+            self.add_key(key)
+
+    def add_key(self, key):
+        """Adds a private key to the wallet.
+
+        :type key: :class:`~aioufobit.PrivateKey`
+        """
+        self.keys.append(key)
+        self._keys_by_address[key.address] = key
+        self._keys_by_script[key.scriptpubkey] = key
+        self.utxos.addresses.add(key.address)
+        if key.sw_address:
+            self._keys_by_address[key.sw_address] = key
+            self._keys_by_address[key.bech32_address] = key
+            self._keys_by_script[key.sw_scriptpubkey] = key
+            self._keys_by_script[key.bech32_scriptpubkey] = key
+            self.utxos.addresses.update((key.sw_address, key.bech32_address))
+
+    @property
+    def addresses(self):
+        """All addresses of all keys."""
+        return list(self._keys_by_address)
+
+    def get_key(self, address):
+        """Returns the key controlling ``address``, or ``None``.
+
+        :rtype: :class:`~aioufobit.PrivateKey`
+        """
+        return self._keys_by_address.get(address)
+
+    async def refresh(self, concurrency=10, batch_size=100):
+        """Fetches the unspents of all addresses concurrently and rebuilds
+        the unspent index. The ``unspents`` and ``balance`` of every key are
+        updated as well.
+
+        :param concurrency: The maximum number of requests in flight.
+        :type concurrency: ``int``
+        :param batch_size: The number of addresses per call for backends
+                           offering ``get_unspents_by_address``.
+        :type batch_size: ``int``
+        :returns: The balance of the wallet in ufoshi.
+        :rtype: ``int``
+        """
+        addresses = self.addresses
+        service = self.service
+
+        if hasattr(service, 'get_unspents_by_address'):
+            by_address = {}
+            batches = await gather_limited(
+                (service.get_unspents_by_address(addresses[i:i + batch_size])
+                 for i in range(0, len(addresses), batch_size)),
+                concurrency
+            )
+            for batch in batches:
+                by_address.update(batch)
+        else:
+            unspents = await gather_limited(
+                (service.get_unspent(address) for address in addresses), concurrency
+            )
+            by_address = dict(zip(addresses, unspents))
+
+        for key in self.keys:
+            key.unspents[:] = []
+
+        self.unspents.clear()
+        self._owners.clear()
+
+        for address, unspents in by_address.items():
+            key = self._keys_by_address[address]
+            key.unspents += unspents
+            for unspent in unspents:
+                outpoint = (unspent.txid, unspent.txindex)
+                self.unspents[outpoint] = unspent
+                self._owners[outpoint] = key
+
+        for key in self.keys:
+            key.balance = sum(unspent.amount for unspent in key.unspents)
+
+        self.balance = sum(unspent.amount for unspent in self.unspents.values())
+        self.utxos.update(self.unspents.values())
+        return self.balance
+
+    def apply_transaction(self, txid, tx, confirmations=0):
+        """Updates the unspent index with a transaction seen on the network,
+        e.g. pushed by :class:`~aioufobit.network.notify.ZMQSubscriber`,
+        without asking the backend: spent unspents are dropped and outputs
+        paying to the wallet are added.
+
+        :param txid: The ID of the transaction.
+        :type txid: ``str``
+        :type tx: :class:`~aioufobit.transaction.TxObj`
+        :param confirmations: The confirmations of the transaction.
+        :type confirmations: ``int``
+        :returns: Whether the unspents of the wallet changed.
+        :rtype: ``bool``
+        """
+        changed = False
+
+        for txin in tx.TxIn:
+            outpoint = (bytes_to_hex(txin.txid[::-1]), int.from_bytes(txin.txindex, 'little'))
+            unspent = self.unspents.pop(outpoint, None)
+            if unspent is not None:
+                key = self._owners.pop(outpoint)
+                key.unspents.remove(unspent)
+                key.balance -= unspent.amount
+                self.balance -= unspent.amount
+                changed = True
+
+        for txindex, txout in enumerate(tx.TxOut):
+            key = self._keys_by_script.get(txout.script)
+            if key is None:
+                continue
+
+            outpoint = (txid, txindex)
+            if outpoint in self.unspents:
+                unspent = self.unspents[outpoint]
+                unspent.confirmations = max(unspent.confirmations, confirmations)
+                continue
+
+            unspent = Unspent(int.from_bytes(txout.value, 'little'), confirmations,
+                              bytes_to_hex(txout.script), txid, txindex,
+                              segwit=txout.script != key.scriptpubkey)
+            self.unspents[outpoint] = unspent
+            self._owners[outpoint] = key
+            key.unspents.append(unspent)
+            key.balance += unspent.amount
+            self.balance += unspent.amount
+            changed = True
+
+        if changed:
+            self.utxos.update(self.unspents.values())
+
+        return changed
+
+    def discard_transaction(self, txid):
+        """Drops the unspents created by a transaction that will not
+        confirm, e.g. because it was replaced.
+
+        :param txid: The ID of the transaction.
+        :type txid: ``str``
+        :returns: Whether the unspents of the wallet changed.
+        :rtype: ``bool``
+        """
+        outpoints = [outpoint for outpoint in self.unspents if outpoint[0] == txid]
+
+        for outpoint in outpoints:
+            unspent = self.unspents.pop(outpoint)
+            key = self._owners.pop(outpoint)
+            key.unspents.remove(unspent)
+            key.balance -= unspent.amount
+            self.balance -= unspent.amount
+
+        self.utxos.discard(txid)
+        return bool(outpoints)
+
+    def apply_block(self, transactions):
+        """Updates the unspent index with a new block: every unspent gains a
+        confirmation and the block's transactions are applied with
+        :func:`~aioufobit.Wallet.apply_transaction`.
+
+        :param transactions: The txids and transactions of the block.
+        :type transactions: ``list`` of ``tuple``
+        :returns: Whether the unspents of the wallet changed, apart from
+                  confirmations.
+        :rtype: ``bool``
+        """
+        for unspent in self.unspents.values():
+            if unspent.confirmations:
+                unspent.confirmations += 1
+
+        changed = False
+        for txid, tx in transactions:
+            changed |= self.apply_transaction(txid, tx, confirmations=1)
+
+        return changed
+
+    def balance_as(self, currency):
+        """Returns the balance as a formatted string in a particular currency.
+
+        :param currency: One of the :ref:`supported currencies`.
+        :type currency: ``str``
+        :rtype: ``str``
+        """
+        return ufoshi_to_currency_cached(self.balance, currency)
+
+    def create_transaction(self, outputs, fee=None, leftover=None, combine=True,
+                           message=None, unspents=None, replaceable=False, locktime=0):
+        """Creates a transaction spending unspents of any number of keys,
+        each input signed by the key owning it. This accepts the same
+        arguments as :func:`~aioufobit.PrivateKey.create_transaction`; change
+        goes to the first key's address by default.
+
+        :returns: The signed transaction as hex.
+        :rtype: ``str``
+        :raises ValueError: If an unspent does not belong to the wallet.
+        """
+        return self._create_transaction(outputs, fee, leftover, combine, message, unspents, replaceable, locktime)[0]
+
+    def _create_transaction(self, outputs, fee, leftover, combine, message, unspents, replaceable=False, locktime=0):
+        unspents, outputs = sanitize_tx_data(
+            unspents or list(self.unspents.values()),
+            outputs,
+            fee,
+            leftover or self.keys[0].address,
+            combine=combine,
+            message=message,
+            compressed=all(key.is_compressed() for key in self.keys),
+            version='main'
+        )
+
+        return self._sign(unspents, outputs, RBF_SEQUENCE if replaceable else SEQUENCE, locktime), unspents
+
+    def _sign(self, unspents, outputs, sequence=SEQUENCE, locktime=0):
+        return self.sign_tx(create_unsigned_transaction(unspents, outputs, sequence, locktime), unspents)
+
+    def sign_tx(self, tx, unspents):
+        """Signs every input of a transaction with the key owning the
+        unspent it spends, judged by its scriptPubKey if the unspent is not
+        in the index, e.g. because it was spent by a replaced transaction.
+
+        :type tx: :class:`~aioufobit.transaction.TxObj`
+        :param unspents: The unspents spent by the inputs, in order.
+        :type unspents: ``list`` of :class:`~aioufobit.network.meta.Unspent`
+        :returns: The signed transaction as hex.
+        :rtype: ``str``
+        :raises ValueError: If an unspent does not belong to the wallet.
+        """
+        signers = {}
+        for i, unspent in enumerate(unspents):
+            key = self._owners.get((unspent.txid, unspent.txindex)) or self._keys_by_script.get(
+                hex_to_bytes(unspent.script)
+            )
+            if key is None:
+                raise ValueError('Unspent {}:{} does not belong to this wallet.'.format(unspent.txid, unspent.txindex))
+            signers.setdefault(key.address, (key, []))[1].append(i)
+
+        for key, indices in signers.values():
+            tx_hex = sign_tx(key, tx, j=indices, unspents=unspents)
+
+        return tx_hex
+
+    async def send(self, outputs, fee=None, leftover=None, combine=None,
+                   message=None, unspents=None, replaceable=False, locktime=0):
+        """Creates a transaction like :func:`~aioufobit.Wallet.create_transaction`
+        and broadcasts it. Unless ``unspents`` are given, they are leased
+        from :attr:`utxos`, so concurrent sends do not select the same ones;
+        only the unspents needed are leased unless ``combine=True``. The
+        index is updated with the broadcast transaction, including its
+        change.
+
+        :returns: The transaction ID.
+        :rtype: ``str``
+        """
+        if unspents:
+            tx_hex, _ = self._create_transaction(outputs, fee, leftover, combine is not False, message, unspents,
+                                                 replaceable, locktime)
+            txid = await NetworkAPI.broadcast_tx(tx_hex)
+        else:
+            lease = self.utxos.reserve(outputs, fee, leftover or self.keys[0].address,
+                                       combine=bool(combine), message=message,
+                                       compressed=all(key.is_compressed() for key in self.keys))
+            sequence = RBF_SEQUENCE if replaceable else SEQUENCE
+            txid, tx_hex = await broadcast_leased(
+                lease, lambda lease: self._sign(lease.unspents, lease.outputs, sequence, locktime)
+            )
+
+        if txid:
+            self.apply_transaction(txid, parse_tx(hex_to_bytes(tx_hex))[0])
+
+        return txid
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return '<Wallet: {} keys>'.format(len(self.keys))
+
+
 Key = PrivateKey
\ No newline at end of file
@@ -37,6 +37,15 @@ async def print_tokens(txid):
 
     await rpc.omni_sendgrant(wallet.sw_address, wallet.sw_address, property_id, "999")
 
+async def distribute_tokens(property_id, holders):
+    # One batched pipeline instead of a round trip per holder.
+    results = await rpc.omni_sendgrant_many(wallet.sw_address, [(holder, "1") for holder in holders], property_id)
+    failed = [holder for holder, result in zip(holders, results) if isinstance(result, Exception)]
+
+    balances = await rpc.omni_getbalances(holders, [property_id])
+
+    return failed, balances
+
 async def create_nft():
     nft = await rpc.create_nft(
         ecosystem=1, 
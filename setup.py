@@ -47,6 +47,8 @@ setup(
     extras_require={
         'cli': ('appdirs', 'click', 'privy', 'tinydb'),
         'cache': ('lmdb', ),
+        'numpy': ('numpy', ),
+        'zmq': ('pyzmq', ),
     },
     tests_require=['pytest'],
 
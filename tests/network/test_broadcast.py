@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+from aioufobit.exceptions import UfoNodeException
+from aioufobit.network import NetworkAPI
+from aioufobit.network.broadcast import (
+    BROADCAST, CONFLICT, KNOWN, PENDING, REJECTED, TRANSIENT, BroadcastQueue, classify_error,
+    default_providers
+)
+from aioufobit.network.meta import Unspent
+from aioufobit.network.rpc import RPCHost
+from aioufobit.transaction import calc_txid, create_new_transaction
+from aioufobit.wallet import PrivateKey
+
+KEY = PrivateKey.from_int(2)
+TX_HEX = create_new_transaction(KEY, [Unspent(4000000, 1, '', '11' * 32, 0)], [(KEY.address, 3000000)])
+TXID = calc_txid(TX_HEX)
+
+
+class Provider:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def __call__(self, tx_hex):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class Confirmations:
+    def __init__(self, value=0):
+        self.value = value
+
+    async def __call__(self, txid):
+        return self.value
+
+
+def record(queue):
+    events = []
+    for event in ('broadcast', 'confirmation', 'failed'):
+        queue.subscribe(event, lambda *args, event=event: events.append((event,) + args[:3]))
+    return events
+
+
+def test_classify_error():
+    assert classify_error(UfoNodeException("{'code': -27, 'message': 'Transaction already in block chain'}")) == KNOWN
+    assert classify_error(UfoNodeException("{'code': -26, 'message': 'txn-mempool-conflict'}")) == CONFLICT
+    assert classify_error(UfoNodeException('bad-txns-inputs-missingorspent')) == CONFLICT
+    assert classify_error(UfoNodeException("{'code': -25, 'message': 'Missing inputs'}")) == TRANSIENT
+    assert classify_error(ConnectionError('All APIs are unreachable.')) == TRANSIENT
+    assert classify_error(asyncio.TimeoutError()) == TRANSIENT
+    assert classify_error(Exception('Error with status code: 503')) == TRANSIENT
+    assert classify_error(UfoNodeException('bad-txns-vout-negative')) == REJECTED
+
+
+class TestBroadcastQueue:
+    def test_submit(self):
+        accepting = Provider(TXID)
+        failing = Provider(ConnectionError())
+        queue = BroadcastQueue([failing, accepting], Confirmations())
+        events = record(queue)
+
+        assert asyncio.run(queue.submit(TX_HEX)) == TXID
+        assert queue.state(TXID) == BROADCAST
+        assert events == [('broadcast', TXID)]
+        assert accepting.calls == failing.calls == 1
+
+        # Submitting again does nothing.
+        asyncio.run(queue.submit(TX_HEX))
+        assert accepting.calls == 1
+
+    def test_known(self):
+        queue = BroadcastQueue([Provider(UfoNodeException('txn-already-in-mempool'))], Confirmations())
+        asyncio.run(queue.submit(TX_HEX))
+        assert queue.state(TXID) == BROADCAST
+
+    def test_conflict(self):
+        queue = BroadcastQueue([Provider(UfoNodeException('txn-mempool-conflict')), Provider(ConnectionError())],
+                               Confirmations())
+        events = record(queue)
+        asyncio.run(queue.submit(TX_HEX))
+        assert events[0][:3] == ('failed', TXID, CONFLICT)
+
+        asyncio.run(queue.process())
+        assert TXID not in queue
+
+    def test_retry(self):
+        provider = Provider(ConnectionError(), ConnectionError(), TXID)
+        queue = BroadcastQueue([provider], Confirmations(), backoff=0)
+        asyncio.run(queue.submit(TX_HEX))
+        assert queue.state(TXID) == PENDING
+        assert queue.entries[TXID]['attempts'] == 1
+
+        asyncio.run(queue.process())
+        asyncio.run(queue.process())
+        assert queue.state(TXID) == BROADCAST
+        assert provider.calls == 3
+
+    def test_backoff(self):
+        provider = Provider(ConnectionError())
+        queue = BroadcastQueue([provider], Confirmations(), backoff=60)
+        asyncio.run(queue.submit(TX_HEX))
+        asyncio.run(queue.process())
+        assert provider.calls == 1
+
+    def test_retries_exhausted(self):
+        queue = BroadcastQueue([Provider(ConnectionError())], Confirmations(), backoff=0, retries=2)
+        events = record(queue)
+        asyncio.run(queue.submit(TX_HEX))
+        asyncio.run(queue.process())
+        assert events[0][:3] == ('failed', TXID, TRANSIENT)
+
+    def test_confirmations(self):
+        confirmations = Confirmations(0)
+        queue = BroadcastQueue([Provider(TXID)], confirmations)
+        events = record(queue)
+        asyncio.run(queue.submit(TX_HEX))
+
+        confirmations.value = 7
+        asyncio.run(queue.process())
+        assert events[1:] == [('confirmation', TXID, 1, 7), ('confirmation', TXID, 6, 7)]
+
+        confirmations.value = 30
+        asyncio.run(queue.process())
+        assert events[-1] == ('confirmation', TXID, 30, 30)
+        assert TXID not in queue
+
+    def test_rebroadcast(self):
+        provider = Provider(TXID)
+        confirmations = Confirmations(0)
+        queue = BroadcastQueue([provider], confirmations, rebroadcast_interval=600)
+        asyncio.run(queue.submit(TX_HEX))
+
+        asyncio.run(queue.process())
+        assert provider.calls == 1
+
+        # Dropped by the network.
+        confirmations.value = None
+        asyncio.run(queue.process())
+        assert provider.calls == 2
+
+        # Unconfirmed for too long.
+        confirmations.value = 0
+        queue.entries[TXID]['next_attempt'] = 0
+        asyncio.run(queue.process())
+        assert provider.calls == 3
+
+    def test_rebroadcast_failure(self):
+        provider = Provider(TXID, None, UfoNodeException('bad-txns-vout-negative'),
+                            UfoNodeException('bad-txns-inputs-missingorspent'))
+        confirmations = Confirmations(0)
+        queue = BroadcastQueue([provider], confirmations)
+        events = record(queue)
+        asyncio.run(queue.submit(TX_HEX))
+
+        # A rejected rebroadcast keeps the transaction.
+        for _ in range(2):
+            queue.entries[TXID]['next_attempt'] = 0
+            asyncio.run(queue.process())
+            assert queue.state(TXID) == BROADCAST
+
+        # Its inputs are spent while it is known, i.e. it was mined.
+        queue.entries[TXID]['next_attempt'] = 0
+        asyncio.run(queue.process())
+        assert queue.state(TXID) == BROADCAST
+
+        # Dropped by the network for a conflicting transaction.
+        confirmations.value = None
+        asyncio.run(queue.process())
+        assert TXID not in queue
+        assert events[-1][:3] == ('failed', TXID, CONFLICT)
+        assert provider.calls == 5
+
+    def test_default_providers(self, monkeypatch):
+        node = RPCHost('user', 'password', 'localhost', 8332, False)
+        monkeypatch.setattr(NetworkAPI, 'BROADCAST_TX_MAIN', [node.broadcast_tx, print])
+        assert default_providers() == [node.sendrawtransaction, print]
+
+    def test_persistence(self, tmp_path):
+        path = str(tmp_path / 'queue.json')
+        queue = BroadcastQueue([Provider(ConnectionError())], Confirmations(), path=path)
+        asyncio.run(queue.submit(TX_HEX))
+
+        provider = Provider(TXID)
+        queue = BroadcastQueue([provider], Confirmations(), path=path, backoff=0)
+        assert queue.state(TXID) == PENDING
+        queue.entries[TXID]['next_attempt'] = 0
+        asyncio.run(queue.process())
+        assert queue.state(TXID) == BROADCAST
+        assert BroadcastQueue([], path=path).state(TXID) == BROADCAST
+
+    def test_invalid_event(self):
+        with pytest.raises(ValueError):
+            BroadcastQueue().subscribe('confirmed', print)
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from aioufobit.block import Block
+from aioufobit.exceptions import UfoNodeException
+from aioufobit.network.meta import Unspent
+from aioufobit.network.mempool import MempoolPayment, MempoolTracker
+from aioufobit.transaction import create_new_transaction, parse_tx
+from aioufobit.utils import hex_to_bytes
+from aioufobit.wallet import PrivateKey
+
+KEY = PrivateKey.from_int(2)
+OTHER = PrivateKey.from_int(3)
+OUTPOINT = Unspent(4000000, 1, '', '11' * 32, 0)
+
+
+def make_tx(unspent, outputs):
+    tx_hex = create_new_transaction(KEY, [unspent], outputs)
+    tx, txid, _ = parse_tx(hex_to_bytes(tx_hex))
+    return txid, tx, tx_hex
+
+
+PAYMENT_TXID, PAYMENT, PAYMENT_HEX = make_tx(OUTPOINT, [(KEY.address, 3000000), (OTHER.address, 500000)])
+CHILD_TXID, CHILD, CHILD_HEX = make_tx(Unspent(3000000, 0, '', PAYMENT_TXID, 0), [(OTHER.address, 2000000)])
+CONFLICT_TXID, CONFLICT, CONFLICT_HEX = make_tx(OUTPOINT, [(OTHER.address, 3900000)])
+
+
+def record(tracker):
+    events = []
+    for event in ('payment', 'double_spend', 'remove'):
+        tracker.subscribe(event, lambda *args, event=event: events.append((event,) + args))
+    return events
+
+
+class MockNode:
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.fetched = []
+
+    async def getrawmempool(self):
+        return list(self.transactions)
+
+    async def get_transaction_by_id(self, txid):
+        self.fetched.append(txid)
+        if txid not in self.transactions:
+            raise UfoNodeException('No such mempool or blockchain transaction.')
+        return self.transactions[txid]
+
+
+class TestMempoolTracker:
+    def test_payment(self):
+        tracker = MempoolTracker(addresses=[KEY.address])
+        events = record(tracker)
+
+        assert asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+        assert not asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+
+        payment = MempoolPayment(KEY.address, PAYMENT_TXID, 0, 3000000)
+        assert events == [('payment', payment)]
+        assert tracker.get_payments(KEY.address) == [payment]
+        assert tracker.get_payments(OTHER.address) == []
+        assert tracker.spender('11' * 32, 0) == PAYMENT_TXID
+        assert PAYMENT_TXID in tracker
+
+    def test_double_spend(self):
+        tracker = MempoolTracker(addresses=[KEY.address])
+        asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+        asyncio.run(tracker.add_transaction(CHILD_TXID, CHILD))
+        events = record(tracker)
+
+        asyncio.run(tracker.add_transaction(CONFLICT_TXID, CONFLICT))
+
+        assert events == [
+            ('double_spend', ('11' * 32, 0), PAYMENT_TXID, CONFLICT_TXID),
+            ('remove', CHILD_TXID, 'replaced'),
+            ('remove', PAYMENT_TXID, 'replaced'),
+        ]
+        assert list(tracker.transactions) == [CONFLICT_TXID]
+        assert tracker.spender('11' * 32, 0) == CONFLICT_TXID
+        assert tracker.get_payments(KEY.address) == []
+
+    def test_apply_block(self):
+        tracker = MempoolTracker()
+        asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+        asyncio.run(tracker.add_transaction(CHILD_TXID, CHILD))
+        events = record(tracker)
+
+        asyncio.run(tracker.apply_block(Block('00' * 32, None, [(PAYMENT_TXID, PAYMENT)])))
+        assert events == [('remove', PAYMENT_TXID, 'confirmed')]
+        assert CHILD_TXID in tracker
+
+        # A conflicting transaction confirmed in a block.
+        asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+        del events[:]
+        asyncio.run(tracker.apply_block(Block('00' * 32, None, [(CONFLICT_TXID, CONFLICT)])))
+        assert events[0] == ('double_spend', ('11' * 32, 0), PAYMENT_TXID, CONFLICT_TXID)
+        assert len(tracker) == 0
+
+    def test_eviction(self):
+        tracker = MempoolTracker(addresses=[KEY.address], max_transactions=1)
+        events = record(tracker)
+        asyncio.run(tracker.add_transaction(PAYMENT_TXID, PAYMENT))
+        asyncio.run(tracker.add_transaction(CHILD_TXID, CHILD))
+
+        assert events[-1] == ('remove', PAYMENT_TXID, 'evicted')
+        assert list(tracker.transactions) == [CHILD_TXID]
+        assert tracker.payments == {}
+        assert tracker.relevant == {}
+
+    def test_poll(self):
+        node = MockNode({PAYMENT_TXID: PAYMENT_HEX, CHILD_TXID: CHILD_HEX})
+        tracker = MempoolTracker(node, addresses=[KEY.address, OTHER.address])
+        events = record(tracker)
+
+        assert asyncio.run(tracker.poll()) == 2
+        assert len(tracker.get_payments(OTHER.address)) == 2
+
+        # Only new transactions are fetched.
+        node.transactions = {CHILD_TXID: CHILD_HEX}
+        node.fetched = []
+        del events[:]
+        assert asyncio.run(tracker.poll()) == 0
+        assert node.fetched == []
+        assert events == [('remove', PAYMENT_TXID, 'dropped')]
+
+    def test_poll_vanished(self):
+        node = MockNode({PAYMENT_TXID: PAYMENT_HEX})
+
+        async def getrawmempool():
+            return [PAYMENT_TXID, CHILD_TXID]
+
+        node.getrawmempool = getrawmempool
+        tracker = MempoolTracker(node)
+        assert asyncio.run(tracker.poll()) == 1
+
+    def test_invalid_event(self):
+        with pytest.raises(ValueError):
+            MempoolTracker().subscribe('confirm', print)
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from aioufobit.block import parse_header
+from aioufobit.network.notify import ZMQSubscriber
+from aioufobit.transaction import parse_tx
+from aioufobit.wallet import Wallet
+from ..samples import BLOCK, KEY, LEGACY_TX, SEGWIT_TX
+
+zmq = pytest.importorskip('zmq')
+import zmq.asyncio  # noqa: E402
+
+BLOCK_HASH = parse_header(BLOCK).hash
+
+
+def publish_until(publisher, messages, done, timeout=5):
+    """Publishes ``messages`` until ``done`` is set, as subscriptions only
+    take effect some time after connecting."""
+    async def publish():
+        for _ in range(int(timeout / 0.05)):
+            for message in messages:
+                await publisher.send_multipart(message)
+            await asyncio.sleep(0.05)
+            if done.is_set():
+                return
+        raise TimeoutError
+
+    return publish()
+
+
+class TestZMQSubscriber:
+    def test_invalid_topic(self):
+        with pytest.raises(ValueError):
+            ZMQSubscriber('tcp://127.0.0.1:1', topics=['sequence'])
+        with pytest.raises(ValueError):
+            ZMQSubscriber('tcp://127.0.0.1:1').subscribe('rawmempool', print)
+
+    def test_dispatch(self):
+        subscriber = ZMQSubscriber('tcp://127.0.0.1:1')
+        received = []
+        subscriber.subscribe('rawtx', lambda txid, tx: received.append(txid))
+        subscriber.subscribe('hashblock', lambda block_hash: received.append(block_hash))
+
+        async def callback(block):
+            received.append(block.hash)
+
+        subscriber.subscribe('rawblock', callback)
+
+        asyncio.run(subscriber.dispatch('rawtx', LEGACY_TX))
+        asyncio.run(subscriber.dispatch('rawblock', BLOCK))
+        asyncio.run(subscriber.dispatch('hashblock', b'\xab' * 32))
+
+        assert received == [parse_tx(LEGACY_TX)[1], BLOCK_HASH, 'ab' * 32]
+
+    def test_gap(self):
+        subscriber = ZMQSubscriber('tcp://127.0.0.1:1')
+        gaps = []
+        subscriber.subscribe('gap', lambda *args: gaps.append(args))
+
+        async def dispatch():
+            for sequence in (0, 1, 3):
+                await subscriber.dispatch('hashblock', b'\x00' * 32, sequence)
+            await subscriber.dispatch('rawtx', LEGACY_TX, 9)
+
+        asyncio.run(dispatch())
+        assert gaps == [('hashblock', 2, 3)]
+
+    def test_failing_callback(self):
+        subscriber = ZMQSubscriber('tcp://127.0.0.1:1')
+        received = []
+        subscriber.subscribe('hashblock', lambda block_hash: 1 / 0)
+        subscriber.subscribe('hashblock', received.append)
+
+        asyncio.run(subscriber.dispatch('hashblock', b'\x00' * 32))
+        assert received == ['00' * 32]
+
+    def test_publisher(self):
+        async def run():
+            context = zmq.asyncio.Context()
+            publisher = context.socket(zmq.PUB)
+            port = publisher.bind_to_random_port('tcp://127.0.0.1')
+
+            subscriber = ZMQSubscriber('tcp://127.0.0.1:{}'.format(port), context=context)
+            received = []
+            done = asyncio.Event()
+
+            def on_tx(txid, tx):
+                received.append(txid)
+                done.set()
+
+            subscriber.subscribe('rawtx', on_tx)
+
+            async with subscriber:
+                task = asyncio.ensure_future(subscriber.run())
+                try:
+                    await publish_until(publisher, [
+                        [b'hashblock', b'\x00' * 32, (0).to_bytes(4, 'little')],
+                        [b'rawtx', SEGWIT_TX, (0).to_bytes(4, 'little')],
+                    ], done)
+                finally:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+            publisher.close(linger=0)
+            context.term()
+            return received
+
+        received = asyncio.run(run())
+        assert received[0] == parse_tx(SEGWIT_TX)[1]
+
+    def test_watch_wallet(self):
+        wallet = Wallet([KEY])
+        subscriber = ZMQSubscriber('tcp://127.0.0.1:1')
+        subscriber.watch_wallet(wallet)
+
+        # The legacy transaction pays 3000000 to the key's address.
+        asyncio.run(subscriber.dispatch('rawtx', LEGACY_TX))
+        assert wallet.balance == 3000000
+        assert wallet.unspents[(parse_tx(LEGACY_TX)[1], 0)].confirmations == 0
+
+        asyncio.run(subscriber.dispatch('rawblock', BLOCK))
+        assert wallet.balance == 6000000
+        assert {unspent.confirmations for unspent in wallet.unspents.values()} == {1}
+
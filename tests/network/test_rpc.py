@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from aioufobit.exceptions import UfoNodeException
+from aioufobit.network.rpc import OMNIRPCHost
+
+
+class MockResponse:
+    def __init__(self, body, status=200):
+        self.status = status
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+    async def text(self):
+        return str(self.body)
+
+
+class MockNode(OMNIRPCHost):
+    def __init__(self, **kwargs):
+        super().__init__('user', 'password', '127.0.0.1', 8444, False, **kwargs)
+        self.requests = []
+
+    def handle(self, method, args):
+        if method == 'omni_send' and args[1] == 'bad':
+            raise UfoNodeException({'code': -5, 'message': 'Invalid address'})
+        if method == 'omni_getbalance':
+            return {'balance': str(len(args[0]) * args[1]), 'reserved': '0'}
+        return '{}:{}'.format(method, ','.join(map(str, args)))
+
+    def respond(self, method, args, id=None):
+        try:
+            return {'result': self.handle(method, args), 'error': None, 'id': id}
+        except UfoNodeException as e:
+            return {'result': None, 'error': e.args[0], 'id': id}
+
+    async def make_request(self, method, args=None):
+        self.requests.append([(method, args)])
+        return MockResponse(self.respond(method, args))
+
+    async def make_batch_request(self, calls):
+        self.requests.append(calls)
+        # Answered in reverse to check responses are matched by id.
+        return MockResponse([self.respond(method, args, i) for i, (method, args) in enumerate(calls)][::-1])
+
+
+def test_rpc_batch():
+    node = MockNode()
+    calls = [('getblockhash', [height]) for height in range(250)]
+
+    results = asyncio.run(node.rpc_batch(calls))
+
+    assert results == ['getblockhash:{}'.format(height) for height in range(250)]
+    assert [len(request) for request in node.requests] == [100, 100, 50]
+
+
+def test_rpc_batch_errors():
+    node = MockNode()
+    calls = [('omni_send', ['from', 'bad', 1, '1']), ('getblockcount', [])]
+
+    with pytest.raises(UfoNodeException):
+        asyncio.run(node.rpc_batch(calls))
+
+    error, count = asyncio.run(node.rpc_batch(calls, return_exceptions=True))
+    assert isinstance(error, UfoNodeException) and 'Invalid address' in str(error)
+    assert count == 'getblockcount:'
+
+
+def test_rpc_batch_rejected():
+    node = MockNode()
+
+    async def make_batch_request(calls):
+        return MockResponse({'result': None, 'error': {'code': -32700, 'message': 'Parse error'}, 'id': None})
+
+    node.make_batch_request = make_batch_request
+    with pytest.raises(UfoNodeException):
+        asyncio.run(node.rpc_batch([('getblockcount', [])]))
+
+
+def test_omni_send_many():
+    node = MockNode()
+    txids = asyncio.run(node.omni_send_many('from', [('a', 1), ('bad', 2), ('c', '3.5')], 7))
+
+    assert txids[0] == 'omni_send:from,a,7,1'
+    assert isinstance(txids[1], UfoNodeException)
+    assert txids[2] == 'omni_send:from,c,7,3.5'
+    assert len(node.requests) == 1
+
+
+def test_omni_sendgrant_many():
+    node = MockNode()
+    txids = asyncio.run(node.omni_sendgrant_many('from', [('a', 10), ('b', 20)], 7))
+    assert txids == ['omni_sendgrant:from,a,7,10', 'omni_sendgrant:from,b,7,20']
+
+
+def test_omni_getbalances():
+    node = MockNode()
+    balances = asyncio.run(node.omni_getbalances(['a', 'bb'], [1, 2]))
+
+    assert balances[('bb', 2)]['balance'] == '4'
+    assert list(balances) == [('a', 1), ('a', 2), ('bb', 1), ('bb', 2)]
+    assert len(node.requests) == 1
+
+
+def test_payload_cache():
+    node = MockNode(payload_cache_size=2)
+
+    async def run():
+        first = await node.create_token(1, 2, 'Fixed', 'User', 'Dummy', '', '', fixed=True, amount='1000')
+        again = await node.create_token(1, 2, 'Fixed', 'User', 'Dummy', '', '', fixed=True, amount='1000')
+        await node.create_nft(1, 'NFT', 'User', 'Dummy', '', '')
+        await node.create_token(1, 2, 'Managed', 'User', 'Dummy', '', '', fixed=False)
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert first == again
+    assert len(node.requests) == 3
+    assert len(node._payloads) == 2
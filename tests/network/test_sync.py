@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from aioufobit.block import parse_header
+from aioufobit.network.sync import ChainSync
+from aioufobit.transaction import parse_tx
+from ..samples import LEGACY_TX
+
+
+def make_chain(length, fork=None, tag=0):
+    """Builds serialized blocks of one transaction each, extending
+    ``fork`` if given."""
+    chain = list(fork or [])
+    for height in range(len(chain), length):
+        prev = bytes.fromhex(parse_header(chain[-1]).hash)[::-1] if chain else b'\x00' * 32
+        header = (1).to_bytes(4, 'little') + prev + b'\x00' * 32 + (height + tag).to_bytes(12, 'little')
+        chain.append(header + b'\x01' + LEGACY_TX)
+    return chain
+
+
+class MockNode:
+    def __init__(self, chain):
+        self.chain = chain
+
+    async def getblockcount(self):
+        return len(self.chain) - 1
+
+    async def getblockhash(self, height):
+        return parse_header(self.chain[height]).hash
+
+    async def get_raw_block(self, block_hash):
+        await asyncio.sleep(0)
+        for raw in self.chain:
+            if parse_header(raw).hash == block_hash:
+                return raw
+        raise ValueError(block_hash)
+
+
+def record(sync):
+    events = []
+    sync.subscribe('connect', lambda height, block: events.append(
+        ('connect', height, block.hash, [txid for txid, _ in block.transactions])
+    ))
+
+    async def disconnect(height, block_hash):
+        events.append(('disconnect', height, block_hash))
+
+    sync.subscribe('disconnect', disconnect)
+    return events
+
+
+class TestChainSync:
+    def test_sync(self):
+        node = MockNode(make_chain(40))
+        sync = ChainSync(node, window=7)
+        events = record(sync)
+
+        assert asyncio.run(sync.sync()) == 40
+        assert [event[1] for event in events] == list(range(40))
+        assert events[5][2] == parse_header(node.chain[5]).hash
+        assert events[5][3] == [parse_tx(LEGACY_TX)[1]]
+        assert sync.height == 39
+        assert sync.tip == events[-1][2]
+        assert asyncio.run(sync.sync()) == 0
+
+    def test_start_height(self):
+        sync = ChainSync(MockNode(make_chain(10)), start_height=6)
+        events = record(sync)
+        assert asyncio.run(sync.sync()) == 4
+        assert events[0][1] == 6
+
+    def test_reorg(self):
+        chain = make_chain(20)
+        node = MockNode(chain)
+        sync = ChainSync(node, window=4)
+        events = record(sync)
+        asyncio.run(sync.sync())
+
+        node.chain = make_chain(22, fork=chain[:17], tag=1000)
+        del events[:]
+        assert asyncio.run(sync.sync()) == 5
+
+        assert [event[:2] for event in events] == [
+            ('disconnect', 19), ('disconnect', 18), ('disconnect', 17),
+            ('connect', 17), ('connect', 18), ('connect', 19), ('connect', 20), ('connect', 21),
+        ]
+        assert sync.tip == parse_header(node.chain[21]).hash
+
+    def test_reorg_too_deep(self):
+        chain = make_chain(20)
+        node = MockNode(chain)
+        sync = ChainSync(node, reorg_depth=3)
+        asyncio.run(sync.sync())
+
+        node.chain = make_chain(20, fork=chain[:10], tag=1000)
+        with pytest.raises(ValueError):
+            asyncio.run(sync.sync())
+
+    def test_checkpoint(self, tmp_path):
+        checkpoint = str(tmp_path / 'sync.json')
+        node = MockNode(make_chain(30))
+        asyncio.run(ChainSync(node, checkpoint=checkpoint, reorg_depth=10).sync())
+
+        node.chain = make_chain(35, fork=node.chain)
+        sync = ChainSync(node, checkpoint=checkpoint, reorg_depth=10)
+        events = record(sync)
+        assert sync.height == 29
+        assert len(sync.hashes) == 10
+
+        assert asyncio.run(sync.sync()) == 5
+        assert events[0][1] == 30
+
+    def test_failing_callback(self, tmp_path):
+        checkpoint = str(tmp_path / 'sync.json')
+        node = MockNode(make_chain(10))
+        sync = ChainSync(node, checkpoint=checkpoint, window=3)
+
+        def connect(height, block):
+            if height == 5:
+                raise RuntimeError
+
+        sync.subscribe('connect', connect)
+        rollbacks = []
+        sync.subscribe('rollback', lambda: rollbacks.append(sync.height))
+        with pytest.raises(RuntimeError):
+            asyncio.run(sync.sync())
+
+        # The window holding the failed block is delivered again.
+        assert rollbacks == [2]
+        assert sync.height == 2 and max(sync.hashes) == 2
+        assert ChainSync(node, checkpoint=checkpoint).height == 2
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ChainSync(MockNode([]), window=0)
+        with pytest.raises(ValueError):
+            ChainSync(MockNode([])).subscribe('block', print)
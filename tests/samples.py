@@ -1,3 +1,8 @@
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import create_new_transaction
+from aioufobit.utils import hex_to_bytes, int_to_varint
+from aioufobit.wallet import PrivateKey
+
 BINARY_ADDRESS = b'\x00\x92F\x1b\xdeb\x83\xb4a\xec\xe7\xdd\xf4\xdb\xf1\xe0\xa4\x8b\xd1\x13\xd8&E\xb4\xbf'
 BITCOIN_ADDRESS = '1ELReFsTCUY2mfaDTy32qxYiT49z786eFg'
 BITCOIN_ADDRESS_COMPRESSED = '1ExJJsNLQDNVVM1s1sdyt1o5P3GC5r32UG'
@@ -32,3 +37,18 @@ WALLET_FORMAT_COMPRESSED_MAIN = 'L3jsepcttyuJK3HKezD4qqRKGtwc8d2d1Nw6vsoPDX9cMcU
 WALLET_FORMAT_COMPRESSED_TEST = 'cU6s7jckL3bZUUkb3Q2CD9vNu8F1o58K5R5a3JFtidoccMbhEGKZ'
 WALLET_FORMAT_MAIN = '5KHxtARu5yr1JECrYGEA2YpCPdh1i9ciEgQayAF8kcqApkGzT9s'
 WALLET_FORMAT_TEST = '934bTuFSgCv9GHi9Ac84u9NA3J3isK9uadGY3nbe6MaDbnQdcbn'
+
+# Transactions and a block built from them, for parsing and notifications.
+KEY = PrivateKey.from_int(2)
+LEGACY_TX = hex_to_bytes(create_new_transaction(
+    KEY, [Unspent(4000000, 1, '', '11' * 32, 0)], [(KEY.address, 3000000)]
+))
+SEGWIT_TX = hex_to_bytes(create_new_transaction(
+    KEY, [Unspent(4000000, 1, KEY.sw_scriptcode.hex(), '33' * 32, 2, segwit=True)],
+    [(KEY.bech32_address, 3000000)]
+))
+BLOCK_HEADER = (
+    (2).to_bytes(4, 'little') + b'\x01' * 32 + b'\x02' * 32 +
+    (1500000000).to_bytes(4, 'little') + (0x1d00ffff).to_bytes(4, 'little') + (7).to_bytes(4, 'little')
+)
+BLOCK = BLOCK_HEADER + int_to_varint(2) + LEGACY_TX + SEGWIT_TX
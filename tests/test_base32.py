@@ -0,0 +1,81 @@
+import pytest
+
+from aioufobit.base32 import (
+    BECH32, BECH32M, bech32_decode, convertbits, decode, decode_many, encode,
+    encode_many
+)
+
+# Test vectors of BIP-173 and BIP-350.
+VALID_ADDRESSES = [
+    ('BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4', '0014751e76e8199196d454941c45d1b3a323f1433bd6'),
+    ('tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sl5k7',
+     '00201863143c14c5166804bd19203356da136c985678cd4d27a1b8c6329604903262'),
+    ('bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y',
+     '5128751e76e8199196d454941c45d1b3a323f1433bd6751e76e8199196d454941c45d1b3a323f1433bd6'),
+    ('BC1SW50QGDZ25J', '6002751e'),
+    ('bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs', '5210751e76e8199196d454941c45d1b3a323'),
+    ('bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0',
+     '512079be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798'),
+]
+
+INVALID_ADDRESSES = [
+    # bech32 checksum for witness version 1.
+    'bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd',
+    # bech32m checksum for witness version 0.
+    'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh',
+    'tb1z0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqglt7rf',
+    'BC1S0XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ54WELL',
+    'bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs0',
+    'bc1qr508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4',
+    'tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sL5k7',
+    'bc1gmk9yu',
+]
+
+
+def witness_program(script):
+    script = bytes.fromhex(script)
+    return script[0] - 0x50 if script[0] else 0, script[2:]
+
+
+class TestSegwitAddresses:
+    def test_decode(self):
+        for address, script in VALID_ADDRESSES:
+            hrp = address[:2].lower()
+            assert decode(hrp, address) == witness_program(script)
+
+    def test_encode(self):
+        for address, script in VALID_ADDRESSES:
+            witver, witprog = witness_program(script)
+            assert encode(address[:2].lower(), witver, witprog) == address.lower()
+
+    def test_invalid(self):
+        for address in INVALID_ADDRESSES:
+            assert decode(address[:2].lower(), address) == (None, None)
+        assert decode('tb', VALID_ADDRESSES[0][0]) == (None, None)
+
+    def test_encode_invalid(self):
+        assert encode('bc', 0, b'\x00' * 21) is None
+        assert encode('bc', 17, b'\x00' * 20) is None
+        assert encode('bc', 1, b'\x00') is None
+
+    def test_bulk(self):
+        programs = [bytes([i]) * 20 for i in range(50)]
+        addresses = encode_many('bc', 0, programs)
+        assert addresses == [encode('bc', 0, program) for program in programs]
+        assert decode_many('bc', addresses) == [(0, program) for program in programs]
+
+
+def test_bech32_decode_spec():
+    assert bech32_decode('a12uel5l')[2] == BECH32
+    assert bech32_decode('a1lqfn3a')[2] == BECH32M
+    assert bech32_decode('a1lqfn3b') == (None, None, None)
+
+
+@pytest.mark.parametrize('data, frombits, tobits, pad, expected', [
+    (b'\xff', 8, 5, True, b'\x1f\x1c'),
+    (b'\x1f\x1c', 5, 8, False, b'\xff'),
+    (b'\x1f\x1d', 5, 8, False, None),
+    ([32], 5, 8, True, None),
+])
+def test_convertbits(data, frombits, tobits, pad, expected):
+    assert convertbits(data, frombits, tobits, pad) == expected
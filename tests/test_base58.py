@@ -1,6 +1,12 @@
+import os
+
 import pytest
 
-from aioufobit.base58 import b58decode, b58decode_check, b58encode, b58encode_check
+from aioufobit import base58
+from aioufobit.base58 import (
+    b58decode, b58decode_check, b58decode_check_many, b58decode_many,
+    b58encode, b58encode_check, b58encode_check_many, b58encode_many
+)
 from aioufobit.format import MAIN_PUBKEY_HASH
 from .samples import BINARY_ADDRESS, BITCOIN_ADDRESS, PUBKEY_HASH
 
@@ -31,3 +37,42 @@ class TestB58DecodeCheck:
     def test_b58decode_check_failure(self):
         with pytest.raises(ValueError):
             b58decode_check(BITCOIN_ADDRESS[:-1])
+
+
+PAYLOADS = [b'\x00' * (i % 3) + os.urandom(21 - i % 3) for i in range(100)]
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def use_numpy(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(base58, 'numpy', None)
+    elif base58.numpy is None:  # pragma: no cover
+        pytest.skip('NumPy is not installed.')
+
+
+class TestBulk:
+    def test_b58encode_many(self, use_numpy):
+        assert b58encode_many(PAYLOADS) == [b58encode(payload) for payload in PAYLOADS]
+        assert b58encode_many([BINARY_ADDRESS, b'\x00']) == [BITCOIN_ADDRESS, '1']
+
+    def test_b58encode_check_many(self, use_numpy):
+        assert b58encode_check_many(PAYLOADS) == [b58encode_check(payload) for payload in PAYLOADS]
+
+    def test_b58decode_many(self, use_numpy):
+        encoded = [b58encode(payload) for payload in PAYLOADS]
+        assert b58decode_many(encoded, length=21) == PAYLOADS
+        assert b58decode_many([BITCOIN_ADDRESS]) == [BINARY_ADDRESS]
+
+    def test_b58decode_check_many(self, use_numpy):
+        encoded = [b58encode_check(payload) for payload in PAYLOADS]
+        assert b58decode_check_many(encoded, length=25) == PAYLOADS
+
+    def test_b58decode_check_many_invalid(self, use_numpy):
+        encoded = [b58encode_check(payload) for payload in PAYLOADS]
+        invalid = [encoded[0][:-1], 'l' + encoded[1][1:], '1' + encoded[2]]
+
+        decoded = b58decode_check_many(encoded + invalid, length=25, strict=False)
+        assert decoded == PAYLOADS + [None, None, None]
+
+        with pytest.raises(ValueError):
+            b58decode_check_many(encoded + invalid[:1], length=25)
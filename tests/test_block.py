@@ -0,0 +1,57 @@
+import pytest
+
+from aioufobit.block import HEADER_SIZE, iter_transactions, parse_block, parse_header
+from aioufobit.crypto import double_sha256
+from aioufobit.transaction import TxIn, TxObj, parse_tx
+from .samples import BLOCK, BLOCK_HEADER, KEY, LEGACY_TX, SEGWIT_TX
+
+
+def stripped_txid(tx):
+    stripped = TxObj(tx.version, [TxIn(txin.script, txin.txid, txin.txindex, amount=txin.amount,
+                                       sequence=txin.sequence) for txin in tx.TxIn],
+                     tx.TxOut, tx.locktime)
+    return double_sha256(bytes(stripped))[::-1].hex()
+
+
+class TestParseTx:
+    def test_legacy(self):
+        tx, txid, pos = parse_tx(LEGACY_TX)
+        assert pos == len(LEGACY_TX)
+        assert bytes(tx) == LEGACY_TX
+        assert txid == double_sha256(LEGACY_TX)[::-1].hex()
+        assert not tx.TxIn[0].segwit
+
+    def test_segwit(self):
+        tx, txid, pos = parse_tx(SEGWIT_TX)
+        assert pos == len(SEGWIT_TX)
+        assert tx.TxIn[0].segwit
+        assert tx.TxIn[0].witness.endswith(KEY.public_key)
+        assert tx.TxOut[0].script == KEY.sw_scriptcode
+        assert txid == stripped_txid(tx)
+
+
+class TestParseBlock:
+    def test_header(self):
+        header = parse_header(BLOCK)
+        assert header.hash == double_sha256(BLOCK_HEADER)[::-1].hex()
+        assert header.version == 2
+        assert header.prev_hash == '01' * 32
+        assert header.merkle_root == '02' * 32
+        assert header.time == 1500000000
+        assert header.bits == 0x1d00ffff
+        assert header.nonce == 7
+
+    def test_header_short(self):
+        with pytest.raises(ValueError):
+            parse_header(BLOCK_HEADER[:-1])
+
+    def test_block(self):
+        block = parse_block(BLOCK.hex())
+        assert block.hash == block.header.hash
+        assert [txid for txid, _ in block.transactions] == [
+            parse_tx(LEGACY_TX)[1], parse_tx(SEGWIT_TX)[1]
+        ]
+
+    def test_iter_transactions(self):
+        transactions = iter_transactions(BLOCK, HEADER_SIZE)
+        assert next(transactions)[0] == parse_tx(LEGACY_TX)[1]
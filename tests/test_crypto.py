@@ -0,0 +1,41 @@
+import multiprocessing
+
+from aioufobit import crypto
+from aioufobit.crypto import get_context, init_worker, set_context
+from aioufobit.format import verify_sig
+from aioufobit.wallet import PrivateKey
+
+
+def inherited_context_reused(queue):
+    inherited = crypto._context
+    queue.put(get_context() is inherited)
+
+
+class TestContext:
+    def test_shared(self):
+        context = get_context()
+        assert get_context() is context
+        assert PrivateKey()._pk.context is context
+        init_worker()
+        assert get_context() is context
+
+    def test_seed(self):
+        previous = get_context()
+        try:
+            context = set_context(seed=b'\x01' * 32)
+            assert get_context() is context is not previous
+
+            key = PrivateKey.from_int(7)
+            assert key._pk.context is context
+            assert verify_sig(key.sign(b'data'), b'data', key.public_key)
+        finally:
+            set_context(previous)
+
+    def test_fork(self):
+        get_context()
+        fork = multiprocessing.get_context('fork')
+        queue = fork.Queue()
+        process = fork.Process(target=inherited_context_reused, args=(queue,))
+        process.start()
+        assert queue.get(timeout=10) is False
+        process.join()
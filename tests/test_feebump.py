@@ -0,0 +1,235 @@
+import asyncio
+
+import pytest
+
+from aioufobit.constants import RBF_SEQUENCE
+from aioufobit.exceptions import InsufficientFunds
+from aioufobit.feebump import FeeBumper, package_feerate
+from aioufobit.network import NetworkAPI
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import calc_txid, calc_vsize, is_replaceable, parse_tx
+from aioufobit.utils import hex_to_bytes
+from aioufobit.wallet import PrivateKey, Wallet
+
+KEY = PrivateKey.from_int(7)
+OTHER = PrivateKey.from_int(8)
+UNSPENTS = [Unspent(1000000 * (i + 1), 1, KEY.scriptpubkey.hex(), '{:02x}'.format(i) * 32, 0) for i in range(3)]
+OUTPUTS = [(OTHER.address, 500000, 'ufoshi')]
+
+
+@pytest.fixture
+def broadcast(monkeypatch):
+    broadcast = []
+
+    async def broadcast_tx(tx_hex):
+        broadcast.append(tx_hex)
+        return calc_txid(tx_hex)
+
+    monkeypatch.setattr(NetworkAPI, 'broadcast_tx', broadcast_tx)
+    return broadcast
+
+
+def parse(tx_hex):
+    return parse_tx(hex_to_bytes(tx_hex))[0]
+
+
+def values(tx):
+    return [int.from_bytes(txout.value, 'little') for txout in tx.TxOut]
+
+
+def test_replaceable_transaction():
+    tx = parse(KEY.create_transaction(OUTPUTS, fee=1, unspents=UNSPENTS[:1], replaceable=True))
+    assert is_replaceable(tx)
+    assert all(txin.sequence == RBF_SEQUENCE for txin in tx.TxIn)
+
+    assert not is_replaceable(parse(KEY.create_transaction(OUTPUTS, fee=1, unspents=UNSPENTS[:1])))
+
+
+class TestFeeBumper:
+    def test_bump(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:1]
+        bumper = FeeBumper(key)
+
+        async def run():
+            txid = await bumper.send(OUTPUTS, fee=1)
+            return txid, await bumper.bump(txid, 1000)
+
+        txid, new = asyncio.run(run())
+        original, replacement = parse(broadcast[0]), parse(broadcast[1])
+
+        assert bumper.history(txid) == bumper.history(new) == [txid, new]
+        assert bumper.latest(txid) == new
+        assert [txin.txid for txin in replacement.TxIn] == [txin.txid for txin in original.TxIn]
+        assert is_replaceable(replacement)
+
+        # The fee comes out of the change.
+        assert values(replacement)[0] == 500000
+        assert bumper.transactions[new].fee == bumper.transactions[new].vsize * 1000
+        assert bumper.transactions[new].fee > bumper.transactions[txid].fee
+
+        # Only the change of the replacement can be spent.
+        [change] = key.utxos.unspents
+        assert change.txid == new and change.amount == values(replacement)[1]
+
+    def test_bump_adds_inputs(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:2]
+        bumper = FeeBumper(key)
+
+        async def run():
+            txid = await bumper.send([(OTHER.address, 850000, 'ufoshi')], fee=1)
+            return await bumper.bump(txid, 2000)
+
+        new = asyncio.run(run())
+        replacement = parse(broadcast[1])
+
+        assert len(replacement.TxIn) == 2
+        assert values(replacement)[0] == 850000
+        assert len(bumper.transactions[new].unspents) == 2
+        assert key.utxos.available()[0].txid == new
+
+    def test_bump_skips_unconfirmed(self, broadcast):
+        key = PrivateKey.from_int(7)
+        unconfirmed = Unspent(3000000, 0, KEY.scriptpubkey.hex(), '02' * 32, 0)
+        key.unspents[:] = [UNSPENTS[0], unconfirmed]
+        bumper = FeeBumper(key)
+
+        txid = asyncio.run(bumper.send(OUTPUTS, fee=1))
+        assert bumper.transactions[txid].unspents == [UNSPENTS[0]]
+
+        # Only the unconfirmed unspent could cover the fee.
+        with pytest.raises(InsufficientFunds):
+            bumper.create_replacement(txid, 3000)
+        assert unconfirmed in key.utxos.available()
+
+    def test_minimum_increase(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:1]
+        bumper = FeeBumper(key, relay_fee=10)
+
+        async def run():
+            txid = await bumper.send(OUTPUTS, fee=1000)
+            # Asking for a lower rate still pays for the relay of the replacement.
+            return txid, await bumper.bump(txid, 1)
+
+        txid, new = asyncio.run(run())
+        old, bumped = bumper.transactions[txid], bumper.transactions[new]
+        assert bumped.fee == old.fee + bumped.vsize * 10
+
+    def test_insufficient(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:1]
+        bumper = FeeBumper(key)
+
+        txid = asyncio.run(bumper.send(OUTPUTS, fee=1))
+        with pytest.raises(InsufficientFunds):
+            bumper.create_replacement(txid, 10000)
+        assert bumper.latest(txid) == txid
+
+    def test_track(self):
+        bumper = FeeBumper(KEY)
+        with pytest.raises(ValueError):
+            bumper.track(KEY.create_transaction(OUTPUTS, fee=1, unspents=UNSPENTS[:1]), UNSPENTS[:1])
+        with pytest.raises(ValueError):
+            bumper.create_replacement('ff' * 32, 10)
+
+        txid = bumper.track(KEY.create_transaction(OUTPUTS, fee=1, unspents=UNSPENTS[:1], replaceable=True),
+                            UNSPENTS[:1])
+        assert txid in bumper
+        bumper.forget(txid)
+        assert len(bumper) == 0
+
+    def test_wallet(self, broadcast):
+        class MockService:
+            async def get_unspent(self, address):
+                return list(UNSPENTS) if address == KEY.address else []
+
+        wallet = Wallet([KEY], service=MockService())
+        bumper = FeeBumper(wallet)
+
+        async def run():
+            await wallet.refresh()
+            txid = await wallet.send(OUTPUTS, fee=1, combine=False, replaceable=True)
+            bumper.track(broadcast[0], UNSPENTS[:1])
+            return txid, await bumper.bump(txid, 1000)
+
+        txid, new = asyncio.run(run())
+
+        assert not any(outpoint[0] == txid for outpoint in wallet.unspents)
+        assert (new, 1) in wallet.unspents
+        assert wallet.balance == sum(unspent.amount for unspent in UNSPENTS) - 500000 - bumper.transactions[new].fee
+
+
+class TestCPFP:
+    def test_package_feerate(self):
+        assert package_feerate([(1000, 200), (5000, 200)]) == 15
+
+    def test_accelerate_outgoing(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:1]
+        bumper = FeeBumper(key)
+
+        async def run():
+            txid = await bumper.send(OUTPUTS, fee=1)
+            return txid, await bumper.accelerate([(broadcast[0], None)], 1000)
+
+        txid, child_txid = asyncio.run(run())
+        parent, child = bumper.transactions[txid], bumper.transactions[child_txid]
+
+        [txin] = parse(broadcast[1]).TxIn
+        assert txin.txid[::-1].hex() == txid and int.from_bytes(txin.txindex, 'little') == 1
+        assert child.fee == 1000 * (calc_vsize(broadcast[0]) + child.vsize) - parent.fee
+        assert package_feerate([(parent.fee, calc_vsize(broadcast[0])), (child.fee, child.vsize)]) >= 1000
+
+        # The child's output replaces the parent's change.
+        [unspent] = key.utxos.unspents
+        assert unspent.txid == child_txid
+
+        # The child can be bumped itself.
+        assert is_replaceable(parse(broadcast[1]))
+
+    def test_accelerate_incoming(self, broadcast):
+        key = PrivateKey.from_int(7)
+        bumper = FeeBumper(key)
+
+        funding = Unspent(2000000, 1, OTHER.scriptpubkey.hex(), 'aa' * 32, 0)
+        parent_hex = OTHER.create_transaction([(key.address, 1500000, 'ufoshi')], fee=1, unspents=[funding])
+        parent_txid = calc_txid(parent_hex)
+
+        child_txid = asyncio.run(bumper.accelerate([(parent_hex, 2000000 - 1500000 - 300000)], 2000))
+        assert child_txid
+
+        # Once the backend reports the parent's output, it stays spent.
+        key.utxos.update([Unspent(1500000, 0, key.scriptpubkey.hex(), parent_txid, 0)])
+        assert [unspent.txid for unspent in key.utxos.unspents] == [child_txid]
+
+    def test_accelerate_adds_inputs(self, broadcast):
+        key = PrivateKey.from_int(7)
+        key.unspents[:] = UNSPENTS[:1]
+        bumper = FeeBumper(key)
+
+        funding = Unspent(2000000, 1, OTHER.scriptpubkey.hex(), 'aa' * 32, 0)
+        parent_hex = OTHER.create_transaction([(key.address, 1000, 'ufoshi')], fee=1, unspents=[funding])
+
+        tx_hex, lease = bumper.create_child([(parent_hex, 100000)], 1000)
+        assert len(parse(tx_hex).TxIn) == 2
+        assert lease.unspents[1] == UNSPENTS[0]
+        assert key.utxos.available() == []
+
+        lease.release()
+        assert key.utxos.available() == UNSPENTS[:1]
+
+    def test_invalid(self):
+        bumper = FeeBumper(PrivateKey.from_int(7))
+        funding = Unspent(2000000, 1, OTHER.scriptpubkey.hex(), 'aa' * 32, 0)
+
+        foreign = OTHER.create_transaction([(OTHER.address, 1000000, 'ufoshi')], fee=1, unspents=[funding])
+        with pytest.raises(ValueError):
+            bumper.create_child([(foreign, 100000)], 1000)
+
+        incoming = OTHER.create_transaction([(KEY.address, 1000000, 'ufoshi')], fee=1, unspents=[funding])
+        with pytest.raises(ValueError):
+            bumper.create_child([(incoming, 1000000)], 1000)
+        with pytest.raises(ValueError):
+            bumper.create_child([(incoming, None)], 1000)
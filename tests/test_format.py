@@ -1,10 +1,16 @@
 import pytest
 
 from aioufobit.format import (
-    address_to_public_key_hash, bytes_to_wif, coords_to_public_key,
-    get_version, point_to_public_key, public_key_to_coords,
-    public_key_to_address, verify_sig, wif_checksum_check, wif_to_bytes
+    address_cache_info, address_to_public_key_hash, address_to_scriptpubkey,
+    addresses_to_scriptpubkeys, bytes_to_wif, coords_to_public_key,
+    get_version, multisig_to_address, parse_address, point_to_public_key,
+    public_key_to_bech32_address, public_key_to_coords, public_key_to_address,
+    scriptpubkey_index,
+    scriptpubkey_to_address, set_address_cache_size, verify_sig,
+    wif_checksum_check, wif_to_bytes
 )
+from aioufobit.base32 import encode as segwit_encode
+from aioufobit.crypto import ripemd160_sha256
 from .samples import (
     BITCOIN_ADDRESS, BITCOIN_ADDRESS_COMPRESSED, BITCOIN_ADDRESS_PAY2SH,
     BITCOIN_ADDRESS_TEST_COMPRESSED, BITCOIN_ADDRESS_TEST,
@@ -52,6 +58,98 @@ class TestGetVersion:
             get_version(BITCOIN_ADDRESS_TEST_PAY2SH)
 
 
+class TestParseAddress:
+    def test_p2pkh(self):
+        address = public_key_to_address(PUBLIC_KEY_COMPRESSED)
+        parsed = parse_address(address)
+        assert parsed.type == 'p2pkh'
+        assert parsed.version == 'main'
+        assert parsed.hash == ripemd160_sha256(PUBLIC_KEY_COMPRESSED)
+        assert parsed.scriptpubkey == b'\x76\xa9\x14' + parsed.hash + b'\x88\xac'
+
+    def test_p2sh(self):
+        address = multisig_to_address([PUBLIC_KEY_COMPRESSED], 1, version='test')
+        parsed = parse_address(address)
+        assert parsed.type == 'p2sh'
+        assert parsed.version == 'test'
+        assert parsed.scriptpubkey == b'\xa9\x14' + parsed.hash + b'\x87'
+
+    def test_bech32(self):
+        parsed = parse_address('BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4')
+        assert parsed.type == 'witness_v0'
+        assert parsed.version == 'main'
+        assert parsed.scriptpubkey.hex() == '0014751e76e8199196d454941c45d1b3a323f1433bd6'
+
+    def test_bech32_like_base58(self):
+        # Reads like the testnet bech32 prefix 'ut1'.
+        parsed = parse_address('UT122222222222222222222222228EejGd')
+        assert parsed.type == 'p2sh'
+        assert parsed.version == 'main'
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_address('bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5')
+        with pytest.raises(ValueError):
+            parse_address(public_key_to_address(PUBLIC_KEY_COMPRESSED)[:-1])
+
+    def test_cache(self):
+        address = public_key_to_address(PUBLIC_KEY_COMPRESSED)
+        set_address_cache_size(2)
+        try:
+            parse_address(address)
+            get_version(address)
+            address_to_public_key_hash(address)
+            info = address_cache_info()
+            assert (info.hits, info.misses, info.maxsize) == (2, 1, 2)
+        finally:
+            set_address_cache_size(4096)
+
+
+class TestScriptPubKey:
+    ADDRESSES = [
+        public_key_to_address(PUBLIC_KEY_COMPRESSED),
+        public_key_to_address(PUBLIC_KEY_UNCOMPRESSED, version='test'),
+        multisig_to_address([PUBLIC_KEY_COMPRESSED], 1),
+        public_key_to_bech32_address(PUBLIC_KEY_COMPRESSED),
+        segwit_encode('ut', 0, b'\x01' * 32),
+    ]
+
+    def test_address_to_scriptpubkey(self):
+        assert address_to_scriptpubkey('bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4').hex() == (
+            '0014751e76e8199196d454941c45d1b3a323f1433bd6'
+        )
+        assert address_to_scriptpubkey(self.ADDRESSES[3]) == (
+            b'\x00\x14' + ripemd160_sha256(PUBLIC_KEY_COMPRESSED)
+        )
+
+    def test_bulk(self):
+        addresses = self.ADDRESSES * 20
+        scripts = addresses_to_scriptpubkeys(addresses)
+        assert scripts == [address_to_scriptpubkey(address) for address in addresses]
+
+        packed = addresses_to_scriptpubkeys(addresses, packed=True)
+        assert packed == b''.join(bytes([len(script)]) + script for script in scripts)
+
+    def test_bulk_invalid(self):
+        with pytest.raises(ValueError):
+            addresses_to_scriptpubkeys(self.ADDRESSES + [self.ADDRESSES[0][:-1]])
+
+    def test_roundtrip(self):
+        for address in self.ADDRESSES:
+            version = get_version(address)
+            script = address_to_scriptpubkey(address)
+            assert scriptpubkey_to_address(script, version=version) == address
+
+    def test_nonstandard(self):
+        with pytest.raises(ValueError):
+            scriptpubkey_to_address(b'\x6a\x04data')
+
+    def test_index(self):
+        index = scriptpubkey_index(self.ADDRESSES)
+        assert index[address_to_scriptpubkey(self.ADDRESSES[2])] == self.ADDRESSES[2]
+        assert len(index) == len(self.ADDRESSES)
+
+
 class TestVerifySig:
     def test_valid(self):
         assert verify_sig(VALID_SIGNATURE, DATA, PUBLIC_KEY_COMPRESSED)
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aioufobit.hd import HARDENED, HDKey, parse_path
+from aioufobit.wallet import PrivateKey
+
+# Test vector 1 of BIP-32.
+SEED = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+MASTER_XPRV = ('xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWU'
+               'tg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi')
+MASTER_XPUB = ('xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1R'
+               'upje8YtGqsefD265TMg7usUDFdp6W1EGMcet8')
+CHILD_0H_XPRV = ('xprv9uHRZZhk6KAJC1avXpDAp4MDc3sQKNxDiPvvkX8Br5ngLNv1TxvUxt4cV1rGL5hj6KCesn'
+                 'DYUhd7oWgT11eZG7XnxHrnYeSvkzY7d2bhkJ7')
+CHILD_0H_1_XPUB = ('xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3UFHKkNAWbWMiGj7Wf5'
+                   'uMash7SyYq527Hqck2AxYysAA7xmALppuCkwQ')
+CHILD_0H_1_2H_XPRV = ('xprv9z4pot5VBttmtdRTWfWQmoH1taj2axGVzFqSb8C9xaxKymcFzXBDptWmT7FwuEzG3ryjH4'
+                      'ktypQSAewRiNMjANTtpgP4mLTj34bhnZX7UiM')
+
+
+def test_parse_path():
+    assert parse_path("m/0'/1/2h/3H") == [HARDENED, 1, HARDENED + 2, HARDENED + 3]
+    assert parse_path('m') == []
+    with pytest.raises(ValueError):
+        parse_path('m//1')
+    with pytest.raises(ValueError):
+        parse_path('m/2147483648')
+
+
+class TestHDKey:
+    def test_from_seed(self):
+        master = HDKey.from_seed(SEED)
+        assert master.to_xprv() == MASTER_XPRV
+        assert master.to_xpub() == MASTER_XPUB
+
+    def test_extended_key_roundtrip(self):
+        assert HDKey.from_extended_key(MASTER_XPRV).to_xprv() == MASTER_XPRV
+        assert HDKey.from_extended_key(MASTER_XPUB).to_xpub() == MASTER_XPUB
+        assert not HDKey.from_extended_key(MASTER_XPUB).is_private
+
+    def test_extended_key_invalid(self):
+        with pytest.raises(ValueError):
+            HDKey.from_extended_key(MASTER_XPRV[:-1])
+
+    def test_derive(self):
+        master = HDKey.from_extended_key(MASTER_XPRV)
+        assert master.child(HARDENED).to_xprv() == CHILD_0H_XPRV
+        assert master.derive("m/0'/1").to_xpub() == CHILD_0H_1_XPUB
+        assert master.derive("m/0'/1/2'").to_xprv() == CHILD_0H_1_2H_XPRV
+
+    def test_derive_public(self):
+        account = HDKey.from_extended_key(MASTER_XPRV).derive("m/0'")
+        public = account.to_public()
+        assert public.child(1).to_xpub() == CHILD_0H_1_XPUB
+        with pytest.raises(ValueError):
+            public.child(HARDENED)
+        with pytest.raises(ValueError):
+            public.to_xprv()
+
+    def test_derive_range(self):
+        account = HDKey.from_extended_key(MASTER_XPRV).derive("m/0'")
+        children = account.derive_range(5, 4)
+        assert [child.index for child in children] == [5, 6, 7, 8]
+        assert children == [account.child(index) for index in range(5, 9)]
+
+        public = account.to_public()
+        assert [child.public_key for child in public.derive_range(5, 4)] == [
+            child.public_key for child in children
+        ]
+
+        hardened = account.derive_range(0, 2, hardened=True)
+        assert hardened[0] == account.child(HARDENED)
+
+    def test_derive_range_executor(self):
+        public = HDKey.from_extended_key(MASTER_XPRV).derive("m/0'").to_public()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            children = public.derive_range(0, 10, executor=executor, chunk_size=3)
+        assert [child.address for child in children] == [
+            child.address for child in public.derive_range(0, 10)
+        ]
+
+    def test_to_private_key(self):
+        child = HDKey.from_seed(SEED).derive('m/0/1')
+        key = child.to_private_key()
+        assert isinstance(key, PrivateKey)
+        assert key.public_key == child.public_key
+        assert key.address == child.address
+        assert key.sw_address == child.sw_address
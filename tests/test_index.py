@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from aioufobit.block import parse_block, parse_header
+from aioufobit.index import AddressIndex, address_key, script_key
+from aioufobit.network.meta import Unspent
+from aioufobit.network.sync import ChainSync
+from aioufobit.transaction import create_new_transaction, parse_tx
+from aioufobit.utils import hex_to_bytes, int_to_varint
+from aioufobit.wallet import PrivateKey
+from .network.test_sync import MockNode
+
+lmdb = pytest.importorskip('lmdb')
+
+KEY = PrivateKey.from_int(2)
+OTHER = PrivateKey.from_int(3)
+
+TX1 = hex_to_bytes(create_new_transaction(
+    KEY, [Unspent(4000000, 1, '', '11' * 32, 0)], [(KEY.address, 3000000), (OTHER.address, 500000)]
+))
+TXID1 = parse_tx(TX1)[1]
+TX2 = hex_to_bytes(create_new_transaction(
+    KEY, [Unspent(3000000, 1, '', TXID1, 0)], [(KEY.bech32_address, 2000000)]
+))
+TXID2 = parse_tx(TX2)[1]
+
+
+def make_block(prev, transactions, nonce=0):
+    prev = bytes.fromhex(parse_header(prev).hash)[::-1] if prev else b'\x00' * 32
+    header = (1).to_bytes(4, 'little') + prev + b'\x00' * 32 + nonce.to_bytes(12, 'little')
+    return header + int_to_varint(len(transactions)) + b''.join(transactions)
+
+
+BLOCK0 = make_block(None, [TX1])
+BLOCK1 = make_block(BLOCK0, [TX2])
+
+
+class TestKeys:
+    def test_script_key(self):
+        assert script_key(KEY.scriptpubkey) == b'\x00' + KEY.hash160
+        assert script_key(KEY.sw_scriptpubkey) == b'\x01' + KEY.sw_scriptpubkey[2:22]
+        assert script_key(KEY.bech32_scriptpubkey) == b'\x02' + KEY.hash160
+        assert script_key(b'\x6a\x04test') is None
+
+    def test_address_key(self):
+        assert address_key(KEY.address) == script_key(KEY.scriptpubkey)
+        assert address_key(KEY.sw_address) == script_key(KEY.sw_scriptpubkey)
+        assert address_key(KEY.bech32_address) == script_key(KEY.bech32_scriptpubkey)
+
+
+class TestAddressIndex:
+    def test_connect(self, tmp_path):
+        with AddressIndex(str(tmp_path)) as index:
+            index.connect_block(0, parse_block(BLOCK0))
+            # Nothing is visible before the batch is committed.
+            assert index.balance(KEY.address) == 0
+            index.flush()
+
+            assert index.balance(KEY.address) == 3000000
+            assert index.balance(OTHER.address) == 500000
+            [unspent] = index.unspents(KEY.address)
+            assert unspent == Unspent(3000000, 1, KEY.scriptpubkey.hex(), TXID1, 0)
+            assert not unspent.segwit
+
+            index.connect_block(1, parse_block(BLOCK1))
+            index.flush()
+
+            assert index.balance(KEY.address) == 0
+            [unspent] = asyncio.run(index.get_unspent(KEY.bech32_address))
+            assert unspent.segwit and unspent.amount == 2000000 and unspent.confirmations == 1
+            assert index.unspents(OTHER.address)[0].confirmations == 2
+            assert index.transactions(KEY.address) == [TXID2, TXID1]
+            assert index.transactions(KEY.bech32_address) == [TXID2]
+
+            with pytest.raises(ValueError):
+                index.connect_block(5, parse_block(BLOCK1))
+
+    def test_disconnect(self, tmp_path):
+        with AddressIndex(str(tmp_path)) as index:
+            index.connect_block(0, parse_block(BLOCK0))
+            index.connect_block(1, parse_block(BLOCK1))
+            index.disconnect_block(1, parse_header(BLOCK1).hash)
+            index.flush()
+
+            assert index.balance(KEY.address) == 3000000
+            assert index.balance(KEY.bech32_address) == 0
+            assert index.transactions(KEY.address) == [TXID1]
+
+            with pytest.raises(ValueError):
+                index.disconnect_block(1)
+
+    def test_undo_depth(self, tmp_path):
+        with AddressIndex(str(tmp_path), reorg_depth=1) as index:
+            index.connect_block(0, parse_block(BLOCK0))
+            index.connect_block(1, parse_block(BLOCK1))
+            assert list(index.block_hashes()) == [1]
+            index.disconnect_block(1)
+            with pytest.raises(ValueError):
+                index.disconnect_block(0)
+
+    def test_follow(self, tmp_path):
+        node = MockNode([BLOCK0])
+        index = AddressIndex(str(tmp_path), batch_size=100)
+        sync = ChainSync(node)
+        index.follow(sync)
+        asyncio.run(sync.sync())
+        # Saving the sync progress commits the index.
+        assert index.balance(KEY.address) == 3000000
+        index.close()
+
+        # The sync resumes from the index after a restart.
+        node.chain = [BLOCK0, BLOCK1]
+        index = AddressIndex(str(tmp_path))
+        sync = ChainSync(node)
+        index.follow(sync)
+        asyncio.run(sync.sync())
+        assert index.balance(KEY.bech32_address) == 2000000
+
+        # A reorg replaces block 1.
+        fork = make_block(BLOCK0, [], nonce=1)
+        node.chain = [BLOCK0, fork, make_block(fork, [], nonce=2)]
+        asyncio.run(sync.sync())
+        assert index.height == 2
+        assert index.balance(KEY.bech32_address) == 0
+        assert index.balance(KEY.address) == 3000000
+        index.close()
+
+    def test_failing_subscriber(self, tmp_path):
+        node = MockNode([BLOCK0, BLOCK1])
+        index = AddressIndex(str(tmp_path))
+        sync = ChainSync(node)
+        index.follow(sync)
+        failures = [1]
+
+        def connect(height, block):
+            if height == 1 and failures:
+                failures.pop()
+                raise RuntimeError
+
+        sync.subscribe('connect', connect)
+        with pytest.raises(RuntimeError):
+            asyncio.run(sync.sync())
+
+        # Nothing of the failed window is committed.
+        assert index.height == sync.height == -1
+        assert index.balance(KEY.address) == 0
+
+        assert asyncio.run(sync.sync()) == 2
+        assert index.height == 1
+        assert index.balance(KEY.bech32_address) == 2000000
+        index.close()
+
+    def test_connect_again(self, tmp_path):
+        index = AddressIndex(str(tmp_path))
+        index.connect_block(0, parse_block(BLOCK0))
+        index.connect_block(1, parse_block(BLOCK1))
+        index.flush()
+
+        # Blocks that are already indexed are skipped.
+        index.connect_block(0, parse_block(BLOCK0))
+        index.connect_block(1, parse_block(BLOCK1))
+        assert index.height == 1
+        assert index.balance(KEY.bech32_address) == 2000000
+
+        with pytest.raises(ValueError):
+            index.connect_block(1, parse_block(make_block(BLOCK0, [], nonce=1)))
+        index.close()
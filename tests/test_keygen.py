@@ -0,0 +1,156 @@
+import asyncio
+import io
+import math
+from multiprocessing import Event, Queue, Value
+
+import pytest
+from coincurve import Context
+
+from aioufobit.base58 import b58encode_check
+from aioufobit.constants import MAIN_PUBKEY_HASH
+from aioufobit.crypto import ECPrivateKey, ripemd160_sha256
+from aioufobit.format import bytes_to_wif
+from aioufobit.keygen import (
+    VanitySearch, generate_key_address_pairs, generate_key_chunks, generate_keys,
+    prefix_difficulty, prefix_ranges, public_key_hashes, vanity_progress, write_keys
+)
+from aioufobit.wallet import PrivateKey
+
+
+def test_public_key_hashes():
+    context = Context()
+    start = ECPrivateKey.from_int(1000, context=context).public_key
+    generator = ECPrivateKey.from_int(1, context=context).public_key
+
+    hashes, point = public_key_hashes(start, generator, 5, context)
+
+    assert hashes == [
+        ripemd160_sha256(ECPrivateKey.from_int(1000 + i).public_key.format()) for i in range(5)
+    ]
+    assert point.format() == ECPrivateKey.from_int(1005).public_key.format()
+
+
+def test_generate_key_address_pairs():
+    counter = Value('Q')
+    match = Event()
+    queue = Queue()
+
+    generate_key_address_pairs('B', counter, match, queue, batch_size=64)
+
+    secret, address = queue.get(timeout=5)
+    assert match.is_set()
+    assert address.startswith('B')
+    assert PrivateKey(bytes_to_wif(secret, compressed=True)).address == address
+
+
+def address_of(number):
+    return b58encode_check(MAIN_PUBKEY_HASH + number.to_bytes(20, 'big'))
+
+
+class TestPrefixRanges:
+    def test_range(self):
+        prefixes, ranges = prefix_ranges('Bxy')
+        assert prefixes == ('Bxy',)
+        assert len(ranges) == 1
+        low, high = ranges[0]
+        assert address_of(low + 1).startswith('Bxy')
+        assert address_of((low + high) // 2).startswith('Bxy')
+        assert address_of(high - 1).startswith('Bxy')
+        assert not address_of(low - 1).startswith('Bxy')
+        assert not address_of(high + 1).startswith('Bxy')
+
+    def test_first_char(self):
+        # Mainnet addresses range from 'Bs8H...' to 'CGTt...'.
+        prefixes, _ = prefix_ranges('x')
+        assert prefixes == ('Bx',)
+        prefixes, _ = prefix_ranges('2')
+        assert prefixes == ('C2',)
+        with pytest.raises(ValueError):
+            prefix_ranges('Ba')
+
+    def test_case_insensitive(self):
+        # 'BX' sorts before the lowest address and 'b' is no first character.
+        prefixes, ranges = prefix_ranges('Bxy', case_sensitive=False)
+        assert set(prefixes) == {'Bxy', 'BxY'}
+        assert len(ranges) == 2
+
+    def test_multiple(self):
+        prefixes, ranges = prefix_ranges(['Bxy', 'Bx'])
+        assert prefixes == ('Bxy', 'Bx')
+        # Overlapping ranges are merged.
+        assert ranges == prefix_ranges('Bx')[1]
+
+    def test_invalid_character(self):
+        with pytest.raises(ValueError):
+            prefix_ranges('B0')
+
+
+def test_prefix_difficulty():
+    assert prefix_difficulty([(0, (1 << 159) - 1)]) == 2
+    # Each further character is about 58 times harder.
+    ratio = prefix_difficulty(prefix_ranges('Bxyz')[1]) / prefix_difficulty(prefix_ranges('Bxy')[1])
+    assert 57 < ratio < 59
+
+
+def test_vanity_progress():
+    progress = vanity_progress([3000, 1000], [1000, 0], 2.0, 10.0, 4000.0)
+    assert progress.keys == 4000
+    assert progress.worker_keys_per_second == [1000.0, 500.0]
+    assert progress.keys_per_second == 1500.0
+    assert progress.expected == 4000.0
+    assert math.isclose(progress.probability, 1 - (1 - 1 / 4000) ** 4000)
+    assert progress.eta == 0
+
+    progress = vanity_progress([0], [0], 1.0, 1.0, 4000.0)
+    assert progress.probability == 0
+    assert progress.eta is None
+
+    progress = vanity_progress([0], [0], 1.0, 1.0, 1.0)
+    assert progress.probability == 0
+    assert progress.eta is None
+
+    progress = vanity_progress([2, 0], [0, 0], 1.0, 1.0, 1.0)
+    assert progress.probability == 1.0
+    assert progress.eta == 0
+
+
+class TestVanitySearch:
+    def test_run(self):
+        calls = []
+        search = VanitySearch('xy', cores=1)
+        wif, address = search.run(calls.append, interval=0.01)
+        assert address.startswith('Bxy')
+        assert PrivateKey(wif).address == address
+        assert all(0 <= progress.probability <= 1 for progress in calls)
+
+    def test_watch(self):
+        search = VanitySearch('Bx', cores=1)
+
+        async def watch():
+            return [progress async for progress in search.watch(interval=0.01)]
+
+        asyncio.run(watch())
+        assert search.result[1].startswith('Bx')
+
+
+class TestGenerateKeys:
+    def test_records(self):
+        records = list(generate_keys(70, chunk_size=32))
+        assert len(records) == 70
+        assert len({record.wif for record in records}) == 70
+
+        for record in records[:3] + records[-3:]:
+            key = PrivateKey(record.wif)
+            assert key.is_compressed()
+            assert record == (key.to_wif(), key.address, key.sw_address, key.bech32_address)
+
+    def test_chunks(self):
+        assert [len(chunk) for chunk in generate_key_chunks(5, chunk_size=2)] == [2, 2, 1]
+
+    def test_write(self):
+        out = io.StringIO()
+        assert write_keys(out, 3) == 3
+        lines = out.getvalue().splitlines()
+        assert lines[0] == 'wif,address,sw_address,bech32_address'
+        wif, address, _, _ = lines[1].split(',')
+        assert PrivateKey(wif).address == address
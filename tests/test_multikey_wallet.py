@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import create_unsigned_transaction, deserialize, parse_tx, sign_tx
+from aioufobit.utils import hex_to_bytes
+from aioufobit.wallet import PrivateKey, Wallet
+
+KEY1 = PrivateKey.from_int(11)
+KEY2 = PrivateKey.from_int(22)
+KEY3 = PrivateKey.from_int(33)
+TXID1 = '11' * 32
+TXID2 = '22' * 32
+
+UNSPENTS = {
+    KEY1.address: [Unspent(3000000, 1, '', TXID1, 0)],
+    KEY2.sw_address: [Unspent(5000000, 1, '', TXID2, 1, segwit=True)],
+}
+
+
+class MockService:
+    def __init__(self):
+        self.requested = []
+
+    async def get_unspent(self, address):
+        self.requested.append(address)
+        return [Unspent(u.amount, u.confirmations, u.script, u.txid, u.txindex, u.segwit)
+                for u in UNSPENTS.get(address, [])]
+
+
+class MockBatchService:
+    def __init__(self):
+        self.batches = []
+
+    async def get_unspents_by_address(self, addresses):
+        self.batches.append(addresses)
+        return {address: list(UNSPENTS.get(address, [])) for address in addresses}
+
+
+class TestWallet:
+    def test_add_key(self):
+        wallet = Wallet([KEY1, KEY2])
+        assert len(wallet) == 2
+        assert wallet.get_key(KEY2.sw_address) is KEY2
+        assert set(wallet.addresses) == {
+            KEY1.address, KEY1.sw_address, KEY1.bech32_address,
+            KEY2.address, KEY2.sw_address, KEY2.bech32_address,
+        }
+
+    def test_refresh(self):
+        service = MockService()
+        wallet = Wallet([KEY1, KEY2, KEY3], service=service)
+
+        assert asyncio.run(wallet.refresh(concurrency=2)) == 8000000
+        assert sorted(service.requested) == sorted(wallet.addresses)
+        assert set(wallet.unspents) == {(TXID1, 0), (TXID2, 1)}
+        assert KEY1.balance == 3000000
+        assert KEY2.balance == 5000000
+        assert KEY3.unspents == []
+
+    def test_refresh_batches(self):
+        service = MockBatchService()
+        wallet = Wallet([KEY1, KEY2, KEY3], service=service)
+
+        assert asyncio.run(wallet.refresh(batch_size=4)) == 8000000
+        assert [len(batch) for batch in service.batches] == [4, 4, 1]
+
+    def test_create_transaction(self):
+        wallet = Wallet([KEY1, KEY2], service=MockService())
+        asyncio.run(wallet.refresh())
+        outputs = [(KEY3.address, 6000000, 'ufoshi')]
+
+        tx_hex = wallet.create_transaction(outputs, fee=1)
+        tx = deserialize(tx_hex, {TXID2 + ':1': 5000000})
+
+        inputs = {txin.txid[::-1].hex(): txin for txin in tx.TxIn}
+        assert inputs[TXID1].script.endswith(KEY1.public_key)
+        assert inputs[TXID2].script == b'\x16' + KEY2.sw_scriptcode
+        assert inputs[TXID2].witness.endswith(KEY2.public_key)
+
+        # Signing hashes do not depend on the other inputs' scripts, so each
+        # input matches what its key alone produces.
+        unspents = list(wallet.unspents.values())
+        unsigned = create_unsigned_transaction(unspents, [(KEY3.address, 6000000), (KEY1.address, 1900000)])
+        sign_tx(KEY1, unsigned, j=[0])
+        assert unsigned.TxIn[0].script == tx.TxIn[0].script
+
+    def test_create_transaction_foreign_unspent(self):
+        wallet = Wallet([KEY1])
+        with pytest.raises(ValueError):
+            wallet.create_transaction([(KEY3.address, 1000, 'ufoshi')], fee=1,
+                                      unspents=[Unspent(3000000, 1, '', TXID1, 5)])
+
+    def test_apply_transaction(self):
+        wallet = Wallet([KEY1, KEY2], service=MockService())
+        asyncio.run(wallet.refresh())
+
+        tx_hex = wallet.create_transaction([(KEY2.bech32_address, 1000000, 'ufoshi')], fee=1,
+                                           unspents=[wallet.unspents[(TXID1, 0)]])
+        tx, txid, _ = parse_tx(hex_to_bytes(tx_hex))
+
+        assert wallet.apply_transaction(txid, tx)
+        assert (TXID1, 0) not in wallet.unspents
+        assert KEY1.unspents[0].txid == txid
+        assert KEY2.unspents[-1].segwit
+        assert wallet.balance == KEY1.balance + KEY2.balance == 8000000 - 100000
+        assert not wallet.apply_transaction(txid, tx)
@@ -0,0 +1,68 @@
+import pytest
+
+from aioufobit.format import multisig_to_redeemscript
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import deserialize
+from aioufobit.utils import bytes_to_hex, get_signatures_from_script
+from aioufobit.wallet import MultiSig, PrivateKey
+
+KEY1 = PrivateKey.from_int(1)
+KEY2 = PrivateKey.from_int(2)
+KEY3 = PrivateKey.from_int(3)
+PUBLIC_KEYS = [KEY1.public_key, KEY2.public_key, KEY3.public_key]
+TXID = '8878399d83ec25c627cfbf753ff9ca3602373eac437ab2676154a3c2da23adf3'
+
+
+class TestMultiSig:
+    def test_init(self):
+        multisig = MultiSig(KEY1, PUBLIC_KEYS, 2)
+        assert multisig.public_keys == [bytes_to_hex(key) for key in PUBLIC_KEYS]
+        assert multisig.redeemscript == multisig_to_redeemscript(PUBLIC_KEYS, 2)
+        assert multisig.scriptcode == multisig.redeemscript
+        assert multisig.address.startswith('U')
+        assert multisig.segwit_address.startswith('U')
+        assert multisig.address != multisig.segwit_address
+        assert multisig.instance == 'MultiSig'
+
+    def test_init_hex_public_keys(self):
+        multisig = MultiSig(KEY1, [bytes_to_hex(key) for key in PUBLIC_KEYS], 2)
+        assert multisig.address == MultiSig(KEY1, PUBLIC_KEYS, 2).address
+
+    def test_init_errors(self):
+        with pytest.raises(TypeError):
+            MultiSig(KEY1.to_wif(), PUBLIC_KEYS, 2)
+        with pytest.raises(TypeError):
+            MultiSig(KEY1, bytes_to_hex(KEY1.public_key), 1)
+        with pytest.raises(ValueError):
+            MultiSig(KEY1, PUBLIC_KEYS[1:], 1)
+        with pytest.raises(ValueError):
+            MultiSig(KEY1, PUBLIC_KEYS, 4)
+
+    def test_match_signature(self):
+        multisig = MultiSig(KEY1, PUBLIC_KEYS, 2)
+        data = b'\x01' * 32
+        assert multisig.match_signature(KEY2.sign(data), data) == bytes_to_hex(KEY2.public_key)
+        assert multisig.match_signature(PrivateKey().sign(data), data) is None
+
+    @pytest.mark.parametrize('segwit', [False, True])
+    def test_cosign(self, segwit):
+        first = MultiSig(KEY1, PUBLIC_KEYS, 2)
+        second = MultiSig(KEY3, PUBLIC_KEYS, 2)
+        unspents = [Unspent(10000000, 1, '', TXID, 0, segwit=segwit)]
+        outputs = [(KEY2.address, 1000000, 'ufoshi')]
+
+        partial = first.create_transaction(outputs, unspents=unspents)
+        signed = second.sign_transaction(partial, unspents=unspents)
+
+        sw_dict = {TXID + ':0': 10000000} if segwit else {}
+        txin = deserialize(signed, sw_dict, first.sw_scriptcode).TxIn[0]
+        if segwit:
+            assert txin.script == b'\x22' + first.sw_scriptcode
+            # witness item count, OP_0, signatures and the redeem script
+            assert txin.witness[:1] == b'\x04'
+        else:
+            assert len(get_signatures_from_script(txin.script)) == 2
+            assert txin.script.endswith(first.redeemscript)
+
+        with pytest.raises(TypeError):
+            MultiSig(KEY2, PUBLIC_KEYS, 2).sign_transaction(signed, unspents=unspents)
@@ -0,0 +1,96 @@
+import pytest
+
+from aioufobit.crypto import ripemd160_sha256
+from aioufobit.constants import MIN_TX_FEE
+from aioufobit.format import (
+    address_to_public_key_hash, address_to_scriptpubkey, bytes_to_wif, public_key_to_address,
+    public_key_to_bech32_address, public_key_to_segwit_address
+)
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import (
+    create_new_transaction, deserialize, estimate_tx_vsize, sanitize_tx_data
+)
+from aioufobit.wallet import PrivateKey
+from .samples import PRIVATE_KEY_BYTES
+
+
+class TestDerivedProperties:
+    def test_compressed(self):
+        key = PrivateKey.from_int(1)
+        assert key.is_compressed()
+        assert key.hash160 == ripemd160_sha256(key.public_key)
+        assert key.address == public_key_to_address(key.public_key)
+        assert key.sw_address == public_key_to_segwit_address(key.public_key)
+        assert address_to_public_key_hash(key.address) == key.hash160
+        assert key.scriptcode == b'v\xa9\x14' + key.hash160 + b'\x88\xac'
+        assert key.scriptpubkey == key.scriptcode
+        assert key.sw_scriptcode == b'\x00\x14' + key.hash160
+        assert key.sw_scriptpubkey == b'\xa9\x14' + ripemd160_sha256(key.sw_scriptcode) + b'\x87'
+        assert key.bech32_address == public_key_to_bech32_address(key.public_key)
+        assert key.bech32_address.startswith('uf1q')
+        assert address_to_scriptpubkey(key.bech32_address) == key.bech32_scriptpubkey == key.sw_scriptcode
+
+    def test_uncompressed(self):
+        key = PrivateKey(bytes_to_wif(PRIVATE_KEY_BYTES))
+        assert not key.is_compressed()
+        assert key.address == public_key_to_address(key.public_key)
+        assert key.sw_address is None
+        assert key.sw_scriptpubkey is None
+        assert key.bech32_address is None
+
+    def test_wif_compression(self):
+        assert PrivateKey(bytes_to_wif(PRIVATE_KEY_BYTES, compressed=True)).is_compressed()
+
+    def test_frozen(self):
+        key = PrivateKey()
+        with pytest.raises(AttributeError):
+            key.address = 'B'
+        with pytest.raises(AttributeError):
+            key.scriptcode = b''
+        with pytest.raises(AttributeError):
+            key.label = 'hot'
+
+
+class TestNativeSegwit:
+    KEY = PrivateKey.from_int(2)
+    LEGACY = Unspent(4000000, 1, '', '11' * 32, 0)
+    NESTED = Unspent(4000000, 1, '', '22' * 32, 1, segwit=True)
+    NATIVE = Unspent(4000000, 1, KEY.sw_scriptcode.hex(), '33' * 32, 2, segwit=True)
+
+    def test_sign(self):
+        unspents = [self.LEGACY, self.NESTED, self.NATIVE]
+        tx_hex = create_new_transaction(self.KEY, unspents, [(self.KEY.bech32_address, 11000000)])
+        tx = deserialize(tx_hex, {'22' * 32 + ':1': 4000000, '33' * 32 + ':2': 4000000})
+
+        assert tx.TxIn[0].script.endswith(self.KEY.public_key)
+        assert tx.TxIn[1].script == b'\x16' + self.KEY.sw_scriptcode
+        assert tx.TxIn[2].script == b''
+        assert tx.TxIn[2].witness.endswith(self.KEY.public_key)
+        assert tx.TxOut[0].script == self.KEY.sw_scriptcode
+
+    def test_vsize(self):
+        legacy = estimate_tx_vsize([self.LEGACY], 2)
+        nested = estimate_tx_vsize([self.NESTED], 2)
+        native = estimate_tx_vsize([self.NATIVE], 2)
+        assert legacy == 226
+        assert native < nested < legacy
+        assert estimate_tx_vsize([self.LEGACY], 2, compressed=False) == 258
+
+    def test_fee(self):
+        outputs = [(self.KEY.address, 1000000, 'ufoshi')]
+        _, outputs_low = sanitize_tx_data([self.NATIVE], outputs, 1, self.KEY.address)
+        assert outputs_low[1][1] == 4000000 - 1000000 - MIN_TX_FEE
+
+        _, outputs_high = sanitize_tx_data([self.NATIVE], outputs, 1000, self.KEY.address)
+        assert outputs_high[1][1] == 4000000 - 1000000 - estimate_tx_vsize([self.NATIVE], 2) * 1000
+
+    def test_coin_selection(self):
+        outputs = [(self.KEY.address, 1000000, 'ufoshi')]
+        unspents, _ = sanitize_tx_data([self.LEGACY, self.NATIVE], outputs, 1000, self.KEY.address,
+                                       combine=False)
+        assert unspents == [self.NATIVE]
+
+        # The fee of the inputs is covered before selection stops.
+        small = [Unspent(1000000, 1, '', 'aa' * 32, i) for i in range(3)]
+        unspents, _ = sanitize_tx_data(small, outputs, 1, self.KEY.address, combine=False)
+        assert len(unspents) == 2
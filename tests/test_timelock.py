@@ -0,0 +1,101 @@
+import pytest
+
+from aioufobit.constants import LOCKTIME_SEQUENCE, OP_CHECKLOCKTIMEVERIFY, RBF_SEQUENCE
+from aioufobit.format import timelock_to_address, timelock_to_redeemscript
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import calc_vsize, parse_tx
+from aioufobit.utils import hex_to_bytes
+from aioufobit.wallet import PrivateKey, TimeLock
+
+KEY = PrivateKey.from_int(1)
+TXID = '8878399d83ec25c627cfbf753ff9ca3602373eac437ab2676154a3c2da23adf3'
+OUTPUTS = [(PrivateKey.from_int(2).address, 1000000, 'ufoshi')]
+HEIGHT = 500000
+TIMESTAMP = 1700000000
+
+
+def parse(tx_hex):
+    return parse_tx(hex_to_bytes(tx_hex))[0]
+
+
+def test_timelock_to_redeemscript():
+    script = timelock_to_redeemscript(KEY.public_key, HEIGHT)
+    assert script[:4] == b'\x03\x20\xa1\x07'
+    assert script[4:6] == OP_CHECKLOCKTIMEVERIFY + b'\x75'
+    assert script[6:] == b'\x21' + KEY.public_key + b'\xac'
+
+    # Small numbers are opcodes; the top bit of the last byte is the sign.
+    assert timelock_to_redeemscript(KEY.public_key, 16)[:1] == b'\x60'
+    assert timelock_to_redeemscript(KEY.public_key, 128)[:3] == b'\x02\x80\x00'
+    assert timelock_to_redeemscript(KEY.public_key.hex(), HEIGHT) == script
+
+    with pytest.raises(ValueError):
+        timelock_to_redeemscript(KEY.public_key, 0)
+    with pytest.raises(ValueError):
+        timelock_to_redeemscript(KEY.public_key, 2 ** 32)
+
+
+class TestTimeLock:
+    def test_init(self):
+        timelock = TimeLock(KEY, HEIGHT)
+        assert timelock.redeemscript == timelock.scriptcode == timelock_to_redeemscript(KEY.public_key, HEIGHT)
+        assert timelock.address == timelock_to_address(KEY.public_key, HEIGHT)
+        assert timelock.address.startswith('U')
+        assert timelock.address != timelock.segwit_address
+        assert timelock.address != TimeLock(KEY, HEIGHT + 1).address
+        assert timelock.instance == 'TimeLock'
+
+        with pytest.raises(TypeError):
+            TimeLock(KEY.to_wif(), HEIGHT)
+
+    def test_is_unlocked(self):
+        assert TimeLock(KEY, HEIGHT).is_unlocked(HEIGHT, 0)
+        assert not TimeLock(KEY, HEIGHT).is_unlocked(HEIGHT - 1, TIMESTAMP)
+        assert TimeLock(KEY, TIMESTAMP).is_unlocked(0, TIMESTAMP + 1)
+        assert not TimeLock(KEY, TIMESTAMP).is_unlocked(HEIGHT, TIMESTAMP)
+
+    @pytest.mark.parametrize('segwit', [False, True])
+    def test_create_transaction(self, segwit):
+        timelock = TimeLock(KEY, HEIGHT)
+        unspents = [Unspent(10000000, 1, '', TXID, 0, segwit=segwit)]
+
+        tx = parse(timelock.create_transaction(OUTPUTS, fee=1, unspents=unspents))
+        [txin] = tx.TxIn
+
+        assert int.from_bytes(tx.locktime, 'little') == HEIGHT
+        assert txin.sequence == LOCKTIME_SEQUENCE
+        if segwit:
+            assert txin.script == b'\x22' + timelock.sw_scriptcode
+            assert txin.witness[:1] == b'\x02'
+            assert txin.witness.endswith(timelock.redeemscript)
+        else:
+            assert txin.script.endswith(bytes([len(timelock.redeemscript)]) + timelock.redeemscript)
+
+        # Change is not locked again.
+        assert tx.TxOut[1].script == KEY.scriptpubkey
+
+    @pytest.mark.parametrize('segwit', [False, True])
+    def test_fee(self, segwit):
+        timelock = TimeLock(KEY, HEIGHT)
+        unspents = [Unspent(10000000, 1, '', TXID, 0, segwit=segwit)]
+
+        tx_hex = timelock.create_transaction(OUTPUTS, fee=1000, unspents=unspents)
+        fee = 10000000 - sum(int.from_bytes(txout.value, 'little') for txout in parse(tx_hex).TxOut)
+
+        # The redeem script is paid for.
+        vsize = calc_vsize(tx_hex)
+        assert vsize * 1000 <= fee <= (vsize + 1) * 1000
+
+
+def test_private_key_locktime():
+    unspents = [Unspent(10000000, 1, KEY.scriptpubkey.hex(), TXID, 0)]
+
+    tx = parse(KEY.create_transaction(OUTPUTS, fee=1, unspents=unspents, locktime=HEIGHT))
+    assert int.from_bytes(tx.locktime, 'little') == HEIGHT
+    assert tx.TxIn[0].sequence == LOCKTIME_SEQUENCE
+
+    tx = parse(KEY.create_transaction(OUTPUTS, fee=1, unspents=unspents, locktime=HEIGHT, replaceable=True))
+    assert tx.TxIn[0].sequence == RBF_SEQUENCE
+
+    tx = parse(KEY.create_transaction(OUTPUTS, fee=1, unspents=unspents))
+    assert tx.locktime == b'\x00' * 4
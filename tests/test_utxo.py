@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from aioufobit.constants import MIN_TX_FEE
+from aioufobit.exceptions import InsufficientFunds
+from aioufobit.network import NetworkAPI
+from aioufobit.network.meta import Unspent
+from aioufobit.transaction import calc_txid
+from aioufobit.utxo import UTXOManager
+from aioufobit.wallet import PrivateKey, Wallet
+
+KEY = PrivateKey.from_int(7)
+OTHER = PrivateKey.from_int(8)
+UNSPENTS = [Unspent(1000000 * (i + 1), 1, KEY.scriptpubkey.hex(), '{:02x}'.format(i) * 32, 0) for i in range(3)]
+OUTPUTS = [(OTHER.address, 500000, 'ufoshi')]
+
+
+class TestUTXOManager:
+    def test_reserve(self):
+        manager = UTXOManager(UNSPENTS)
+        first = manager.reserve(OUTPUTS, 1, KEY.address)
+        second = manager.reserve(OUTPUTS, 1, KEY.address)
+
+        assert first.unspents == [UNSPENTS[0]]
+        assert second.unspents == [UNSPENTS[1]]
+        assert manager.available() == [UNSPENTS[2]]
+        assert first.change == 1 and first.outputs[1][0] == KEY.address
+
+    def test_default_fee(self):
+        manager = UTXOManager(UNSPENTS[:1])
+        lease = manager.reserve(OUTPUTS, None, KEY.address)
+        assert lease.outputs[1][1] == UNSPENTS[0].amount - 500000 - MIN_TX_FEE
+
+    def test_release(self):
+        manager = UTXOManager(UNSPENTS[:1])
+        lease = manager.reserve(OUTPUTS, 1, KEY.address)
+        with pytest.raises(InsufficientFunds):
+            manager.reserve(OUTPUTS, 1, KEY.address)
+
+        lease.release()
+        assert manager.reserve(OUTPUTS, 1, KEY.address).unspents == UNSPENTS[:1]
+
+    def test_insufficient(self):
+        manager = UTXOManager(UNSPENTS[:1])
+        with pytest.raises(InsufficientFunds):
+            manager.reserve([(OTHER.address, 5000000, 'ufoshi')], 1, KEY.address)
+        assert manager.available() == UNSPENTS[:1]
+
+    def test_expiry(self):
+        manager = UTXOManager(UNSPENTS[:1], lease_time=-1)
+        manager.reserve(OUTPUTS, 1, KEY.address)
+        assert manager.available() == UNSPENTS[:1]
+
+    def test_spend(self):
+        manager = UTXOManager(UNSPENTS[:1], addresses=[KEY.address])
+        lease = manager.reserve(OUTPUTS, 1, KEY.address)
+        lease.spend('ff' * 32)
+
+        [change] = manager.available()
+        assert change.txid == 'ff' * 32 and change.txindex == 1
+        assert change.confirmations == 0
+        assert change.amount == lease.outputs[1][1]
+
+        # The backend has not seen the spend yet.
+        manager.update(UNSPENTS[:1])
+        assert manager.unspents == [change]
+
+        # It has seen it, and the change.
+        manager.update([change])
+        assert manager.unspents == [change]
+
+    def test_spend_foreign_change(self):
+        manager = UTXOManager(UNSPENTS[:1])
+        manager.reserve(OUTPUTS, 1, OTHER.address).spend('ff' * 32)
+        assert len(manager) == 0
+
+    def test_update_keeps_leases(self):
+        manager = UTXOManager(UNSPENTS)
+        manager.reserve(OUTPUTS, 1, KEY.address)
+        manager.update(UNSPENTS)
+        assert UNSPENTS[0] not in manager.available()
+
+    def test_update_before_report(self):
+        manager = UTXOManager()
+        # Unconfirmed outputs the backend does not report yet.
+        lease = manager.lease(UNSPENTS[:1])
+        manager.lease(UNSPENTS[1:2]).spend('ff' * 32)
+
+        manager.update(UNSPENTS[2:])
+        manager.update(UNSPENTS)
+        assert manager.unspents == UNSPENTS[:1] + UNSPENTS[2:]
+        assert manager.available() == UNSPENTS[2:]
+        assert not manager.is_spendable(UNSPENTS[1].txid, 0)
+
+        lease.release()
+        assert manager.available() == UNSPENTS[:1] + UNSPENTS[2:]
+
+
+class MockService:
+    async def get_unspent(self, address):
+        return list(UNSPENTS) if address == KEY.address else []
+
+
+def test_wallet_concurrent_send(monkeypatch):
+    broadcast = []
+
+    async def broadcast_tx(tx_hex):
+        await asyncio.sleep(0)
+        broadcast.append(tx_hex)
+        return calc_txid(tx_hex)
+
+    monkeypatch.setattr(NetworkAPI, 'broadcast_tx', broadcast_tx)
+    wallet = Wallet([KEY], service=MockService())
+
+    async def run():
+        await wallet.refresh()
+        txids = await asyncio.gather(*(
+            wallet.send(OUTPUTS, fee=1, combine=False) for _ in range(3)
+        ))
+        # Every unspent is spent, but the change can be used right away.
+        txids.append(await wallet.send(OUTPUTS, fee=1, combine=False))
+        return txids
+
+    txids = asyncio.run(run())
+
+    assert len(set(txids)) == 4
+    assert len(broadcast) == 4
+    assert all(unspent.txid in txids for unspent in wallet.unspents.values())
+    assert wallet.balance == sum(unspent.amount for unspent in UNSPENTS) - 4 * 500000 - 4 * 100000
+
+
+@pytest.mark.parametrize('wallet', [False, True])
+def test_concurrent_send_defaults(monkeypatch, wallet):
+    async def broadcast_tx(tx_hex):
+        await asyncio.sleep(0)
+        return calc_txid(tx_hex)
+
+    monkeypatch.setattr(NetworkAPI, 'broadcast_tx', broadcast_tx)
+    key = PrivateKey.from_int(7)
+    unspents = UNSPENTS + [Unspent(1000000, 1, KEY.scriptpubkey.hex(), '{:02x}'.format(i) * 32, 0) for i in (3, 4)]
+
+    async def run():
+        if wallet:
+            sender = Wallet([key], service=MockService())
+            await sender.refresh()
+            sender.utxos.update(unspents)
+        else:
+            sender = key
+            sender.unspents[:] = unspents
+        return await asyncio.gather(*(sender.send(OUTPUTS, fee=1) for _ in range(3)))
+
+    # Each send leases only the unspents it needs.
+    txids = asyncio.run(run())
+    assert len(set(txids)) == 3
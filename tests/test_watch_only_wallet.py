@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from aioufobit.hd import HDKey
+from aioufobit.network.meta import Unspent
+from aioufobit.wallet import WatchOnlyWallet
+
+ACCOUNT = HDKey.from_seed(b'\x01' * 32).derive("m/44'/0'/0'")
+USED_RECEIVE = (0, 15, 30)
+USED_CHANGE = (2,)
+
+
+def used_addresses():
+    receive = ACCOUNT.child(0)
+    change = ACCOUNT.child(1)
+    return (
+        {receive.child(index).address for index in USED_RECEIVE} |
+        {change.child(index).address for index in USED_CHANGE}
+    )
+
+
+class MockService:
+    def __init__(self):
+        self.used = used_addresses()
+        self.calls = []
+
+    async def get_transactions(self, address):
+        return ['ab' * 32] if address in self.used else []
+
+    async def get_unspent(self, address):
+        self.calls.append(address)
+        return [Unspent(1000, 1, '', 'ab' * 32, 0)] if address in self.used else []
+
+
+class MockBatchService(MockService):
+    async def get_unspents_by_address(self, addresses):
+        self.calls.append(addresses)
+        return {address: [Unspent(1000, 1, '', 'ab' * 32, 0)] for address in addresses}
+
+
+class TestWatchOnlyWallet:
+    def test_init(self):
+        wallet = WatchOnlyWallet(ACCOUNT.to_xpub(), gap_limit=5)
+        assert len(wallet.addresses) == 10
+        assert wallet.receive_address() == ACCOUNT.derive('m/0/0').address
+        assert wallet.change_address() == ACCOUNT.derive('m/1/0').address
+        assert wallet.paths[wallet.change_address()] == (WatchOnlyWallet.CHANGE, 0)
+
+    def test_init_neuters_private_key(self):
+        wallet = WatchOnlyWallet(ACCOUNT)
+        assert not wallet.hd_key.is_private
+
+    def test_init_segwit(self):
+        wallet = WatchOnlyWallet(ACCOUNT.to_xpub(), address_type='segwit')
+        assert wallet.receive_address() == ACCOUNT.derive('m/0/0').sw_address
+        with pytest.raises(ValueError):
+            WatchOnlyWallet(ACCOUNT.to_xpub(), address_type='taproot')
+
+    def test_scan(self):
+        service = MockService()
+        wallet = WatchOnlyWallet(ACCOUNT.to_xpub(), service=service)
+
+        balance = asyncio.run(wallet.scan(batch_size=7, concurrency=3))
+
+        assert balance == 4000
+        assert len(wallet.get_unspents()) == 4
+        # Only addresses with history are asked for unspents.
+        assert set(service.calls) == service.used
+        assert len(wallet.addresses) == (30 + 20 + 1) + (2 + 20 + 1)
+        assert wallet.receive_address() == ACCOUNT.derive('m/0/31').address
+        assert wallet.change_address() == ACCOUNT.derive('m/1/3').address
+
+    def test_scan_batch_service(self):
+        service = MockBatchService()
+        wallet = WatchOnlyWallet(ACCOUNT.to_xpub(), service=service)
+
+        assert asyncio.run(wallet.scan(batch_size=100)) == 4000
+        assert all(isinstance(call, list) for call in service.calls)